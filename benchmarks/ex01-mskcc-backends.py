@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import tracemalloc
+
+# Append module root directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from prostate_nomograms.mskcc.base import compile_model, get_available_backends
+from prostate_nomograms.mskcc.base.backends import Backend, FusedKernel, Link
+
+
+if __name__ == "__main__":
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                Constant                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    COEFFICIENTS_FOLDER_PATH = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "prostate_nomograms",
+        "mskcc",
+        "models_coefficients"
+    )
+    VARIABLES_FILENAME = "variables_coefficients_2_June_2022.json"
+    SPLINE_FILENAME = "spline_coefficients_2_June_2022.json"
+
+    OUTCOME = "Preoperative BCR"
+    NUMBER_OF_PATIENTS = 5_000_000
+    NUMBER_OF_MONTHS = 60
+    NUMBER_OF_REPETITIONS = 5
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                    Data                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    variables = pd.read_json(os.path.join(COEFFICIENTS_FOLDER_PATH, VARIABLES_FILENAME))
+    variables = variables[variables["Model"] == OUTCOME]
+    splines = pd.read_json(os.path.join(COEFFICIENTS_FOLDER_PATH, SPLINE_FILENAME))
+
+    compiled_model = compile_model(
+        variables_coefficients=dict(zip(variables["Variable"], variables["Value"])),
+        spline_coefficients=dict(zip(splines["Knot"], splines["Value"]))
+    )
+
+    random_generator = np.random.default_rng(0)
+    inputs = {
+        "age": random_generator.integers(40, 85, NUMBER_OF_PATIENTS),
+        "psa": np.round(random_generator.uniform(0.1, 60, NUMBER_OF_PATIENTS), 1),
+        "primary_gleason": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "secondary_gleason": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "clinical_stage": random_generator.choice(["T1c", "T2a", "T2b", "T2c", "T3a"], NUMBER_OF_PATIENTS).astype(
+            object
+        )
+    }
+    input_bytes = sum(array.nbytes for name, array in inputs.items() if name != "clinical_stage")
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                 Benchmark                                                   #
+    # ----------------------------------------------------------------------------------------------------------- #
+    def numpy_survival(_inputs):
+        linear_predictor = compiled_model.linear_predictor(_inputs)
+        scaling_parameter = compiled_model.scaling_parameter
+        return 1/(1 + (np.exp(-linear_predictor)*NUMBER_OF_MONTHS/12)**(1/scaling_parameter))
+
+    reference = numpy_survival(inputs)
+    print(f"{NUMBER_OF_PATIENTS:,} patients, {input_bytes/1e6:.0f} MB of numerical inputs, outcome: {OUTCOME}\n")
+    print(f"{'Backend':<10}{'Time (ms)':>12}{'Rows/s':>16}{'Peak temporaries (MB)':>24}{'Max abs. error':>18}")
+
+    for backend in get_available_backends():
+        if backend == Backend.NUMPY:
+            survival = numpy_survival
+        else:
+            kernel = FusedKernel(compiled_model, Link.SURVIVAL, backend)
+            kernel(inputs, NUMBER_OF_MONTHS)  # Warm-up, e.g. numba compilation.
+            survival = lambda _inputs: kernel(_inputs, NUMBER_OF_MONTHS)
+
+        times = []
+        for _ in range(NUMBER_OF_REPETITIONS):
+            start = time.perf_counter()
+            survival(inputs)
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        result = survival(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        best_time = min(times)
+        print(
+            f"{backend:<10}{best_time*1e3:>12.1f}{NUMBER_OF_PATIENTS/best_time:>16,.0f}{peak/1e6:>24.1f}"
+            f"{np.max(np.abs(result - reference)):>18.2e}"
+        )
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+
+# Append module root directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from prostate_nomograms import ClassificationOutcome, MskccPreRadicalProstatectomyNomogram, SurvivalOutcome
+from prostate_nomograms.mskcc.base import PatientScorer
+
+
+if __name__ == "__main__":
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                Constant                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    OUTCOMES = [
+        ClassificationOutcome.EXTRACAPSULAR_EXTENSION,
+        ClassificationOutcome.LYMPH_NODE_INVOLVEMENT,
+        ClassificationOutcome.ORGAN_CONFINED_DISEASE,
+        ClassificationOutcome.SEMINAL_VESICLE_INVASION,
+        SurvivalOutcome.PREOPERATIVE_BCR,
+        SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH
+    ]
+    NUMBER_OF_MONTHS = 60
+    NUMBER_OF_CALLS = 10_000
+    PATIENT = {"age": 65, "psa": 7.2, "primary_gleason": 3, "secondary_gleason": 4, "clinical_stage": "T2a"}
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                   Models                                                    #
+    # ----------------------------------------------------------------------------------------------------------- #
+    nomograms = [MskccPreRadicalProstatectomyNomogram(outcome) for outcome in OUTCOMES]
+    scorer = PatientScorer(nomograms)
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                 Benchmark                                                   #
+    # ----------------------------------------------------------------------------------------------------------- #
+    def score_with_dataframe(patient):
+        dataframe = pd.DataFrame({
+            "AGE": [patient["age"]],
+            "PSA": [patient["psa"]],
+            "GLEASON_PRIMARY": [patient["primary_gleason"]],
+            "GLEASON_SECONDARY": [patient["secondary_gleason"]],
+            "CLINICAL_STAGE": [patient["clinical_stage"]]
+        })
+        return {
+            str(nomogram.outcome): (
+                nomogram.predict_proba(dataframe, NUMBER_OF_MONTHS) if nomogram.model_type == "survival"
+                else nomogram.predict_proba(dataframe)
+            ).item()
+            for nomogram in nomograms
+        }
+
+    def score_with_scorer(patient):
+        return scorer.score_patient(NUMBER_OF_MONTHS, **patient)
+
+    reference = score_with_dataframe(PATIENT)
+    print(f"{len(OUTCOMES)} outcomes, {NUMBER_OF_CALLS:,} calls\n")
+    print(f"{'Path':<26}{'Mean (us)':>12}{'p99 (us)':>12}{'Max abs. error':>18}")
+
+    for name, score in (("DataFrame + predict_proba", score_with_dataframe), ("PatientScorer", score_with_scorer)):
+        score(PATIENT)  # Warm-up, e.g. numba compilation.
+        number_of_calls = NUMBER_OF_CALLS if score is score_with_scorer else NUMBER_OF_CALLS//100
+
+        latencies = np.empty(number_of_calls)
+        for i in range(number_of_calls):
+            start = time.perf_counter()
+            result = score(PATIENT)
+            latencies[i] = time.perf_counter() - start
+
+        error = max(abs(result[outcome] - reference[outcome]) for outcome in reference)
+        print(f"{name:<26}{latencies.mean()*1e6:>12.1f}{np.percentile(latencies, 99)*1e6:>12.1f}{error:>18.2e}")
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Append module root directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from prostate_nomograms.server import create_preoperative_nomograms, ScoringServer
+
+
+async def run_client(port: int, bodies: list, latencies: list, deadline: float):
+    """
+    Sends requests over a keep-alive connection until the deadline, recording their latencies.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    while time.perf_counter() < deadline:
+        body = bodies[i % len(bodies)]
+        start = time.perf_counter()
+        writer.write(
+            f"POST /predict_proba HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+        headers = await reader.readuntil(b"\r\n\r\n")
+        content_length = int(headers.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+        await reader.readexactly(content_length)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+    writer.close()
+
+
+async def run_load_test(server: ScoringServer, bodies: list, number_of_clients: int, duration: float):
+    """
+    Runs concurrent clients against the server and prints the throughput and latencies.
+    """
+    await server.start()
+    latencies = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*[run_client(server.port, bodies, latencies, deadline) for _ in range(number_of_clients)])
+    await server.stop()
+
+    latencies = np.array(latencies)
+    metrics = server.metrics.values()
+    number_of_patients = sum(outcome_metrics.number_of_patients for outcome_metrics in metrics)
+    number_of_batches = sum(outcome_metrics.number_of_batches for outcome_metrics in metrics)
+    print(
+        f"{server.max_wait*1e3:>14.1f}{number_of_clients:>10}{len(latencies)/duration:>14,.0f}"
+        f"{number_of_patients/max(number_of_batches, 1):>16.1f}{np.median(latencies)*1e3:>12.2f}"
+        f"{np.percentile(latencies, 99)*1e3:>12.2f}"
+    )
+
+
+if __name__ == "__main__":
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                Constant                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    NUMBER_OF_CLIENTS = [1, 16, 64]
+    MAX_WAITS = [0.0, 0.002, 0.005]
+    DURATION = 5.0
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                    Data                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    random_generator = np.random.default_rng(0)
+    bodies = [
+        json.dumps({
+            "patients": [{
+                "AGE": int(random_generator.integers(40, 85)),
+                "PSA": round(float(random_generator.uniform(0.1, 60)), 1),
+                "GLEASON_PRIMARY": int(random_generator.integers(3, 6)),
+                "GLEASON_SECONDARY": int(random_generator.integers(3, 6)),
+                "CLINICAL_STAGE": str(random_generator.choice(["T1c", "T2a", "T2b", "T2c", "T3a"]))
+            }],
+            "number_of_months": 60
+        }).encode()
+        for _ in range(100)
+    ]
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                 Benchmark                                                   #
+    # ----------------------------------------------------------------------------------------------------------- #
+    nomograms = create_preoperative_nomograms()
+    patients = pd.DataFrame.from_records([json.loads(body)["patients"][0] for body in bodies])
+    for nomogram in nomograms.values():  # Warm-up, e.g. numba compilation, before starting the micro-batchers.
+        for size in (1, len(patients)):
+            nomogram.predict_proba(patients.iloc[:size], np.full(size, 60.0))
+
+    print(f"{len(nomograms)} outcomes, one patient per request, {DURATION:.0f} s per run\n")
+    print(
+        f"{'Max wait (ms)':>14}{'Clients':>10}{'Requests/s':>14}{'Patients/batch':>16}{'p50 (ms)':>12}"
+        f"{'p99 (ms)':>12}"
+    )
+
+    for max_wait in MAX_WAITS:
+        for number_of_clients in NUMBER_OF_CLIENTS:
+            scoring_server = ScoringServer(nomograms, port=0, max_wait=max_wait)
+            asyncio.run(run_load_test(scoring_server, bodies, number_of_clients, DURATION))
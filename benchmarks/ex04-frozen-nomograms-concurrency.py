@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import sysconfig
+import time
+
+# Append module root directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from prostate_nomograms import (
+    CapraNomogram,
+    ClassificationOutcome,
+    CustomNomogram,
+    MskccPreRadicalProstatectomyNomogram,
+    SurvivalOutcome
+)
+
+
+if __name__ == "__main__":
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                Constant                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    NUMBER_OF_PATIENTS = 20_000
+    NUMBER_OF_THREADS = 16
+    NUMBER_OF_CALLS_PER_THREAD = 100
+    NUMBER_OF_MONTHS = 60
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                    Data                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    random_generator = np.random.default_rng(0)
+    dataframe = pd.DataFrame({
+        "AGE": random_generator.integers(40, 85, NUMBER_OF_PATIENTS),
+        "PSA": np.round(random_generator.lognormal(2, 0.8, NUMBER_OF_PATIENTS), 1),
+        "GLEASON_PRIMARY": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "GLEASON_SECONDARY": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "CLINICAL_STAGE": random_generator.choice(["T1c", "T2a", "T2b", "T2c", "T3a"], NUMBER_OF_PATIENTS)
+    })
+    dataframe["TARGET"] = random_generator.random(NUMBER_OF_PATIENTS) < 1/(1 + np.exp(3 - dataframe["PSA"]/10))
+    dataframe["EVENT"] = dataframe["TARGET"]
+    dataframe["TIME"] = random_generator.exponential(60, NUMBER_OF_PATIENTS)
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                   Models                                                    #
+    # ----------------------------------------------------------------------------------------------------------- #
+    nomograms = {
+        "MSKCC ECE": MskccPreRadicalProstatectomyNomogram(ClassificationOutcome.EXTRACAPSULAR_EXTENSION),
+        "MSKCC PCSM": MskccPreRadicalProstatectomyNomogram(SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH),
+        "CAPRA ECE": CapraNomogram(ClassificationOutcome.EXTRACAPSULAR_EXTENSION, target_column_name="TARGET"),
+        "CAPRA BCR": CapraNomogram(
+            SurvivalOutcome.PREOPERATIVE_BCR,
+            event_indicator_column_name="EVENT",
+            event_time_column_name="TIME"
+        ),
+        "Custom ECE": CustomNomogram(
+            ClassificationOutcome.EXTRACAPSULAR_EXTENSION,
+            features_column_names=["AGE", "PSA", "GLEASON_PRIMARY", "GLEASON_SECONDARY"],
+            target_column_name="TARGET"
+        )
+    }
+    for nomogram in nomograms.values():
+        if hasattr(nomogram, "fit"):
+            nomogram.fit(dataframe)
+
+    frozen_nomograms = {name: nomogram.freeze() for name, nomogram in nomograms.items()}
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                 Stress test                                                 #
+    # ----------------------------------------------------------------------------------------------------------- #
+    def predict(nomogram, start, stop):
+        patients = dataframe.iloc[start:stop]
+        if nomogram.model_type == "survival":
+            return nomogram.predict_proba(patients, NUMBER_OF_MONTHS)
+        else:
+            return nomogram.predict_proba(patients)
+
+    # The references are computed in the main thread, which also initializes the numba threading layer.
+    references = {name: predict(nomogram, 0, NUMBER_OF_PATIENTS) for name, nomogram in nomograms.items()}
+
+    def stress(thread_index):
+        thread_random_generator = np.random.default_rng(thread_index)
+        number_of_mismatches = 0
+        for _ in range(NUMBER_OF_CALLS_PER_THREAD):
+            name = list(frozen_nomograms)[thread_random_generator.integers(len(frozen_nomograms))]
+            start = int(thread_random_generator.integers(0, NUMBER_OF_PATIENTS - 1))
+            stop = int(thread_random_generator.integers(start + 1, min(start + 500, NUMBER_OF_PATIENTS) + 1))
+            predictions = predict(frozen_nomograms[name], start, stop)
+            if not np.array_equal(predictions, references[name][start:stop], equal_nan=True):
+                number_of_mismatches += 1
+
+        return number_of_mismatches
+
+    free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    gil_enabled = sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True
+    print(f"Python {sys.version.split()[0]}, free-threaded build: {free_threaded}, GIL enabled: {gil_enabled}")
+    print(f"{NUMBER_OF_THREADS} threads sharing {len(frozen_nomograms)} frozen nomograms, "
+          f"{NUMBER_OF_CALLS_PER_THREAD} calls per thread\n")
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(NUMBER_OF_THREADS) as executor:
+        number_of_mismatches = sum(executor.map(stress, range(NUMBER_OF_THREADS)))
+    elapsed_time = time.perf_counter() - start_time
+
+    number_of_calls = NUMBER_OF_THREADS*NUMBER_OF_CALLS_PER_THREAD
+    print(f"{'Calls':<22}{number_of_calls:>12,}")
+    print(f"{'Calls/s':<22}{number_of_calls/elapsed_time:>12,.0f}")
+    print(f"{'Mismatches':<22}{number_of_mismatches:>12}")
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                Immutability                                                 #
+    # ----------------------------------------------------------------------------------------------------------- #
+    frozen_nomogram = frozen_nomograms["MSKCC ECE"]
+    try:
+        frozen_nomogram.outcome = ClassificationOutcome.LYMPH_NODE_INVOLVEMENT
+        print(f"{'Setting attributes':<22}{'allowed':>12}")
+    except AttributeError:
+        print(f"{'Setting attributes':<22}{'refused':>12}")
+
+    table = next(
+        effect.table for effect in frozen_nomogram._nomogram.regressor.compiled_model.effects.values()
+        if effect.table is not None
+    )
+    print(f"{'Writeable tables':<22}{str(table.flags.writeable):>12}")
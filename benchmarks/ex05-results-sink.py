@@ -0,0 +1,92 @@
+import os
+import sys
+import tempfile
+import time
+
+# Append module root directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from prostate_nomograms import ClassificationOutcome, MskccPreRadicalProstatectomyNomogram, SurvivalOutcome
+from prostate_nomograms.results_sink import (
+    get_results_column_names,
+    MemmapResultsSink,
+    ParquetResultsSink,
+    write_results
+)
+
+
+if __name__ == "__main__":
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                Constant                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    NUMBER_OF_PATIENTS = 1_000_000
+    NUMBER_OF_MONTHS = [60, 120, 180]
+    OUTCOMES = [
+        ClassificationOutcome.EXTRACAPSULAR_EXTENSION,
+        ClassificationOutcome.LYMPH_NODE_INVOLVEMENT,
+        ClassificationOutcome.ORGAN_CONFINED_DISEASE,
+        ClassificationOutcome.SEMINAL_VESICLE_INVASION,
+        SurvivalOutcome.PREOPERATIVE_BCR,
+        SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH
+    ]
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                    Data                                                     #
+    # ----------------------------------------------------------------------------------------------------------- #
+    random_generator = np.random.default_rng(0)
+    dataframe = pd.DataFrame({
+        "AGE": random_generator.integers(40, 85, NUMBER_OF_PATIENTS),
+        "PSA": np.round(random_generator.lognormal(2, 0.8, NUMBER_OF_PATIENTS), 1),
+        "GLEASON_PRIMARY": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "GLEASON_SECONDARY": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "CLINICAL_STAGE": random_generator.choice(["T1c", "T2a", "T2b", "T2c", "T3a"], NUMBER_OF_PATIENTS)
+    })
+
+    nomograms = [MskccPreRadicalProstatectomyNomogram(outcome) for outcome in OUTCOMES]
+    column_names = get_results_column_names(nomograms, NUMBER_OF_MONTHS)
+    write_results(MemmapResultsSink(tempfile.mkdtemp(), 1_000, column_names), nomograms, dataframe[:1_000],
+                  NUMBER_OF_MONTHS)  # Warm-up, e.g. numba compilation.
+
+    # ----------------------------------------------------------------------------------------------------------- #
+    #                                                 Benchmark                                                   #
+    # ----------------------------------------------------------------------------------------------------------- #
+    def insert_columns_and_write_csv(folder_path):
+        results = dataframe.copy()
+        for nomogram in nomograms:
+            if nomogram.model_type == "survival":
+                results[f"PREDICTED_{nomogram.outcome.name}_RISK"] = nomogram.predict_risk(results)
+                for number_of_months in NUMBER_OF_MONTHS:
+                    column_name = f"PREDICTED_{nomogram.outcome.name}_{number_of_months}MONTHS"
+                    results[column_name] = nomogram.predict_proba(results, number_of_months)
+            else:
+                results[f"PREDICTED_{nomogram.outcome.name}"] = nomogram.predict_proba(results)
+        results[column_names].to_csv(os.path.join(folder_path, "results.csv"))
+
+    def write_memmap(folder_path):
+        with MemmapResultsSink(os.path.join(folder_path, "results"), NUMBER_OF_PATIENTS, column_names) as sink:
+            write_results(sink, nomograms, dataframe, NUMBER_OF_MONTHS)
+
+    def write_parquet(folder_path):
+        with ParquetResultsSink(os.path.join(folder_path, "results.parquet"), NUMBER_OF_PATIENTS, column_names) as sink:
+            write_results(sink, nomograms, dataframe, NUMBER_OF_MONTHS)
+
+    print(f"{NUMBER_OF_PATIENTS:,} patients x {len(column_names)} columns\n")
+    print(f"{'Writer':<32}{'Time (s)':>10}{'Size (MB)':>12}")
+    for name, write in (
+            ("DataFrame columns + to_csv", insert_columns_and_write_csv),
+            ("MemmapResultsSink", write_memmap),
+            ("ParquetResultsSink", write_parquet)
+    ):
+        with tempfile.TemporaryDirectory() as temporary_folder_path:
+            start_time = time.perf_counter()
+            write(temporary_folder_path)
+            elapsed_time = time.perf_counter() - start_time
+
+            size = sum(
+                os.path.getsize(os.path.join(root, filename))
+                for root, _, filenames in os.walk(temporary_folder_path) for filename in filenames
+            )
+            print(f"{name:<32}{elapsed_time:>10.2f}{size/1e6:>12.1f}")
@@ -1,7 +1,8 @@
 from .capra import CapraNomogram
 from .custom import CustomNomogram
-from .mskcc import MskccPreRadicalProstatectomyNomogram
-from .enum import ClassificationOutcome, SurvivalOutcome
+from .mskcc import MskccPostRadicalProstatectomyNomogram, MskccPreRadicalProstatectomyNomogram
+from .enum import CapraRiskGroup, ClassificationOutcome, SurvivalOutcome
+from .frozen import FrozenNomogram
 
 __author__ = "Maxence Larose"
 __version__ = "0.0.9"
@@ -1 +1 @@
-from .capra import CapraNomogram
+from .capra import CapraNomogram, CapraStratification, get_risk_group_from_capra_score
@@ -58,7 +58,8 @@ class SurvivalRegression:
             number_of_months: Union[np.ndarray, list, float, int]
     ) -> np.array:
         """
-        Gets the predicted result.
+        Gets the predicted result. The CAPRA score takes at most 11 values, so the survival function is evaluated once
+        per distinct score and gathered for each patient.
 
         Parameters
         ----------
@@ -72,9 +73,10 @@ class SurvivalRegression:
         predicted_probability : numpy.ndarray
             The predicted probability.
         """
-        survival_funcs = self.classifier.predict_survival_function(X=capra_score.reshape(-1, 1))
+        unique_capra_scores, inverse = np.unique(capra_score, return_inverse=True)
+        survival_funcs = self.classifier.predict_survival_function(X=unique_capra_scores.reshape(-1, 1))
         predicted_probability = []
         for survival_func in survival_funcs:
             predicted_probability.append(survival_func(number_of_months))
 
-        return np.array(predicted_probability)
+        return np.array(predicted_probability)[inverse.ravel()]
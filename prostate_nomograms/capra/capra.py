@@ -1,12 +1,46 @@
-from typing import Optional, Union
+import copy
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
 
-import pandas as pd
 import numpy as np
+from numpy.typing import DTypeLike
+import pandas as pd
 
-from ..enum import ClassificationOutcome, SurvivalOutcome
+from ..enum import CapraRiskGroup, ClassificationOutcome, SurvivalOutcome
+from ..frames import Frame, get_column, get_columns, get_number_of_rows
+from ..frozen import FrozenNomogram
+from ..precision import check_precision, PrecisionReport
+from ..profiling import stage
 from .base import LogisticRegression, SurvivalRegression
 
 
+CAPRA_SCORES = np.arange(11)
+CAPRA_RISK_GROUPS_THRESHOLDS = (3, 6)
+
+
+class CapraStratification(NamedTuple):
+    capra_score: np.ndarray
+    risk_group: np.ndarray
+    survival_table: pd.DataFrame
+    risk_groups_survival_table: pd.DataFrame
+
+
+def get_risk_group_from_capra_score(capra_score: np.ndarray) -> np.ndarray:
+    """
+    Gets the CAPRA risk group of each patient, i.e. low (0 to 2), intermediate (3 to 5) or high (6 to 10).
+
+    Parameters
+    ----------
+    capra_score : numpy.ndarray
+        The CAPRA score.
+
+    Returns
+    -------
+    risk_group : numpy.ndarray
+        The risk group of each patient, as CapraRiskGroup values.
+    """
+    return np.searchsorted(CAPRA_RISK_GROUPS_THRESHOLDS, capra_score, side="right").astype(np.int8)
+
+
 class CapraNomogram:
     """
     CAPRA nomogram. See
@@ -25,7 +59,8 @@ class CapraNomogram:
             secondary_gleason_column_name: str = "GLEASON_SECONDARY",
             clinical_stage_column_name: str = "CLINICAL_STAGE",
             positive_cores_percentage_column_name: Optional[str] = None,
-            random_state: int = 0
+            random_state: int = 0,
+            dtype: DTypeLike = np.float64
     ):
         """
         Initializes columns names.
@@ -54,6 +89,9 @@ class CapraNomogram:
             Name of the column containing the number of positive cores of the patients.
         random_state : int, optional
             Random state.
+        dtype : DTypeLike
+            Floating point type of the CAPRA scores and of the predictions, e.g. numpy.float32 to halve the memory
+            used by the predictions. The regressor is fitted and evaluated in its own precision.
         """
         if outcome in ClassificationOutcome:
             self.outcome = ClassificationOutcome(outcome)
@@ -71,6 +109,7 @@ class CapraNomogram:
         self.secondary_gleason_column_name = secondary_gleason_column_name
         self.clinical_stage_column_name = clinical_stage_column_name
         self.positive_cores_percentage_column_name = positive_cores_percentage_column_name
+        self.dtype = np.dtype(dtype)
         self._is_fitted = False
 
         if self.model_type == "survival":
@@ -121,6 +160,28 @@ class CapraNomogram:
         else:
             return False
 
+    @property
+    def inputs_column_names(self) -> Tuple[str, ...]:
+        """
+        Names of the columns used to compute the CAPRA score.
+
+        Returns
+        -------
+        inputs_column_names : Tuple[str, ...]
+            Names of the columns used to compute the CAPRA score.
+        """
+        column_names = [
+            self.age_column_name,
+            self.psa_column_name,
+            self.primary_gleason_column_name,
+            self.secondary_gleason_column_name,
+            self.clinical_stage_column_name
+        ]
+        if self.cores:
+            column_names.append(self.positive_cores_percentage_column_name)
+
+        return tuple(column_name for column_name in column_names if column_name)
+
     def _get_age_score(self, data_dict: dict) -> np.ndarray:
         """
         Gets the age score.
@@ -135,8 +196,8 @@ class CapraNomogram:
         age_score : np.ndarray
             Age score.
         """
-        age = np.array(data_dict[self.age_column_name])
-        age_score = np.zeros_like(age, dtype=float)
+        age = np.asarray(data_dict[self.age_column_name])
+        age_score = np.zeros_like(age, dtype=self.dtype)
 
         age_score[age < 50] = 0
         age_score[age >= 50] = 1
@@ -157,8 +218,8 @@ class CapraNomogram:
         psa_score : np.ndarray
             PSA score.
         """
-        psa = np.array(data_dict[self.psa_column_name])
-        psa_score = np.zeros_like(psa, dtype=float)
+        psa = np.asarray(data_dict[self.psa_column_name])
+        psa_score = np.zeros_like(psa, dtype=self.dtype)
 
         psa_score[psa < 6] = 0
         psa_score[(6 <= psa) & (psa < 10)] = 1
@@ -182,11 +243,11 @@ class CapraNomogram:
         gleason_score : np.ndarray
             Gleason score.
         """
-        primary_gleason = np.array(data_dict[self.primary_gleason_column_name])
-        secondary_gleason = np.array(data_dict[self.secondary_gleason_column_name])
+        primary_gleason = np.asarray(data_dict[self.primary_gleason_column_name])
+        secondary_gleason = np.asarray(data_dict[self.secondary_gleason_column_name])
         total_gleason_score = primary_gleason + secondary_gleason
 
-        gleason_score = np.zeros_like(total_gleason_score, dtype=float)
+        gleason_score = np.zeros_like(total_gleason_score, dtype=self.dtype)
 
         gleason_score[(secondary_gleason == 4) | (secondary_gleason == 5)] = 1
         gleason_score[(primary_gleason == 4) | (primary_gleason == 5)] = 3
@@ -209,8 +270,8 @@ class CapraNomogram:
         """
         clinical_tumor_stage = data_dict[self.clinical_stage_column_name]
 
-        clinical_stage_score = np.zeros_like(clinical_tumor_stage, dtype=float)
-        clinical_stage_score[list(map("T3a".__eq__, clinical_tumor_stage))] = 1
+        clinical_stage_score = np.zeros(len(clinical_tumor_stage), dtype=self.dtype)
+        clinical_stage_score[np.asarray(clinical_tumor_stage == "T3a", dtype=bool)] = 1
 
         return clinical_stage_score
 
@@ -229,72 +290,78 @@ class CapraNomogram:
             Positive cores score.
         """
         if self.positive_cores_percentage_column_name:
-            positive_cores_percentage = np.array(data_dict[self.positive_cores_percentage_column_name], dtype=float)
+            positive_cores_percentage = np.array(
+                data_dict[self.positive_cores_percentage_column_name], dtype=self.dtype
+            )
 
-            positive_cores_score = np.zeros_like(positive_cores_percentage, dtype=float)
+            positive_cores_score = np.zeros_like(positive_cores_percentage, dtype=self.dtype)
             positive_cores_score[positive_cores_percentage >= 34] = 1
 
-            return positive_cores_percentage
+            return positive_cores_score
         else:
-            return np.zeros_like(data_dict[self.age_column_name], dtype=float)
+            return np.zeros_like(data_dict[self.age_column_name], dtype=self.dtype)
 
-    def get_capra_score(self, dataframe: pd.DataFrame) -> np.ndarray:
+    def get_capra_score(self, dataframe: Frame) -> np.ndarray:
         """
         Gets the CAPRA score.
 
         Parameters
         ----------
-        dataframe : pd.DataFrame
-            Dataframe containing the data of the patients.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
 
         Returns
         -------
         capra_score : np.ndarray
             CAPRA score.
         """
-        data_dict = dataframe.to_dict(orient="list")
+        rows = get_number_of_rows(dataframe)
+        with stage("CapraNomogram.get_columns", rows=rows):
+            data_dict = get_columns(dataframe, list(self.inputs_column_names))
 
-        capra_score = self._get_age_score(data_dict)
-        capra_score += self._get_psa_score(data_dict)
-        capra_score += self._get_gleason_score(data_dict)
-        capra_score += self._get_clinical_stage_score(data_dict)
+        with stage("CapraNomogram.get_capra_score", rows=rows):
+            capra_score = self._get_age_score(data_dict)
+            capra_score += self._get_psa_score(data_dict)
+            capra_score += self._get_gleason_score(data_dict)
+            capra_score += self._get_clinical_stage_score(data_dict)
 
-        if self.cores:
-            capra_score += self._get_positive_cores_score(data_dict)
+            if self.cores:
+                capra_score += self._get_positive_cores_score(data_dict)
 
         return capra_score
 
     def fit(
             self,
-            dataset: pd.DataFrame
+            dataset: Frame
     ):
         """
         Fits the model.
 
         Parameters
         ----------
-        dataset : pd.DataFrame
-            Dataframe containing the data of the patients.
+        dataset : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         """
         capra_score = self.get_capra_score(dataset)
 
-        if self.model_type == "survival":
-            self.regressor.fit(
-                capra_score,
-                np.array(dataset[self.event_indicator_column_name], dtype=bool),
-                np.array(dataset[self.event_time_column_name], dtype=float)
-            )
-        else:
-            self.regressor.fit(
-                capra_score,
-                np.array(dataset[self.target_column_name])
-            )
+        with stage("CapraNomogram.regressor.fit", rows=len(capra_score)):
+            if self.model_type == "survival":
+                self.regressor.fit(
+                    capra_score,
+                    np.array(get_column(dataset, self.event_indicator_column_name), dtype=bool),
+                    np.array(get_column(dataset, self.event_time_column_name), dtype=float)
+                )
+            else:
+                self.regressor.fit(
+                    capra_score,
+                    np.array(get_column(dataset, self.target_column_name))
+                )
 
         self._is_fitted = True
 
     def predict_proba(
             self,
-            dataframe: pd.DataFrame,
+            dataframe: Frame,
             number_of_months: Union[np.ndarray, list, float, int] = None
     ) -> np.ndarray:
         """
@@ -302,8 +369,8 @@ class CapraNomogram:
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         number_of_months : Union[numpy.ndarray, list, float, int], optional
             The number of months. It is used only for survival models.
 
@@ -314,28 +381,92 @@ class CapraNomogram:
         """
         assert self._is_fitted, "Model must be fitted first."
 
-        capra_score = self.get_capra_score(dataframe)
+        return self.predict_proba_from_intermediates(self.get_intermediates(dataframe), number_of_months)
+
+    def get_intermediates(self, dataframe: Frame) -> Dict[str, np.ndarray]:
+        """
+        Gets the per-patient intermediate arrays of the predictions, i.e. the CAPRA score. The predictions can be
+        computed from them for any number of months without reading the patients data again.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        intermediates : Dict[str, numpy.ndarray]
+            The intermediate arrays, by name.
+        """
+        return {"capra_score": self.get_capra_score(dataframe)}
+
+    def predict_proba_from_intermediates(
+            self,
+            intermediates: Mapping[str, np.ndarray],
+            number_of_months: Union[np.ndarray, list, float, int] = None
+    ) -> np.ndarray:
+        """
+        Gets the predictions from the intermediate arrays returned by get_intermediates.
+
+        Parameters
+        ----------
+        intermediates : Mapping[str, numpy.ndarray]
+            The intermediate arrays, by name.
+        number_of_months : Union[numpy.ndarray, list, float, int], optional
+            The number of months. It is used only for survival models.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        assert self._is_fitted, "Model must be fitted first."
+
+        capra_score = intermediates["capra_score"]
         if self.model_type == "survival":
             if number_of_months is None:
                 raise ValueError("Number of months must be given.")
             else:
-                return self.regressor.get_predicted_survival_probability(capra_score, number_of_months)
+                with stage("CapraNomogram.regressor.survival_function", rows=len(capra_score)):
+                    survival_probability = self.regressor.get_predicted_survival_probability(
+                        capra_score,
+                        number_of_months
+                    )
+                return survival_probability.astype(self.dtype, copy=False)
         elif self.model_type == "logistic":
-            return self.regressor.get_predicted_probability(capra_score)
+            with stage("CapraNomogram.regressor.predict_proba", rows=len(capra_score)):
+                probability = self.regressor.get_predicted_probability(capra_score)
+            return probability.astype(self.dtype, copy=False)
         else:
             raise ValueError(f"Model type {self.model_type} doesn't exist.")
 
     def predict_risk(
             self,
-            dataframe: pd.DataFrame
+            dataframe: Frame
     ) -> np.ndarray:
         """
         Gets the risk predictions.
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        return self.predict_risk_from_intermediates(self.get_intermediates(dataframe))
+
+    def predict_risk_from_intermediates(self, intermediates: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Gets the risk predictions from the intermediate arrays returned by get_intermediates.
+
+        Parameters
+        ----------
+        intermediates : Mapping[str, numpy.ndarray]
+            The intermediate arrays, by name.
 
         Returns
         -------
@@ -343,9 +474,205 @@ class CapraNomogram:
             The predictions.
         """
         if self.model_type == "survival":
-            capra_score = self.get_capra_score(dataframe)
-            return self.regressor.get_predicted_risk(capra_score)
+            capra_score = intermediates["capra_score"]
+            with stage("CapraNomogram.regressor.predict_risk", rows=len(capra_score)):
+                risk = self.regressor.get_predicted_risk(capra_score)
+            return risk.astype(self.dtype, copy=False)
         elif self.model_type == "logistic":
             raise ValueError("Logistic models don't have risk predictions.")
         else:
             raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def get_risk_group(self, dataframe: Frame) -> np.ndarray:
+        """
+        Gets the CAPRA risk group of each patient, i.e. low (0 to 2), intermediate (3 to 5) or high (6 to 10).
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        risk_group : numpy.ndarray
+            The risk group of each patient, as CapraRiskGroup values.
+        """
+        return get_risk_group_from_capra_score(self.get_capra_score(dataframe))
+
+    def get_survival_table(self, number_of_months: Sequence[int]) -> pd.DataFrame:
+        """
+        Gets the survival probability of each CAPRA score on a grid of horizons. The CAPRA score takes 11 values, so
+        the 11 survival curves are evaluated once and the curves of the patients are gathered from them.
+
+        Parameters
+        ----------
+        number_of_months : Sequence[int]
+            The horizons, in months.
+
+        Returns
+        -------
+        survival_table : pandas.DataFrame
+            The survival probabilities, of shape (11, number of horizons), indexed by CAPRA score.
+        """
+        assert self._is_fitted, "Model must be fitted first."
+        if self.model_type != "survival":
+            raise ValueError("Logistic models don't have survival curves.")
+
+        with stage("CapraNomogram.regressor.survival_function", rows=len(CAPRA_SCORES)):
+            survival_probability = self.regressor.get_predicted_survival_probability(
+                CAPRA_SCORES.astype(self.dtype),
+                np.asarray(number_of_months)
+            )
+
+        return pd.DataFrame(
+            survival_probability.astype(self.dtype, copy=False),
+            index=pd.Index(CAPRA_SCORES, name="CAPRA_SCORE"),
+            columns=pd.Index(number_of_months, name="MONTHS")
+        )
+
+    @staticmethod
+    def _get_capra_score_indices(capra_score: np.ndarray) -> np.ndarray:
+        """
+        Gets the row of each patient in the survival table, i.e. its integer CAPRA score.
+
+        Parameters
+        ----------
+        capra_score : numpy.ndarray
+            The CAPRA score.
+
+        Returns
+        -------
+        indices : numpy.ndarray
+            The index of the CAPRA score of each patient in CAPRA_SCORES.
+        """
+        indices = np.rint(capra_score).astype(np.int64)
+        if np.any(indices != capra_score) or np.any((indices < 0) | (indices >= len(CAPRA_SCORES))):
+            raise ValueError("CAPRA scores must be integers between 0 and 10.")
+
+        return indices
+
+    def predict_survival_curves(self, dataframe: Frame, number_of_months: Sequence[int]) -> np.ndarray:
+        """
+        Gets the survival curve of each patient on a grid of horizons, gathered from the curves of the 11 CAPRA
+        scores.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        number_of_months : Sequence[int]
+            The horizons, in months.
+
+        Returns
+        -------
+        survival_curves : numpy.ndarray
+            The survival probabilities, of shape (N, number of horizons).
+        """
+        survival_table = self.get_survival_table(number_of_months).to_numpy()
+
+        return survival_table[self._get_capra_score_indices(self.get_capra_score(dataframe))]
+
+    def stratify(self, dataframe: Frame, number_of_months: Sequence[int]) -> CapraStratification:
+        """
+        Stratifies the patients in CAPRA risk groups, and gets the survival tables of the CAPRA scores and of the
+        risk groups on a grid of horizons. The survival curve of a risk group is the mean of the curves of its
+        patients, i.e. the curves of its scores weighted by their number of patients.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        number_of_months : Sequence[int]
+            The horizons, in months.
+
+        Returns
+        -------
+        stratification : CapraStratification
+            The CAPRA score and the risk group of each patient, and the survival tables of the CAPRA scores and of
+            the risk groups (NaN for risk groups without patients).
+        """
+        capra_score = self.get_capra_score(dataframe)
+        risk_group = get_risk_group_from_capra_score(capra_score)
+        survival_table = self.get_survival_table(number_of_months)
+
+        with stage("CapraNomogram.stratify", rows=len(capra_score)):
+            scores_counts = np.bincount(self._get_capra_score_indices(capra_score), minlength=len(CAPRA_SCORES))
+            scores_groups = get_risk_group_from_capra_score(CAPRA_SCORES)
+            groups_counts = np.bincount(scores_groups, weights=scores_counts, minlength=len(CapraRiskGroup))
+            groups_survival = np.zeros((len(CapraRiskGroup), survival_table.shape[1]))
+            np.add.at(groups_survival, scores_groups, scores_counts[:, np.newaxis]*survival_table.to_numpy())
+            with np.errstate(divide="ignore", invalid="ignore"):
+                groups_survival /= groups_counts[:, np.newaxis]
+
+        risk_groups_survival_table = pd.DataFrame(
+            groups_survival.astype(self.dtype, copy=False),
+            index=pd.Index([group.name for group in CapraRiskGroup], name="RISK_GROUP"),
+            columns=survival_table.columns
+        )
+
+        return CapraStratification(
+            capra_score=capra_score,
+            risk_group=risk_group,
+            survival_table=survival_table,
+            risk_groups_survival_table=risk_groups_survival_table
+        )
+
+    def freeze(self) -> FrozenNomogram:
+        """
+        Gets an immutable inference object of the fitted nomogram that can be shared across threads. It holds its
+        own copy of the fitted estimators, so fitting the nomogram again does not change it. See FrozenNomogram.
+
+        Returns
+        -------
+        frozen_nomogram : FrozenNomogram
+            The frozen nomogram.
+        """
+        assert self._is_fitted, "Model must be fitted first."
+
+        nomogram = copy.copy(self)
+        nomogram.regressor = copy.deepcopy(self.regressor)
+
+        return FrozenNomogram(nomogram)
+
+    def check_precision(
+            self,
+            dataframe: Frame,
+            number_of_months: Union[np.ndarray, list, float, int] = 60,
+            sample_size: int = 1000,
+            tolerance: float = 1e-3,
+            random_state: int = 0
+    ) -> PrecisionReport:
+        """
+        Measures the maximum absolute deviation between the predictions computed with the dtype of the nomogram and
+        the predictions computed with float64, on a random sample of the patients.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        number_of_months : Union[numpy.ndarray, list, float, int]
+            The number of months. It is used only for survival models.
+        sample_size : int
+            The number of patients in the sample.
+        tolerance : float
+            The maximum absolute deviation considered acceptable.
+        random_state : int
+            Random state used to sample the patients.
+
+        Returns
+        -------
+        report : PrecisionReport
+            The precision report.
+        """
+        reference_nomogram = copy.copy(self)
+        reference_nomogram.dtype = np.dtype(np.float64)
+
+        return check_precision(
+            nomogram=self,
+            reference_nomogram=reference_nomogram,
+            dataframe=dataframe,
+            number_of_months=number_of_months,
+            sample_size=sample_size,
+            tolerance=tolerance,
+            random_state=random_state
+        )
@@ -0,0 +1,455 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .frames import Frame, get_column
+from .profiling import stage
+from .results_sink import iterate_results
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative accuracy guarantee (DDSketch). The values are counted in logarithmic
+    buckets, so that any quantile is estimated within the given relative error, in a memory bounded by the range of
+    the values instead of their number. While all the values are in [0, 1], e.g. probabilities, the complements 1 - p
+    are also sketched and the quantiles above 0.5 are estimated from them, so that the error is relative to
+    min(p, 1 - p) and a survival probability of 0.999 is not reported as 0.99.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, minimum_value: float = 1e-9):
+        """
+        Initializes the buckets.
+
+        Parameters
+        ----------
+        relative_accuracy : float
+            The relative accuracy of the estimated quantiles.
+        minimum_value : float
+            The smallest absolute value distinguished from zero.
+        """
+        assert 0 < relative_accuracy < 1, "The relative accuracy must be between 0 and 1."
+
+        self.relative_accuracy = relative_accuracy
+        self.minimum_value = minimum_value
+        self.count = 0
+        self.zero_count = 0
+        self.positive_buckets: Dict[int, int] = {}
+        self.negative_buckets: Dict[int, int] = {}
+        self.is_unit_interval = True
+        self.complement: Optional[QuantileSketch] = None
+
+        self._gamma = (1 + relative_accuracy)/(1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+
+    @staticmethod
+    def _add_to_buckets(buckets: Dict[int, int], keys: np.ndarray) -> None:
+        """
+        Counts bucket keys.
+
+        Parameters
+        ----------
+        buckets : Dict[int, int]
+            The count of each bucket, by key.
+        keys : numpy.ndarray
+            The bucket keys of the values.
+        """
+        for key, count in zip(*np.unique(keys, return_counts=True)):
+            buckets[int(key)] = buckets.get(int(key), 0) + int(count)
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Adds values to the sketch. NaN values are ignored.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            The values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if self.is_unit_interval and len(values):
+            if np.all((values >= 0) & (values <= 1)):
+                if self.complement is None:
+                    self.complement = self._create_complement()
+                self.complement.update(1 - values)
+            else:
+                self.is_unit_interval, self.complement = False, None
+
+        absolute_values = np.abs(values)
+        is_zero = absolute_values <= self.minimum_value
+
+        keys = np.ceil(np.log(np.where(is_zero, 1, absolute_values))/self._log_gamma).astype(np.int64)
+        self._add_to_buckets(self.positive_buckets, keys[(values > 0) & ~is_zero])
+        self._add_to_buckets(self.negative_buckets, keys[(values < 0) & ~is_zero])
+        self.zero_count += int(np.count_nonzero(is_zero))
+        self.count += len(values)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Adds the values of another sketch with the same relative accuracy, e.g. the sketch of another chunk.
+
+        Parameters
+        ----------
+        other : QuantileSketch
+            The other sketch.
+        """
+        assert other.relative_accuracy == self.relative_accuracy, "The sketches must have the same relative accuracy."
+
+        for buckets, other_buckets in ((self.positive_buckets, other.positive_buckets),
+                                       (self.negative_buckets, other.negative_buckets)):
+            for key, count in other_buckets.items():
+                buckets[key] = buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+        if self.is_unit_interval and other.is_unit_interval:
+            if other.complement is not None:
+                if self.complement is None:
+                    self.complement = self._create_complement()
+                self.complement.merge(other.complement)
+        else:
+            self.is_unit_interval, self.complement = False, None
+
+    def _create_complement(self) -> "QuantileSketch":
+        """
+        Creates the sketch of the complements of the values, which has no complement itself.
+
+        Returns
+        -------
+        complement : QuantileSketch
+            The empty sketch of the complements.
+        """
+        complement = QuantileSketch(self.relative_accuracy, self.minimum_value)
+        complement.is_unit_interval = False
+
+        return complement
+
+    def get_quantiles(self, quantiles: Sequence[float]) -> np.ndarray:
+        """
+        Estimates quantiles of the values. While all the values are in [0, 1], the quantiles estimated above 0.5 are
+        the complements of the quantiles of the complements.
+
+        Parameters
+        ----------
+        quantiles : Sequence[float]
+            The quantiles, between 0 and 1.
+
+        Returns
+        -------
+        values : numpy.ndarray
+            The estimated quantiles, NaN if the sketch is empty.
+        """
+        if self.count == 0:
+            return np.full(len(quantiles), np.nan)
+
+        negative_keys = sorted(self.negative_buckets, reverse=True)
+        positive_keys = sorted(self.positive_buckets)
+        keys = np.array(negative_keys + [0] + positive_keys, dtype=np.float64)
+        signs = np.array([-1.0]*len(negative_keys) + [0.0] + [1.0]*len(positive_keys))
+        counts = np.array(
+            [self.negative_buckets[key] for key in negative_keys] + [self.zero_count]
+            + [self.positive_buckets[key] for key in positive_keys]
+        )
+        bucket_values = signs*2*self._gamma**keys/(self._gamma + 1)
+
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        ranks = quantiles*(self.count - 1)
+        values = bucket_values[np.searchsorted(np.cumsum(counts), ranks, side="right")]
+        if self.complement is not None:
+            values = np.where(values > 0.5, 1 - self.complement.get_quantiles(1 - quantiles), values)
+
+        return values
+
+
+class CohortAggregator:
+    """
+    Streaming summaries of predictions (e.g. risk group counts, mean predicted probability by site, distribution of
+    the CAPRA scores), updated chunk by chunk as the predictions are produced, so that the summaries of arbitrarily
+    large cohorts are computed in a memory independent of the number of patients. For each column and group, it
+    accumulates the counts, sums, sums of squares, extrema, a histogram and a quantile sketch.
+    """
+
+    def __init__(
+            self,
+            group_by_column_name: Optional[str] = None,
+            bins: Optional[Union[Sequence[float], Mapping[str, Sequence[float]]]] = None,
+            relative_accuracy: float = 0.01
+    ):
+        """
+        Initializes the accumulators.
+
+        Parameters
+        ----------
+        group_by_column_name : Optional[str]
+            Name of the column of the patients data defining the groups, e.g. the site. Defaults to a single group.
+        bins : Optional[Union[Sequence[float], Mapping[str, Sequence[float]]]]
+            The edges of the histogram bins (e.g. risk groups thresholds), for all the columns or by column name.
+            Each bin includes its left edge, and the values below the first edge or at or above the last edge are
+            counted in two additional bins. Columns without edges have no histogram.
+        relative_accuracy : float
+            The relative accuracy of the quantile sketches.
+        """
+        self.group_by_column_name = group_by_column_name
+        self.bins = bins
+        self.relative_accuracy = relative_accuracy
+
+        self.groups: List[Any] = []
+        self._groups_indices: Dict[Any, int] = {}
+        self._accumulators: Dict[str, Dict[str, Any]] = {}
+
+    def _get_bins(self, column_name: str) -> Optional[np.ndarray]:
+        """
+        Gets the edges of the histogram bins of a column.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+
+        Returns
+        -------
+        bins : Optional[numpy.ndarray]
+            The edges of the bins, or None if the column has no histogram.
+        """
+        if isinstance(self.bins, Mapping):
+            bins = self.bins.get(column_name)
+        else:
+            bins = self.bins
+
+        return None if bins is None else np.asarray(bins, dtype=np.float64)
+
+    def _get_groups_codes(self, chunk: Frame, number_of_rows: int) -> np.ndarray:
+        """
+        Gets the group of each row of a chunk, as indices in groups, adding the groups seen for the first time.
+
+        Parameters
+        ----------
+        chunk : Frame
+            The chunk of the patients data.
+        number_of_rows : int
+            The number of rows of the chunk.
+
+        Returns
+        -------
+        codes : numpy.ndarray
+            The index of the group of each row.
+        """
+        if self.group_by_column_name is None:
+            if not self.groups:
+                self.groups.append(None)
+                self._groups_indices[None] = 0
+            return np.zeros(number_of_rows, dtype=np.int64)
+
+        codes, uniques = pd.factorize(np.asarray(get_column(chunk, self.group_by_column_name)), use_na_sentinel=False)
+        groups_indices = np.empty(len(uniques), dtype=np.int64)
+        for index, group in enumerate(uniques):
+            group = None if pd.isna(group) else group
+            if group not in self._groups_indices:
+                self._groups_indices[group] = len(self.groups)
+                self.groups.append(group)
+            groups_indices[index] = self._groups_indices[group]
+
+        return groups_indices[codes]
+
+    def _get_accumulator(self, column_name: str) -> Dict[str, Any]:
+        """
+        Gets the accumulators of a column, with one entry per group.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+
+        Returns
+        -------
+        accumulator : Dict[str, Any]
+            The accumulators, by name.
+        """
+        accumulator = self._accumulators.get(column_name)
+        if accumulator is None:
+            bins = self._get_bins(column_name)
+            accumulator = self._accumulators[column_name] = {
+                "count": np.zeros(0, dtype=np.int64),
+                "missing": np.zeros(0, dtype=np.int64),
+                "sum": np.zeros(0),
+                "sum_of_squares": np.zeros(0),
+                "min": np.zeros(0),
+                "max": np.zeros(0),
+                "histogram": None if bins is None else np.zeros((0, len(bins) + 1), dtype=np.int64),
+                "sketches": []
+            }
+
+        number_of_groups, number_of_new_groups = len(self.groups), len(self.groups) - len(accumulator["count"])
+        if number_of_new_groups:
+            for name, initial_value in (("count", 0), ("missing", 0), ("sum", 0), ("sum_of_squares", 0),
+                                        ("min", np.inf), ("max", -np.inf)):
+                accumulator[name] = np.concatenate(
+                    [accumulator[name], np.full(number_of_new_groups, initial_value, dtype=accumulator[name].dtype)]
+                )
+            if accumulator["histogram"] is not None:
+                accumulator["histogram"] = np.concatenate(
+                    [accumulator["histogram"], np.zeros((number_of_new_groups, ) + accumulator["histogram"].shape[1:],
+                                                        dtype=np.int64)]
+                )
+            accumulator["sketches"] += [
+                QuantileSketch(self.relative_accuracy) for _ in range(number_of_groups - len(accumulator["sketches"]))
+            ]
+
+        return accumulator
+
+    def update(self, chunk: Frame, predictions: Mapping[str, np.ndarray]) -> None:
+        """
+        Updates the summaries with the predictions of a chunk of patients.
+
+        Parameters
+        ----------
+        chunk : Frame
+            The chunk of the patients data, used to get the groups of the rows.
+        predictions : Mapping[str, numpy.ndarray]
+            The predictions of the chunk (or any other per-patient values, e.g. CAPRA scores), by column name.
+        """
+        if not predictions:
+            return
+
+        number_of_rows = len(next(iter(predictions.values())))
+        with stage("CohortAggregator.update", rows=number_of_rows):
+            codes = self._get_groups_codes(chunk, number_of_rows)
+            number_of_groups = len(self.groups)
+            for column_name, values in predictions.items():
+                accumulator = self._get_accumulator(column_name)
+                values = np.asarray(values, dtype=np.float64)
+                is_missing = np.isnan(values)
+                valid_codes, valid_values = codes[~is_missing], values[~is_missing]
+
+                accumulator["missing"] += np.bincount(codes[is_missing], minlength=number_of_groups)
+                accumulator["count"] += np.bincount(valid_codes, minlength=number_of_groups)
+                accumulator["sum"] += np.bincount(valid_codes, valid_values, minlength=number_of_groups)
+                accumulator["sum_of_squares"] += np.bincount(valid_codes, valid_values**2, minlength=number_of_groups)
+                np.minimum.at(accumulator["min"], valid_codes, valid_values)
+                np.maximum.at(accumulator["max"], valid_codes, valid_values)
+
+                bins = self._get_bins(column_name)
+                if bins is not None:
+                    number_of_bins = len(bins) + 1
+                    bins_indices = np.searchsorted(bins, valid_values, side="right")
+                    accumulator["histogram"] += np.bincount(
+                        valid_codes*number_of_bins + bins_indices,
+                        minlength=number_of_groups*number_of_bins
+                    ).reshape(number_of_groups, number_of_bins)
+
+                order = np.argsort(valid_codes, kind="stable")
+                groups_starts = np.searchsorted(valid_codes[order], np.arange(number_of_groups + 1))
+                for group_index in range(number_of_groups):
+                    start, stop = groups_starts[group_index], groups_starts[group_index + 1]
+                    if stop > start:
+                        accumulator["sketches"][group_index].update(valid_values[order[start:stop]])
+
+    def summary(self, quantiles: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> pd.DataFrame:
+        """
+        Gets the summary of each column and group.
+
+        Parameters
+        ----------
+        quantiles : Sequence[float]
+            The quantiles estimated with the quantile sketches.
+
+        Returns
+        -------
+        summary : pandas.DataFrame
+            The count, number of missing values, mean, standard deviation, minimum, maximum and quantiles of each
+            column and group, indexed by column name and group.
+        """
+        rows, index = [], []
+        for column_name, accumulator in self._accumulators.items():
+            accumulator = self._get_accumulator(column_name)
+            count = accumulator["count"]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = accumulator["sum"]/count
+                variance = (accumulator["sum_of_squares"] - count*mean**2)/(count - 1)
+            for group_index, group in enumerate(self.groups):
+                row = {
+                    "count": count[group_index],
+                    "missing": accumulator["missing"][group_index],
+                    "mean": mean[group_index],
+                    "std": np.sqrt(max(variance[group_index], 0)) if count[group_index] > 1 else np.nan,
+                    "min": accumulator["min"][group_index] if count[group_index] else np.nan,
+                    "max": accumulator["max"][group_index] if count[group_index] else np.nan
+                }
+                sketch_quantiles = accumulator["sketches"][group_index].get_quantiles(quantiles)
+                row.update({f"quantile_{quantile:g}": value for quantile, value in zip(quantiles, sketch_quantiles)})
+                rows.append(row)
+                index.append((column_name, group))
+
+        names = ["column", self.group_by_column_name or "group"]
+        return pd.DataFrame(rows, index=pd.MultiIndex.from_tuples(index, names=names))
+
+    def get_histogram(self, column_name: str) -> pd.DataFrame:
+        """
+        Gets the histogram of a column, e.g. the number of patients in each risk group.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+
+        Returns
+        -------
+        histogram : pandas.DataFrame
+            The number of values in each bin (columns) for each group (rows). The first and last bins are the values
+            below the first edge and at or above the last edge.
+        """
+        bins = self._get_bins(column_name)
+        if column_name not in self._accumulators or bins is None:
+            raise ValueError(f"Column {column_name} has no histogram.")
+
+        columns = pd.IntervalIndex.from_breaks(np.concatenate([[-np.inf], bins, [np.inf]]), closed="left")
+        return pd.DataFrame(
+            self._get_accumulator(column_name)["histogram"],
+            index=pd.Index(self.groups, name=self.group_by_column_name or "group"),
+            columns=columns
+        )
+
+
+def aggregate_results(
+        aggregator: CohortAggregator,
+        nomograms: Sequence[Any],
+        dataframe: Frame,
+        number_of_months: Sequence[int],
+        include_risk: bool = True,
+        chunk_size: int = 65_536,
+        derived_columns: Optional[Mapping[str, Callable[[Frame], np.ndarray]]] = None
+) -> CohortAggregator:
+    """
+    Scores the patients with all the nomograms and horizons, chunk of rows by chunk of rows, and updates the cohort
+    summaries with the predictions of each chunk, without keeping the predictions.
+
+    Parameters
+    ----------
+    aggregator : CohortAggregator
+        The aggregator.
+    nomograms : Sequence[Any]
+        The nomograms, e.g. MSKCC nomograms or fitted CapraNomogram.
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    number_of_months : Sequence[int]
+        The horizons, in months, of the survival models.
+    include_risk : bool
+        Whether to include the risk of the survival models.
+    chunk_size : int
+        The number of rows scored at once.
+    derived_columns : Optional[Mapping[str, Callable[[Frame], numpy.ndarray]]]
+        Other per-patient values to summarize, computed from each chunk, by column name, e.g.
+        {"CAPRA_SCORE": capra_nomogram.get_capra_score}.
+
+    Returns
+    -------
+    aggregator : CohortAggregator
+        The updated aggregator.
+    """
+    for _, chunk, predictions in iterate_results(nomograms, dataframe, number_of_months, include_risk, chunk_size):
+        for column_name, get_values in (derived_columns or {}).items():
+            predictions[column_name] = get_values(chunk)
+        aggregator.update(chunk, predictions)
+
+    return aggregator
@@ -1,4 +1,7 @@
+from typing import Union
+
 import numpy as np
+from scipy import sparse
 from sklearn.linear_model import LogisticRegression as SklearnLogisticRegression
 
 
@@ -17,7 +20,7 @@ class LogisticRegression:
 
     def fit(
             self,
-            features: np.ndarray,
+            features: Union[np.ndarray, sparse.spmatrix],
             target: np.ndarray
     ):
         """
@@ -25,8 +28,8 @@ class LogisticRegression:
 
         Parameters
         ----------
-        features : numpy.ndarray
-            The features.
+        features : Union[numpy.ndarray, scipy.sparse.spmatrix]
+            The features, dense or sparse.
         target : numpy.ndarray
             The outcome.
         """
@@ -34,15 +37,15 @@ class LogisticRegression:
 
     def get_predicted_probability(
             self,
-            features: np.ndarray,
+            features: Union[np.ndarray, sparse.spmatrix],
     ) -> np.array:
         """
         Gets the predicted result.
 
         Parameters
         ----------
-        features : numpy.ndarray
-            The features.
+        features : Union[numpy.ndarray, scipy.sparse.spmatrix]
+            The features, dense or sparse.
 
         Returns
         -------
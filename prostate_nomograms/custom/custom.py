@@ -1,13 +1,30 @@
-from typing import List, Optional, Union
+import copy
+from typing import List, Mapping, Optional, Tuple, Union
 
-import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
+from numpy.typing import DTypeLike
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
 from ..enum import ClassificationOutcome, SurvivalOutcome
+from ..frames import Frame, get_column, get_number_of_rows
+from ..frozen import FrozenNomogram
+from ..imputation import (
+    get_imputed_values,
+    get_number_of_imputations,
+    ImputedPredictions,
+    pool_predictions,
+    PoolingScale
+)
+from ..precision import check_precision, PrecisionReport
+from ..profiling import stage
 from .base import LogisticRegression, SurvivalRegression
 
 
+SPARSE_DENSITY_THRESHOLD: float = 0.25
+
+
 class CustomNomogram:
     """
     Custom model. It can be used to create a nomogram with a custom model.
@@ -20,7 +37,9 @@ class CustomNomogram:
             target_column_name: Optional[str] = None,
             event_indicator_column_name: Optional[str] = None,
             event_time_column_name: Optional[str] = None,
-            random_state: int = 0
+            categorical_column_names: Optional[List[str]] = None,
+            random_state: int = 0,
+            dtype: DTypeLike = np.float64
     ):
         """
         Initializes columns names.
@@ -37,8 +56,15 @@ class CustomNomogram:
             Name of the column containing the event indicator of the patients.
         event_time_column_name : Optional[str]
             Name of the column containing the event time of the patients.
+        categorical_column_names : Optional[List[str]]
+            Names of the features columns containing categorical values, e.g. the clinical stage. They are one-hot
+            encoded in a sparse matrix, with a column per category seen during the fit. Unknown categories are
+            encoded as zeros.
         random_state : int, optional
             Random state.
+        dtype : DTypeLike
+            Floating point type of the features and of the predictions, e.g. numpy.float32 to halve the memory used by
+            the features and the predictions. The regressor is fitted and evaluated in its own precision.
         """
         if outcome in ClassificationOutcome:
             self.outcome = ClassificationOutcome(outcome)
@@ -51,9 +77,17 @@ class CustomNomogram:
         self.event_indicator_column_name = event_indicator_column_name
         self.event_time_column_name = event_time_column_name
         self.features_column_names = features_column_names
+        self.categorical_column_names = list(categorical_column_names or [])
+        assert set(self.categorical_column_names) <= set(features_column_names), (
+            "Categorical columns must be features columns."
+        )
 
+        self.dtype = np.dtype(dtype)
         self._is_fitted = False
         self._scaler = StandardScaler()
+        self._scaled_columns_indices = np.zeros(0, dtype=np.int64)
+        self._encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=True, dtype=self.dtype)
+        self._is_sparse = False
 
         if self.model_type == "survival":
             assert self.event_indicator_column_name is not None, (
@@ -115,54 +149,205 @@ class CustomNomogram:
         """
         return self.features_column_names
 
-    def get_features(self, dataframe: pd.DataFrame) -> np.ndarray:
+    @property
+    def inputs_column_names(self) -> Tuple[str, ...]:
+        """
+        Names of the columns used to compute the predictions, i.e. the features columns.
+
+        Returns
+        -------
+        inputs_column_names : Tuple[str, ...]
+            Names of the columns used to compute the predictions.
+        """
+        return tuple(self.columns)
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        """
+        Returns the numeric columns of the model, i.e. the columns that are not categorical.
+
+        Returns
+        -------
+        numeric_columns : List[str]
+            The numeric columns of the model.
+        """
+        return [column for column in self.columns if column not in self.categorical_column_names]
+
+    def get_features(self, dataframe: Frame) -> np.ndarray:
+        """
+        Returns the numeric features of the patients. The categorical columns are encoded separately.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        features : np.ndarray
+            The numeric features of the patients.
+        """
+        number_of_rows = get_number_of_rows(dataframe)
+        with stage("CustomNomogram.get_features", rows=number_of_rows):
+            columns = [get_column(dataframe, column) for column in self.numeric_columns]
+            if not columns:
+                return np.zeros((number_of_rows, 0), dtype=self.dtype)
+            return np.stack(columns, axis=1, dtype=self.dtype)
+
+    def _get_categorical_features(self, dataframe: Frame) -> np.ndarray:
+        """
+        Returns the categorical features of the patients. Missing values, i.e. NaN in pandas DataFrames and None in
+        pyarrow and polars frames, are all NaN, so that the encoder maps them to the same category whatever the frame
+        types of the fit and of the predictions.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        features : np.ndarray
+            The categorical features of the patients, as objects.
+        """
+        with stage("CustomNomogram.get_categorical_features", rows=get_number_of_rows(dataframe)):
+            columns = [get_column(dataframe, column) for column in self.categorical_column_names]
+            columns = [np.asarray(column, dtype=object) for column in columns]
+            return np.stack([np.where(pd.isna(column), np.nan, column) for column in columns], axis=1)
+
+    def _scale(self, features: np.ndarray) -> np.ndarray:
         """
-        Returns the features of the patients.
+        Scales the numeric features in place by the scaler fitted on the training dataset. Binary columns, i.e.
+        columns of zeros and ones in the training dataset, are not scaled.
 
         Parameters
         ----------
-        dataframe : pd.DataFrame
-            Dataframe containing the data of the patients.
+        features : np.ndarray
+            The numeric features of the patients.
 
         Returns
         -------
         features : np.ndarray
+            The scaled numeric features of the patients.
+        """
+        if len(self._scaled_columns_indices):
+            with stage("CustomNomogram.scaler.transform", rows=features.shape[0]):
+                indices = self._scaled_columns_indices
+                features[:, indices] = self._scaler.transform(features[:, indices])
+
+        return features
+
+    def _assemble(
+            self,
+            numeric_features: np.ndarray,
+            categorical_features: Optional[sparse.csr_matrix]
+    ) -> Union[np.ndarray, sparse.csr_matrix]:
+        """
+        Assembles the scaled numeric features and the one-hot encoded categorical features. The features of logistic
+        models are a sparse matrix if the model has categorical columns or if the fraction of nonzero numeric features
+        in the training dataset is below SPARSE_DENSITY_THRESHOLD, so that their memory scales with the number of
+        nonzero values, and a dense array otherwise, since a CSR matrix takes more memory than a dense array when most
+        values are nonzero. The features of survival models are always a dense array, since the Coxnet model does not
+        support sparse matrices, and only their one-hot encoded block is densified.
+
+        Parameters
+        ----------
+        numeric_features : np.ndarray
+            The scaled numeric features of the patients.
+        categorical_features : Optional[scipy.sparse.csr_matrix]
+            The one-hot encoded categorical features of the patients, or None if the model has no categorical column.
+
+        Returns
+        -------
+        features : Union[np.ndarray, scipy.sparse.csr_matrix]
             The features of the patients.
         """
-        dataframe = dataframe[self.columns]
-        return np.array(dataframe)
+        if not self._is_sparse:
+            if categorical_features is None:
+                return numeric_features
+            return np.hstack([numeric_features, categorical_features.toarray()])
+
+        blocks = [sparse.csr_matrix(numeric_features)]
+        if categorical_features is not None:
+            blocks.append(categorical_features)
+
+        return sparse.hstack(blocks, format="csr", dtype=self.dtype)
+
+    def _get_scaled_features(self, dataframe: Frame) -> Union[np.ndarray, sparse.csr_matrix]:
+        """
+        Returns the features of the patients, i.e. the numeric features scaled by the scaler fitted on the training
+        dataset, except binary columns, followed by the one-hot encoded categorical features.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        features : Union[np.ndarray, scipy.sparse.csr_matrix]
+            The scaled features of the patients.
+        """
+        numeric_features = self._scale(self.get_features(dataframe))
+        categorical_features = None
+        if self.categorical_column_names:
+            categorical_features = self._get_categorical_features(dataframe)
+            with stage("CustomNomogram.encoder.transform", rows=len(categorical_features)):
+                categorical_features = self._encoder.transform(categorical_features)
+
+        return self._assemble(numeric_features, categorical_features)
 
     def fit(
             self,
-            dataset: pd.DataFrame
+            dataset: Frame
     ):
         """
         Fits the model.
 
         Parameters
         ----------
-        dataset : pd.DataFrame
-            Dataframe containing the data of the patients.
+        dataset : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         """
-        features = self.get_features(dataset)
-        features = self._scaler.fit_transform(features)
-        if self.model_type == "survival":
-            self.regressor.fit(
-                features,
-                np.array(dataset[self.event_indicator_column_name], dtype=bool),
-                np.array(dataset[self.event_time_column_name], dtype=float)
-            )
-        else:
-            self.regressor.fit(
-                features,
-                np.array(dataset[self.target_column_name])
-            )
+        numeric_features = self.get_features(dataset)
+        is_binary = np.all((numeric_features == 0) | (numeric_features == 1), axis=0)
+        self._scaled_columns_indices = np.flatnonzero(~is_binary)
+
+        if len(self._scaled_columns_indices):
+            with stage("CustomNomogram.scaler.fit_transform", rows=len(numeric_features)):
+                indices = self._scaled_columns_indices
+                numeric_features[:, indices] = self._scaler.fit_transform(numeric_features[:, indices])
+
+        density = np.count_nonzero(numeric_features)/numeric_features.size if numeric_features.size else 0.0
+        self._is_sparse = self.model_type == "logistic" and (
+            bool(self.categorical_column_names) or density < SPARSE_DENSITY_THRESHOLD
+        )
+
+        categorical_features = None
+        if self.categorical_column_names:
+            categorical_features = self._get_categorical_features(dataset)
+            with stage("CustomNomogram.encoder.fit_transform", rows=len(categorical_features)):
+                categorical_features = self._encoder.fit_transform(categorical_features)
+
+        features = self._assemble(numeric_features, categorical_features)
+        with stage("CustomNomogram.regressor.fit", rows=features.shape[0]):
+            if self.model_type == "survival":
+                self.regressor.fit(
+                    features,
+                    np.array(get_column(dataset, self.event_indicator_column_name), dtype=bool),
+                    np.array(get_column(dataset, self.event_time_column_name), dtype=float)
+                )
+            else:
+                self.regressor.fit(
+                    features,
+                    np.array(get_column(dataset, self.target_column_name))
+                )
 
         self._is_fitted = True
 
     def predict_proba(
             self,
-            dataframe: pd.DataFrame,
+            dataframe: Frame,
             number_of_months: Union[np.ndarray, list, float, int] = None
     ) -> np.ndarray:
         """
@@ -170,8 +355,8 @@ class CustomNomogram:
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         number_of_months : Union[numpy.ndarray, list, float, int], optional
             The number of months. It is used only for survival models.
 
@@ -182,29 +367,35 @@ class CustomNomogram:
         """
         assert self._is_fitted, "Model must be fitted first."
 
-        features = self.get_features(dataframe)
-        features = self._scaler.transform(features)
+        features = self._get_scaled_features(dataframe)
         if self.model_type == "survival":
             if number_of_months is None:
                 raise ValueError("Number of months must be given.")
             else:
-                return self.regressor.get_predicted_survival_probability(features, number_of_months)
+                with stage("CustomNomogram.regressor.survival_function", rows=features.shape[0]):
+                    survival_probability = self.regressor.get_predicted_survival_probability(
+                        features,
+                        number_of_months
+                    )
+                return survival_probability.astype(self.dtype, copy=False)
         elif self.model_type == "logistic":
-            return self.regressor.get_predicted_probability(features)
+            with stage("CustomNomogram.regressor.predict_proba", rows=features.shape[0]):
+                probability = self.regressor.get_predicted_probability(features)
+            return probability.astype(self.dtype, copy=False)
         else:
             raise ValueError(f"Model type {self.model_type} doesn't exist.")
 
     def predict_risk(
             self,
-            dataframe: pd.DataFrame
+            dataframe: Frame
     ) -> np.ndarray:
         """
         Gets the risk predictions.
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
 
         Returns
         -------
@@ -212,10 +403,208 @@ class CustomNomogram:
             The predictions.
         """
         if self.model_type == "survival":
-            features = self.get_features(dataframe)
-            features = self._scaler.transform(features)
-            return self.regressor.get_predicted_risk(features)
+            features = self._get_scaled_features(dataframe)
+            with stage("CustomNomogram.regressor.predict_risk", rows=features.shape[0]):
+                risk = self.regressor.get_predicted_risk(features)
+            return risk.astype(self.dtype, copy=False)
         elif self.model_type == "logistic":
             raise ValueError("Logistic models don't have risk predictions.")
         else:
             raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def _get_scaled_features_imputed(
+            self,
+            dataframe: Frame,
+            imputations: Mapping[str, np.ndarray]
+    ) -> Union[np.ndarray, sparse.csr_matrix]:
+        """
+        Returns the scaled features of the patients in each imputation, stacked patient by patient. The features are
+        read and scaled once, and only the imputed columns are scaled for each imputation.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        imputations : Mapping[str, numpy.ndarray]
+            The imputed values of each column, by column name, of shape (N, M).
+
+        Returns
+        -------
+        features : Union[np.ndarray, scipy.sparse.csr_matrix]
+            The scaled features, of shape (N*M, number of features), the M imputations of each patient being
+            consecutive rows.
+        """
+        number_of_imputations = get_number_of_imputations(imputations)
+        numeric_features = self._scale(self.get_features(dataframe))
+        number_of_rows = len(numeric_features)
+        with stage("CustomNomogram.get_features_imputed", rows=number_of_rows*number_of_imputations):
+            numeric_features = np.repeat(numeric_features, number_of_imputations, axis=0)
+            for column_name, imputed in imputations.items():
+                if column_name not in self.numeric_columns:
+                    raise ValueError(f"Column {column_name} is not a numeric column of the model {self.outcome}.")
+                column_index = self.numeric_columns.index(column_name)
+                values = get_imputed_values(get_column(dataframe, column_name), imputed).astype(self.dtype).ravel()
+                if column_index in self._scaled_columns_indices:
+                    scaler_index = np.searchsorted(self._scaled_columns_indices, column_index)
+                    values = (values - self._scaler.mean_[scaler_index])/self._scaler.scale_[scaler_index]
+                numeric_features[:, column_index] = values
+
+        categorical_features = None
+        if self.categorical_column_names:
+            categorical_features = self._encoder.transform(self._get_categorical_features(dataframe))
+            categorical_features = categorical_features[np.repeat(np.arange(number_of_rows), number_of_imputations)]
+
+        return self._assemble(numeric_features, categorical_features)
+
+    def predict_proba_imputed(
+            self,
+            dataframe: Frame,
+            imputations: Mapping[str, np.ndarray],
+            number_of_months: Union[float, int] = None,
+            confidence_level: float = 0.95
+    ) -> ImputedPredictions:
+        """
+        Gets the predictions of patients with multiply imputed missing values, pooled with Rubin's rules. Only the
+        imputed columns are given for each imputation, and all the imputations are scored by a single call to the
+        regressor, without copying the dataframe. The probabilities of logistic models are pooled on the logit scale
+        and the survival probabilities of Cox models on the complementary log-log scale, on which they are linear in
+        the linear predictor.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        imputations : Mapping[str, numpy.ndarray]
+            The imputed values of each column with missing values, by column name, of shape (N, M) where M is the
+            number of imputations. The observed values of the dataframe are used where they are not missing.
+        number_of_months : Union[float, int], optional
+            The number of months. It is used only for survival models.
+        confidence_level : float
+            The confidence level of the confidence interval of the pooled predictions.
+
+        Returns
+        -------
+        predictions : ImputedPredictions
+            The pooled predictions, the bounds of their confidence interval and the predictions of each imputation.
+        """
+        assert self._is_fitted, "Model must be fitted first."
+
+        number_of_imputations = get_number_of_imputations(imputations)
+        features = self._get_scaled_features_imputed(dataframe, imputations)
+        if self.model_type == "survival":
+            if number_of_months is None:
+                raise ValueError("Number of months must be given.")
+            assert np.ndim(number_of_months) == 0, "The number of months must be the same for all the patients."
+            with stage("CustomNomogram.regressor.survival_function", rows=features.shape[0]):
+                replicates = self.regressor.get_predicted_survival_probability(features, number_of_months)
+            scale = PoolingScale.COMPLEMENTARY_LOG_LOG
+        elif self.model_type == "logistic":
+            with stage("CustomNomogram.regressor.predict_proba", rows=features.shape[0]):
+                replicates = self.regressor.get_predicted_probability(features)
+            scale = PoolingScale.LOGIT
+        else:
+            raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+        replicates = replicates.astype(self.dtype, copy=False).reshape(-1, number_of_imputations)
+
+        return pool_predictions(replicates, scale, confidence_level)
+
+    def predict_risk_imputed(
+            self,
+            dataframe: Frame,
+            imputations: Mapping[str, np.ndarray],
+            confidence_level: float = 0.95
+    ) -> ImputedPredictions:
+        """
+        Gets the risk predictions of patients with multiply imputed missing values, pooled with Rubin's rules.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        imputations : Mapping[str, numpy.ndarray]
+            The imputed values of each column with missing values, by column name, of shape (N, M) where M is the
+            number of imputations. The observed values of the dataframe are used where they are not missing.
+        confidence_level : float
+            The confidence level of the confidence interval of the pooled predictions.
+
+        Returns
+        -------
+        predictions : ImputedPredictions
+            The pooled risk predictions, the bounds of their confidence interval and the predictions of each
+            imputation.
+        """
+        if self.model_type == "survival":
+            number_of_imputations = get_number_of_imputations(imputations)
+            features = self._get_scaled_features_imputed(dataframe, imputations)
+            with stage("CustomNomogram.regressor.predict_risk", rows=features.shape[0]):
+                replicates = self.regressor.get_predicted_risk(features)
+            replicates = replicates.astype(self.dtype, copy=False).reshape(-1, number_of_imputations)
+
+            return pool_predictions(replicates, PoolingScale.IDENTITY, confidence_level)
+        elif self.model_type == "logistic":
+            raise ValueError("Logistic models don't have risk predictions.")
+        else:
+            raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def freeze(self) -> FrozenNomogram:
+        """
+        Gets an immutable inference object of the fitted nomogram that can be shared across threads. It holds its
+        own copy of the fitted estimators, so fitting the nomogram again does not change it. See FrozenNomogram.
+
+        Returns
+        -------
+        frozen_nomogram : FrozenNomogram
+            The frozen nomogram.
+        """
+        assert self._is_fitted, "Model must be fitted first."
+
+        nomogram = copy.copy(self)
+        nomogram.regressor = copy.deepcopy(self.regressor)
+        nomogram._scaler = copy.deepcopy(self._scaler)
+        nomogram._encoder = copy.deepcopy(self._encoder)
+
+        return FrozenNomogram(nomogram)
+
+    def check_precision(
+            self,
+            dataframe: Frame,
+            number_of_months: Union[np.ndarray, list, float, int] = 60,
+            sample_size: int = 1000,
+            tolerance: float = 1e-3,
+            random_state: int = 0
+    ) -> PrecisionReport:
+        """
+        Measures the maximum absolute deviation between the predictions computed with the dtype of the nomogram and
+        the predictions computed with float64, on a random sample of the patients.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        number_of_months : Union[numpy.ndarray, list, float, int]
+            The number of months. It is used only for survival models.
+        sample_size : int
+            The number of patients in the sample.
+        tolerance : float
+            The maximum absolute deviation considered acceptable.
+        random_state : int
+            Random state used to sample the patients.
+
+        Returns
+        -------
+        report : PrecisionReport
+            The precision report.
+        """
+        reference_nomogram = copy.copy(self)
+        reference_nomogram.dtype = np.dtype(np.float64)
+
+        return check_precision(
+            nomogram=self,
+            reference_nomogram=reference_nomogram,
+            dataframe=dataframe,
+            number_of_months=number_of_months,
+            sample_size=sample_size,
+            tolerance=tolerance,
+            random_state=random_state
+        )
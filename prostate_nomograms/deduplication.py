@@ -0,0 +1,163 @@
+from typing import Any, Callable, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .frames import Frame, get_column, get_number_of_rows, take
+
+
+class DeduplicationReport(NamedTuple):
+    number_of_rows: int
+    number_of_profiles: int
+
+    @property
+    def deduplication_ratio(self) -> float:
+        """
+        Number of rows per unique profile, i.e. the factor by which deduplication reduced the number of scored rows.
+
+        Returns
+        -------
+        deduplication_ratio : float
+            The number of rows divided by the number of unique profiles.
+        """
+        return self.number_of_rows/self.number_of_profiles if self.number_of_profiles else 1.0
+
+
+def factorize_profiles(
+        dataframe: Frame,
+        column_names: Sequence[str],
+        number_of_months: Optional[Union[np.ndarray, list, float, int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Factorizes the rows of a frame into unique profiles of the given columns. Each column is factorized on its own,
+    missing values included, and the codes are combined column by column and factorized again, so that the combined
+    codes never overflow.
+
+    Parameters
+    ----------
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    column_names : Sequence[str]
+        Names of the columns defining a profile.
+    number_of_months : Optional[Union[numpy.ndarray, list, float, int]]
+        The number of months, for each row or for all the rows, used as an additional column.
+
+    Returns
+    -------
+    profiles_indices : numpy.ndarray
+        The index of the first row of each unique profile, in order of first appearance.
+    inverse : numpy.ndarray
+        The profile of each row, i.e. the position of its profile in profiles_indices.
+    """
+    number_of_rows = get_number_of_rows(dataframe)
+    columns = [get_column(dataframe, column_name) for column_name in column_names]
+    if number_of_months is not None and np.ndim(number_of_months) > 0:
+        columns.append(np.broadcast_to(np.asarray(number_of_months), (number_of_rows, )))
+
+    inverse = np.zeros(number_of_rows, dtype=np.int64)
+    number_of_profiles = 1 if number_of_rows else 0
+    for column in columns:
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+        inverse, profiles = pd.factorize(inverse*len(uniques) + codes)
+        number_of_profiles = len(profiles)
+
+    profiles_indices = np.empty(number_of_profiles, dtype=np.int64)
+    profiles_indices[inverse[::-1]] = np.arange(number_of_rows - 1, -1, -1)
+
+    return profiles_indices, inverse
+
+
+def _predict_deduplicated(
+        predict: Callable[[Frame, Optional[np.ndarray]], np.ndarray],
+        dataframe: Frame,
+        column_names: Sequence[str],
+        number_of_months: Optional[Union[np.ndarray, list, float, int]] = None
+) -> Tuple[np.ndarray, DeduplicationReport]:
+    """
+    Scores the unique profiles of a frame only and scatters their predictions back to all the rows.
+
+    Parameters
+    ----------
+    predict : Callable[[Frame, Optional[numpy.ndarray]], numpy.ndarray]
+        Function computing the predictions of some rows, given their data and their number of months.
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    column_names : Sequence[str]
+        Names of the columns used by the nomogram.
+    number_of_months : Optional[Union[numpy.ndarray, list, float, int]]
+        The number of months, for each row or for all the rows.
+
+    Returns
+    -------
+    predictions : numpy.ndarray
+        The predictions.
+    report : DeduplicationReport
+        The number of rows and of unique profiles.
+    """
+    profiles_indices, inverse = factorize_profiles(dataframe, column_names, number_of_months)
+    if number_of_months is not None and np.ndim(number_of_months) > 0:
+        number_of_months = np.broadcast_to(np.asarray(number_of_months), inverse.shape)[profiles_indices]
+
+    profiles_predictions = np.asarray(predict(take(dataframe, profiles_indices), number_of_months))
+    report = DeduplicationReport(number_of_rows=len(inverse), number_of_profiles=len(profiles_indices))
+
+    return profiles_predictions[inverse], report
+
+
+def predict_proba_deduplicated(
+        nomogram: Any,
+        dataframe: Frame,
+        number_of_months: Union[np.ndarray, list, float, int] = None
+) -> Tuple[np.ndarray, DeduplicationReport]:
+    """
+    Gets the predictions of a nomogram by scoring each unique profile of the columns it uses only once. The inputs of
+    the nomograms are coarse (integer ages, rounded PSA, Gleason pairs, a handful of stages), so large cohorts contain
+    many duplicate profiles.
+
+    Parameters
+    ----------
+    nomogram : Any
+        The nomogram, e.g. a MSKCC nomogram or a fitted CapraNomogram.
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    number_of_months : Union[numpy.ndarray, list, float, int], optional
+        The number of months. It is used only for survival models.
+
+    Returns
+    -------
+    predictions : numpy.ndarray
+        The predictions.
+    report : DeduplicationReport
+        The number of rows and of unique profiles.
+    """
+    return _predict_deduplicated(
+        predict=nomogram.predict_proba,
+        dataframe=dataframe,
+        column_names=nomogram.inputs_column_names,
+        number_of_months=number_of_months
+    )
+
+
+def predict_risk_deduplicated(nomogram: Any, dataframe: Frame) -> Tuple[np.ndarray, DeduplicationReport]:
+    """
+    Gets the risk predictions of a nomogram by scoring each unique profile of the columns it uses only once.
+
+    Parameters
+    ----------
+    nomogram : Any
+        The nomogram, e.g. a MSKCC nomogram or a fitted CapraNomogram.
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+    Returns
+    -------
+    predictions : numpy.ndarray
+        The predictions.
+    report : DeduplicationReport
+        The number of rows and of unique profiles.
+    """
+    return _predict_deduplicated(
+        predict=lambda profiles, _: nomogram.predict_risk(profiles),
+        dataframe=dataframe,
+        column_names=nomogram.inputs_column_names
+    )
@@ -1,4 +1,10 @@
-from enum import StrEnum
+from enum import IntEnum, StrEnum
+
+
+class CapraRiskGroup(IntEnum):
+    LOW = 0
+    INTERMEDIATE = 1
+    HIGH = 2
 
 
 class ClassificationOutcome(StrEnum):
@@ -23,3 +29,7 @@ class SurvivalOutcome(StrEnum):
     PREOPERATIVE_BCR_CORES = "Preoperative BCR (Cores)"
     PREOPERATIVE_PROSTATE_CANCER_DEATH = "Preoperative Prostate Cancer Death"
     PREOPERATIVE_PROSTATE_CANCER_DEATH_CORES = "Preoperative Prostate Cancer Death (Cores)"
+    POSTOPERATIVE_BCR = "Postoperative BCR"
+    POSTOPERATIVE_BCR_CLINICAL = "Postoperative BCR (Clinical)"
+    POSTOPERATIVE_PROSTATE_CANCER_DEATH = "Postoperative Prostate Cancer Death"
+    POSTOPERATIVE_PROSTATE_CANCER_DEATH_CLINICAL = "Postoperative Prostate Cancer Death (Clinical)"
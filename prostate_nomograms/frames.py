@@ -0,0 +1,302 @@
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    import polars
+except ImportError:
+    polars = None
+
+
+Frame = Union[pd.DataFrame, "pyarrow.Table", "pyarrow.RecordBatch", "polars.DataFrame"]
+
+
+def _is_arrow(frame: Any) -> bool:
+    """
+    Whether a frame is a pyarrow Table or RecordBatch.
+
+    Parameters
+    ----------
+    frame : Any
+        The frame.
+
+    Returns
+    -------
+    is_arrow : bool
+        Whether the frame is a pyarrow Table or RecordBatch.
+    """
+    return pyarrow is not None and isinstance(frame, (pyarrow.Table, pyarrow.RecordBatch))
+
+
+def _is_polars(frame: Any) -> bool:
+    """
+    Whether a frame is a polars DataFrame.
+
+    Parameters
+    ----------
+    frame : Any
+        The frame.
+
+    Returns
+    -------
+    is_polars : bool
+        Whether the frame is a polars DataFrame.
+    """
+    return polars is not None and isinstance(frame, polars.DataFrame)
+
+
+def _get_arrow_dictionary_codes(chunk: "pyarrow.DictionaryArray") -> np.ndarray:
+    """
+    Gets the dictionary indices of a dictionary-encoded arrow array. They are read without copy unless there are
+    missing values, which get the code -1.
+
+    Parameters
+    ----------
+    chunk : pyarrow.DictionaryArray
+        The dictionary-encoded array.
+
+    Returns
+    -------
+    codes : numpy.ndarray
+        The codes.
+    """
+    indices = chunk.indices
+    if indices.null_count:
+        indices = indices.cast(pyarrow.int64()).fill_null(-1)
+
+    return indices.to_numpy(zero_copy_only=False)
+
+
+def _get_arrow_dictionary_column(column: "pyarrow.ChunkedArray") -> pd.Categorical:
+    """
+    Gets a dictionary-encoded arrow column as a pandas Categorical built directly on the dictionary indices, so that
+    the values are never materialized as strings.
+
+    Parameters
+    ----------
+    column : pyarrow.ChunkedArray
+        The dictionary-encoded column.
+
+    Returns
+    -------
+    column : pandas.Categorical
+        The column.
+    """
+    if column.num_chunks > 1:
+        column = column.unify_dictionaries()
+
+    chunks = column.chunks
+    if chunks:
+        categories = chunks[0].dictionary.to_numpy(zero_copy_only=False)
+        codes = [_get_arrow_dictionary_codes(chunk) for chunk in chunks]
+        codes = codes[0] if len(codes) == 1 else np.concatenate(codes)
+    else:
+        categories, codes = np.array([], dtype=object), np.array([], dtype=np.int8)
+
+    return pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+
+
+def _get_arrow_column(column: Union["pyarrow.Array", "pyarrow.ChunkedArray"]) -> Union[np.ndarray, pd.Categorical]:
+    """
+    Gets an arrow column as a NumPy array. Numeric columns of a single chunk without missing values are read
+    without copy. Missing values are read as NaN.
+
+    Parameters
+    ----------
+    column : Union[pyarrow.Array, pyarrow.ChunkedArray]
+        The column.
+
+    Returns
+    -------
+    column : Union[numpy.ndarray, pandas.Categorical]
+        The column.
+    """
+    if isinstance(column, pyarrow.Array):
+        column = pyarrow.chunked_array([column], type=column.type)
+
+    if pyarrow.types.is_dictionary(column.type):
+        return _get_arrow_dictionary_column(column)
+    elif column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    else:
+        return column.to_numpy()
+
+
+def _get_polars_column(column: "polars.Series") -> Union[np.ndarray, pd.Categorical]:
+    """
+    Gets a polars column as a NumPy array. Numeric columns without missing values are read without copy and
+    categorical columns are read as their dictionary codes, through arrow when pyarrow is installed.
+
+    Parameters
+    ----------
+    column : polars.Series
+        The column.
+
+    Returns
+    -------
+    column : Union[numpy.ndarray, pandas.Categorical]
+        The column.
+    """
+    if isinstance(column.dtype, (polars.Categorical, polars.Enum)):
+        if pyarrow is not None:
+            return _get_arrow_column(column.to_arrow())
+        elif isinstance(column.dtype, polars.Enum):
+            codes = column.to_physical().cast(polars.Int64).fill_null(-1).to_numpy()
+            categories = pd.Index(column.dtype.categories.to_list(), dtype=object)
+            return pd.Categorical.from_codes(codes, categories=categories)
+        else:
+            return column.cast(polars.String).to_numpy()
+    else:
+        return column.to_numpy()
+
+
+def get_column(frame: Frame, column_name: str) -> Union[np.ndarray, pd.Categorical]:
+    """
+    Gets a column of a frame. Categorical and dictionary-encoded columns are returned as a pandas Categorical, so
+    that encoders can map their categories once instead of each value, and all the other columns as NumPy arrays.
+
+    Parameters
+    ----------
+    frame : Frame
+        The frame, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    column_name : str
+        Name of the column.
+
+    Returns
+    -------
+    column : Union[numpy.ndarray, pandas.Categorical]
+        The column.
+    """
+    if isinstance(frame, pd.DataFrame):
+        column = frame[column_name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.array
+        else:
+            return column.to_numpy()
+    elif _is_arrow(frame):
+        return _get_arrow_column(frame.column(column_name))
+    elif _is_polars(frame):
+        return _get_polars_column(frame.get_column(column_name))
+    else:
+        raise TypeError(f"Unsupported frame type: {type(frame)}")
+
+
+def get_columns(frame: Frame, column_names: List[str]) -> Dict[str, Union[np.ndarray, pd.Categorical]]:
+    """
+    Gets columns of a frame.
+
+    Parameters
+    ----------
+    frame : Frame
+        The frame, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    column_names : List[str]
+        Names of the columns.
+
+    Returns
+    -------
+    columns : Dict[str, Union[numpy.ndarray, pandas.Categorical]]
+        The columns, by column name.
+    """
+    return {column_name: get_column(frame, column_name) for column_name in column_names}
+
+
+def get_column_names(frame: Frame) -> List[str]:
+    """
+    Gets the names of the columns of a frame.
+
+    Parameters
+    ----------
+    frame : Frame
+        The frame, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+    Returns
+    -------
+    column_names : List[str]
+        Names of the columns.
+    """
+    if isinstance(frame, pd.DataFrame) or _is_polars(frame):
+        return list(frame.columns)
+    elif _is_arrow(frame):
+        return list(frame.schema.names)
+    else:
+        raise TypeError(f"Unsupported frame type: {type(frame)}")
+
+
+def get_number_of_rows(frame: Frame) -> int:
+    """
+    Gets the number of rows of a frame.
+
+    Parameters
+    ----------
+    frame : Frame
+        The frame.
+
+    Returns
+    -------
+    number_of_rows : int
+        The number of rows.
+    """
+    if isinstance(frame, pd.DataFrame) or _is_polars(frame):
+        return len(frame)
+    elif _is_arrow(frame):
+        return frame.num_rows
+    else:
+        raise TypeError(f"Unsupported frame type: {type(frame)}")
+
+
+def take(frame: Frame, indices: np.ndarray) -> Frame:
+    """
+    Takes rows of a frame.
+
+    Parameters
+    ----------
+    frame : Frame
+        The frame.
+    indices : numpy.ndarray
+        The indices of the rows.
+
+    Returns
+    -------
+    frame : Frame
+        The rows, in a frame of the same type.
+    """
+    if isinstance(frame, pd.DataFrame):
+        return frame.iloc[indices]
+    elif _is_arrow(frame):
+        return frame.take(pyarrow.array(indices))
+    elif _is_polars(frame):
+        return frame[indices]
+    else:
+        raise TypeError(f"Unsupported frame type: {type(frame)}")
+
+
+def slice_rows(frame: Frame, start: int, stop: int) -> Frame:
+    """
+    Gets a contiguous range of rows of a frame, without copying the columns.
+
+    Parameters
+    ----------
+    frame : Frame
+        The frame.
+    start : int
+        The index of the first row.
+    stop : int
+        The index after the last row.
+
+    Returns
+    -------
+    frame : Frame
+        The rows, in a frame of the same type.
+    """
+    if isinstance(frame, pd.DataFrame):
+        return frame.iloc[start:stop]
+    elif _is_arrow(frame) or _is_polars(frame):
+        return frame.slice(start, stop - start)
+    else:
+        raise TypeError(f"Unsupported frame type: {type(frame)}")
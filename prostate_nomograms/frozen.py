@@ -0,0 +1,136 @@
+from types import FunctionType, MappingProxyType, ModuleType
+from typing import Any, Optional, Set, Union
+
+import numpy as np
+
+from .frames import Frame
+
+
+def set_read_only(value: Any, _visited: Optional[Set[int]] = None) -> None:
+    """
+    Marks read-only all the NumPy arrays reachable from a value, i.e. the value itself, the items of its mappings and
+    sequences and the attributes of its objects, recursively.
+
+    Parameters
+    ----------
+    value : Any
+        The value, e.g. a regressor or a fitted scikit-learn estimator.
+    """
+    _visited = set() if _visited is None else _visited
+    if id(value) in _visited or isinstance(value, (type, FunctionType, ModuleType, str, bytes)):
+        return
+    _visited.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (dict, MappingProxyType)):
+        for item in value.values():
+            set_read_only(item, _visited)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            set_read_only(item, _visited)
+    elif hasattr(value, "__dict__"):
+        for item in vars(value).values():
+            set_read_only(item, _visited)
+
+
+class FrozenNomogram:
+    """
+    Immutable inference object returned by the freeze method of the nomograms. It holds a private copy of the
+    nomogram whose lazily built state (e.g. the fused kernels of the MSKCC regressors) is built beforehand and whose
+    NumPy arrays (coefficients, spline tables, fitted estimators and scalers) are read-only, and it only exposes the
+    predictions. Its attributes cannot be set.
+
+    Thread safety
+    -------------
+    Predicting with a frozen nomogram does not write any shared state: each call only allocates its own arrays. A
+    single frozen nomogram can therefore be shared by all the threads of a process instead of one copy per thread,
+    including on free-threaded CPython builds. The numba kernels of the MSKCC nomograms are compiled by freeze, in
+    the calling thread, for the default pandas types of the columns; columns of other types (e.g. int32) compile
+    their kernels at their first call under the numba compiler lock. The numba threading layer must be TBB or OpenMP
+    (the workqueue layer does not support concurrent launches) and must be initialized from the main thread, which
+    freezing a MSKCC nomogram from the main thread does, see initialize_threading_layer.
+
+    Examples
+    --------
+    >>> frozen_nomogram = MskccPreRadicalProstatectomyNomogram(outcome).freeze()
+    >>> with ThreadPoolExecutor() as executor:
+    ...     predictions = list(executor.map(frozen_nomogram.predict_proba, dataframes))
+    """
+
+    __slots__ = ("_nomogram", "outcome", "model_type", "dtype", "inputs_column_names")
+
+    def __init__(self, nomogram: Any):
+        """
+        Freezes a private copy of a nomogram. Use the freeze method of the nomograms instead.
+
+        Parameters
+        ----------
+        nomogram : Any
+            The private copy of the nomogram, prepared by its freeze method.
+        """
+        set_read_only(nomogram)
+
+        object.__setattr__(self, "_nomogram", nomogram)
+        object.__setattr__(self, "outcome", nomogram.outcome)
+        object.__setattr__(self, "model_type", nomogram.model_type)
+        object.__setattr__(self, "dtype", nomogram.dtype)
+        object.__setattr__(self, "inputs_column_names", tuple(nomogram.inputs_column_names))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({type(self._nomogram).__name__}, outcome={str(self.outcome)!r})"
+
+    def freeze(self) -> "FrozenNomogram":
+        """
+        Gets the frozen nomogram, i.e. itself.
+
+        Returns
+        -------
+        frozen_nomogram : FrozenNomogram
+            The frozen nomogram.
+        """
+        return self
+
+    def predict_proba(
+            self,
+            dataframe: Frame,
+            number_of_months: Union[np.ndarray, list, float, int] = None
+    ) -> np.ndarray:
+        """
+        Gets the predictions. If the model is survival, the number of months must be given.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        number_of_months : Union[numpy.ndarray, list, float, int], optional
+            The number of months. It is used only for survival models.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        return self._nomogram.predict_proba(dataframe, number_of_months)
+
+    def predict_risk(self, dataframe: Frame) -> np.ndarray:
+        """
+        Gets the risk predictions.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        return self._nomogram.predict_risk(dataframe)
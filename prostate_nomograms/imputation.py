@@ -0,0 +1,235 @@
+from enum import Enum
+from typing import Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+class PoolingScale(Enum):
+    IDENTITY: str = "identity"
+    LOGIT: str = "logit"
+    COMPLEMENTARY_LOG_LOG: str = "complementary_log_log"
+
+
+class RubinsRulesEstimate(NamedTuple):
+    estimate: np.ndarray
+    within_variance: np.ndarray
+    between_variance: np.ndarray
+    total_variance: np.ndarray
+    degrees_of_freedom: np.ndarray
+
+    def get_confidence_interval(self, confidence_level: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the confidence interval of the pooled estimate, from the Student t distribution with the degrees of
+        freedom given by Rubin's rules.
+
+        Parameters
+        ----------
+        confidence_level : float
+            The confidence level.
+
+        Returns
+        -------
+        lower, upper : Tuple[numpy.ndarray, numpy.ndarray]
+            The lower and upper bounds of the confidence interval.
+        """
+        quantile = stats.t.ppf(0.5 + confidence_level/2, self.degrees_of_freedom)
+        margin = quantile*np.sqrt(self.total_variance)
+
+        return self.estimate - margin, self.estimate + margin
+
+
+class ImputedPredictions(NamedTuple):
+    predictions: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    replicates: np.ndarray
+    pooled: RubinsRulesEstimate
+
+
+def get_number_of_imputations(imputations: Mapping[str, np.ndarray]) -> int:
+    """
+    Gets the number of imputations, i.e. the number of columns of the stacks of imputed values.
+
+    Parameters
+    ----------
+    imputations : Mapping[str, numpy.ndarray]
+        The imputed values of each column, by column name, of shape (N, M).
+
+    Returns
+    -------
+    number_of_imputations : int
+        The number of imputations M.
+    """
+    assert len(imputations) > 0, "At least one imputed column must be given."
+    shapes = set(np.shape(values) for values in imputations.values())
+    assert len(shapes) == 1, "The imputed values of all the columns must have the same shape."
+    shape = shapes.pop()
+    assert len(shape) == 2, "The imputed values must be of shape (N, M)."
+
+    return shape[1]
+
+
+def get_imputed_values(observed: Union[np.ndarray, pd.Categorical], imputed: np.ndarray) -> np.ndarray:
+    """
+    Gets the values of a column in each imputation, i.e. the observed values where they are not missing and the
+    imputed values elsewhere, so that the imputed values of the observed rows are ignored and can be NaN.
+
+    Parameters
+    ----------
+    observed : Union[numpy.ndarray, pandas.Categorical]
+        The observed values, of shape (N, ).
+    imputed : numpy.ndarray
+        The imputed values, of shape (N, M).
+
+    Returns
+    -------
+    values : numpy.ndarray
+        The values, of shape (N, M).
+    """
+    observed = np.asarray(observed)
+    imputed = np.asarray(imputed)
+    assert imputed.shape[0] == len(observed), "The imputed values must have one row per patient."
+
+    return np.where(pd.isna(observed)[:, np.newaxis], imputed, observed[:, np.newaxis])
+
+
+def pool_rubins_rules(replicates: np.ndarray, within_variance: Optional[np.ndarray] = None) -> RubinsRulesEstimate:
+    """
+    Pools the estimates of M imputations with Rubin's rules, i.e. the pooled estimate is the mean of the estimates
+    and its total variance is T = W + (1 + 1/M) B, where W is the mean within-imputation variance and B the
+    between-imputation variance, with (M - 1) (1 + W/((1 + 1/M) B))^2 degrees of freedom.
+
+    Parameters
+    ----------
+    replicates : numpy.ndarray
+        The estimates of each imputation, of shape (N, M).
+    within_variance : Optional[numpy.ndarray]
+        The variance of the estimates within each imputation, of shape (N, M). Defaults to 0, e.g. for the
+        predictions of a model whose coefficients are fixed.
+
+    Returns
+    -------
+    estimate : RubinsRulesEstimate
+        The pooled estimates and their variances, of shape (N, ).
+    """
+    number_of_imputations = replicates.shape[1]
+    assert number_of_imputations > 1, "At least two imputations are needed to pool estimates with Rubin's rules."
+
+    estimate = replicates.mean(axis=1)
+    between_variance = replicates.var(axis=1, ddof=1)
+    if within_variance is None:
+        within_variance = np.zeros_like(estimate)
+    else:
+        within_variance = np.asarray(within_variance).mean(axis=1)
+
+    inflated_between_variance = (1 + 1/number_of_imputations)*between_variance
+    total_variance = within_variance + inflated_between_variance
+    with np.errstate(divide="ignore", invalid="ignore"):
+        degrees_of_freedom = (number_of_imputations - 1)*(1 + within_variance/inflated_between_variance)**2
+    degrees_of_freedom = np.where(inflated_between_variance > 0, degrees_of_freedom, np.inf)
+
+    return RubinsRulesEstimate(
+        estimate=estimate,
+        within_variance=within_variance,
+        between_variance=between_variance,
+        total_variance=total_variance,
+        degrees_of_freedom=degrees_of_freedom
+    )
+
+
+def _transform(values: np.ndarray, scale: PoolingScale) -> np.ndarray:
+    """
+    Transforms predictions to the pooling scale.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The predictions.
+    scale : PoolingScale
+        The pooling scale.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        The transformed predictions, in double precision.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if scale == PoolingScale.IDENTITY:
+        return values
+
+    epsilon = np.finfo(np.float64).eps
+    values = np.clip(values, epsilon, 1 - epsilon)
+    if scale == PoolingScale.LOGIT:
+        return np.log(values) - np.log1p(-values)
+    elif scale == PoolingScale.COMPLEMENTARY_LOG_LOG:
+        return np.log(-np.log(values))
+    else:
+        raise ValueError(f"Pooling scale {scale} doesn't exist.")
+
+
+def _inverse_transform(values: np.ndarray, scale: PoolingScale) -> np.ndarray:
+    """
+    Transforms pooled values back to the scale of the predictions.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The pooled values.
+    scale : PoolingScale
+        The pooling scale.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        The values on the scale of the predictions.
+    """
+    if scale == PoolingScale.IDENTITY:
+        return values
+    elif scale == PoolingScale.LOGIT:
+        return 1/(1 + np.exp(-values))
+    elif scale == PoolingScale.COMPLEMENTARY_LOG_LOG:
+        return np.exp(-np.exp(values))
+    else:
+        raise ValueError(f"Pooling scale {scale} doesn't exist.")
+
+
+def pool_predictions(
+        replicates: np.ndarray,
+        scale: Union[str, PoolingScale] = PoolingScale.LOGIT,
+        confidence_level: float = 0.95
+) -> ImputedPredictions:
+    """
+    Pools the predictions of M imputations with Rubin's rules. The predictions are pooled on a scale on which they are
+    linear in the linear predictor of the model, e.g. the logit of the probabilities of a logistic model, and the
+    pooled predictions and their confidence interval are transformed back to the scale of the predictions.
+
+    Parameters
+    ----------
+    replicates : numpy.ndarray
+        The predictions of each imputation, of shape (N, M).
+    scale : Union[str, PoolingScale]
+        The pooling scale, i.e. "identity" (e.g. risks), "logit" (e.g. probabilities of logistic models or survival
+        probabilities of log-logistic models) or "complementary_log_log" (e.g. survival probabilities of Cox models).
+    confidence_level : float
+        The confidence level of the confidence interval.
+
+    Returns
+    -------
+    predictions : ImputedPredictions
+        The pooled predictions, the bounds of their confidence interval, the predictions of each imputation and the
+        pooled estimate on the pooling scale.
+    """
+    scale = PoolingScale(scale)
+    pooled = pool_rubins_rules(_transform(replicates, scale))
+    lower, upper = pooled.get_confidence_interval(confidence_level)
+    lower, upper = _inverse_transform(lower, scale), _inverse_transform(upper, scale)
+
+    return ImputedPredictions(
+        predictions=_inverse_transform(pooled.estimate, scale).astype(replicates.dtype, copy=False),
+        lower=np.minimum(lower, upper).astype(replicates.dtype, copy=False),
+        upper=np.maximum(lower, upper).astype(replicates.dtype, copy=False),
+        replicates=replicates,
+        pooled=pooled
+    )
@@ -0,0 +1,271 @@
+import os
+import tempfile
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .frames import Frame, get_column
+
+INTERMEDIATES_PREFIX = "intermediates."
+
+
+class IncrementalScorer:
+    """
+    Incremental scoring of a growing cohort. The per-patient intermediate arrays of a nomogram (the encoded features
+    and linear predictor of the MSKCC nomograms, the CAPRA score of the CAPRA nomogram) are kept by patient ID, so
+    that appending patients or updating some of them only encodes those rows. The predictions of the whole cohort are
+    then computed from the stored intermediates, for any number of months, and the intermediates can be saved and
+    loaded to persist the result set between runs.
+
+    Examples
+    --------
+    >>> scorer = IncrementalScorer(nomogram, id_column_name="ID")
+    >>> scorer.update(cohort)
+    >>> scorer.update(new_patients)
+    >>> probability = scorer.predict_proba(60)
+    >>> scorer.save("cohort_intermediates.npz")
+    """
+
+    def __init__(self, nomogram: Any, id_column_name: str = "ID"):
+        """
+        Initializes an empty result set.
+
+        Parameters
+        ----------
+        nomogram : Any
+            The nomogram, i.e. a MSKCC nomogram or a fitted CapraNomogram.
+        id_column_name : str
+            Name of the column containing the ID of the patients.
+        """
+        self.nomogram = nomogram
+        self.id_column_name = id_column_name
+        self._ids = pd.Index([])
+        self._intermediates: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        """
+        Gets the number of patients in the result set.
+
+        Returns
+        -------
+        length : int
+            The number of patients.
+        """
+        return len(self._ids)
+
+    @property
+    def version(self) -> str:
+        """
+        The coefficients version of the nomogram. The intermediates of the MSKCC nomograms depend on their
+        coefficients, while the CAPRA score only depends on the patients data.
+
+        Returns
+        -------
+        version : str
+            The coefficients version, or an empty string if the intermediates do not depend on coefficients.
+        """
+        return getattr(self.nomogram, "coefficients_version", "")
+
+    @property
+    def ids(self) -> np.ndarray:
+        """
+        The IDs of the patients, in the order of the stored intermediates.
+
+        Returns
+        -------
+        ids : numpy.ndarray
+            The IDs.
+        """
+        return self._ids.to_numpy()
+
+    @property
+    def intermediates(self) -> Dict[str, np.ndarray]:
+        """
+        The stored intermediate arrays, as read-only views.
+
+        Returns
+        -------
+        intermediates : Dict[str, numpy.ndarray]
+            The intermediate arrays, by name.
+        """
+        intermediates = {}
+        for name, values in self._intermediates.items():
+            intermediates[name] = values.view()
+            intermediates[name].setflags(write=False)
+
+        return intermediates
+
+    def update(self, dataframe: Frame) -> np.ndarray:
+        """
+        Computes the intermediates of the given patients only and merges them into the result set. Patients whose
+        ID is already in the result set are replaced, the others are appended.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The new or updated patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars
+            DataFrame.
+
+        Returns
+        -------
+        positions : numpy.ndarray
+            The positions of the given patients in the result set.
+        """
+        ids = pd.Index(np.asarray(get_column(dataframe, self.id_column_name)))
+        if not ids.is_unique:
+            raise ValueError(f"The IDs in column {self.id_column_name} must be unique.")
+
+        intermediates = self.nomogram.get_intermediates(dataframe)
+        if self._intermediates and set(intermediates) != set(self._intermediates):
+            raise ValueError("The intermediates of the nomogram do not match the stored intermediates.")
+
+        positions = self._ids.get_indexer(ids)
+        is_existing = positions >= 0
+        is_new = ~is_existing
+        number_of_new_rows = int(np.count_nonzero(is_new))
+
+        for name, values in intermediates.items():
+            values = np.asarray(values)
+            stored_values = self._intermediates.get(name, values[:0])
+            if stored_values.dtype != values.dtype:
+                stored_values = stored_values.astype(np.result_type(stored_values, values))
+            if number_of_new_rows:
+                stored_values = np.concatenate([stored_values, values[is_new]])
+            stored_values[positions[is_existing]] = values[is_existing]
+            self._intermediates[name] = stored_values
+
+        positions[is_new] = np.arange(len(self._ids), len(self._ids) + number_of_new_rows)
+        if number_of_new_rows:
+            self._ids = self._ids.append(ids[is_new])
+
+        return positions
+
+    def _select(self, ids: Optional[Sequence] = None) -> Dict[str, np.ndarray]:
+        """
+        Selects the stored intermediates of some patients.
+
+        Parameters
+        ----------
+        ids : Optional[Sequence]
+            The IDs of the patients. Defaults to all the patients.
+
+        Returns
+        -------
+        intermediates : Dict[str, numpy.ndarray]
+            The intermediate arrays, by name.
+        """
+        if ids is None:
+            return self._intermediates
+
+        positions = self._ids.get_indexer(pd.Index(np.asarray(ids)))
+        if np.any(positions < 0):
+            raise ValueError("Some IDs are not in the result set.")
+
+        return {name: values[positions] for name, values in self._intermediates.items()}
+
+    def predict_proba(
+            self,
+            number_of_months: Union[np.ndarray, list, float, int] = None,
+            ids: Optional[Sequence] = None
+    ) -> np.ndarray:
+        """
+        Gets the predictions from the stored intermediates. If the model is survival, the number of months must be
+        given.
+
+        Parameters
+        ----------
+        number_of_months : Union[numpy.ndarray, list, float, int], optional
+            The number of months. It is used only for survival models.
+        ids : Optional[Sequence]
+            The IDs of the patients. Defaults to all the patients, in the order of the ids property.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        return self.nomogram.predict_proba_from_intermediates(self._select(ids), number_of_months)
+
+    def predict_risk(self, ids: Optional[Sequence] = None) -> np.ndarray:
+        """
+        Gets the risk predictions from the stored intermediates.
+
+        Parameters
+        ----------
+        ids : Optional[Sequence]
+            The IDs of the patients. Defaults to all the patients, in the order of the ids property.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        return self.nomogram.predict_risk_from_intermediates(self._select(ids))
+
+    def save(self, path: str) -> None:
+        """
+        Saves the result set to a .npz file. The file is written to a temporary file which is then renamed, so that
+        readers never see a partial result set. The IDs must all be integers or all be strings, so that they are
+        stored without pickling and still match the IDs of the patients once loaded.
+
+        Parameters
+        ----------
+        path : str
+            The path of the .npz file.
+        """
+        ids = self.ids
+        if ids.dtype == object:
+            if all(isinstance(_id, (int, np.integer)) and not isinstance(_id, bool) for _id in ids):
+                ids = ids.astype(np.int64)
+            elif all(isinstance(_id, str) for _id in ids):
+                ids = ids.astype(str)
+            else:
+                raise ValueError(
+                    f"The IDs in column {self.id_column_name} must all be integers or all be strings to be saved."
+                )
+
+        arrays = {f"{INTERMEDIATES_PREFIX}{name}": values for name, values in self._intermediates.items()}
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.savez(file, ids=ids, version=np.array(self.version), **arrays)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, nomogram: Any, id_column_name: str = "ID") -> "IncrementalScorer":
+        """
+        Loads a result set saved with save.
+
+        Parameters
+        ----------
+        path : str
+            The path of the .npz file.
+        nomogram : Any
+            The nomogram, i.e. a MSKCC nomogram or a fitted CapraNomogram.
+        id_column_name : str
+            Name of the column containing the ID of the patients.
+
+        Returns
+        -------
+        scorer : IncrementalScorer
+            The scorer.
+        """
+        scorer = cls(nomogram, id_column_name)
+        with np.load(path, allow_pickle=False) as arrays:
+            version = str(arrays["version"])
+            if version != scorer.version:
+                raise ValueError(
+                    f"The result set was computed with coefficients version {version}, but the nomogram has version "
+                    f"{scorer.version}."
+                )
+            scorer._ids = pd.Index(arrays["ids"])
+            scorer._intermediates = {
+                name[len(INTERMEDIATES_PREFIX):]: arrays[name] for name in arrays.files
+                if name.startswith(INTERMEDIATES_PREFIX)
+            }
+
+        return scorer
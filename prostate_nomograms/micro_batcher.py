@@ -0,0 +1,406 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Future
+import threading
+import time
+from typing import Any, Deque, List, Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .mskcc.base import initialize_threading_layer
+
+
+class MicroBatchRequest(NamedTuple):
+    patients: List[Mapping[str, Any]]
+    number_of_months: Optional[float]
+    future: Future
+    is_single_patient: bool = True
+
+
+class MicroBatcherMetrics(NamedTuple):
+    number_of_requests: int
+    number_of_patients: int
+    number_of_batches: int
+    number_of_failed_requests: int
+    queue_depth: int
+    max_queue_depth: int
+    max_batch_size: int
+
+    @property
+    def mean_batch_size(self) -> float:
+        """
+        Mean number of patients per scored batch.
+
+        Returns
+        -------
+        mean_batch_size : float
+            The number of scored patients divided by the number of batches.
+        """
+        return self.number_of_patients/self.number_of_batches if self.number_of_batches else 0.0
+
+
+class MicroBatcher:
+    """
+    Transport independent micro-batcher of small requests. Patients submitted one at a time or a few at a time, from
+    any thread or from an event loop, are accumulated in a queue by a worker thread, up to max_batch_size patients or
+    max_wait seconds after the first one, and each batch is scored with a single vectorized call of the predict_proba
+    or predict_risk method of the nomogram. Each submission returns a future resolved with the prediction of its
+    patient, or with the predictions of its patients for submit_many.
+
+    A batch whose vectorized call fails is scored again request by request, so that the invalid data of one request
+    (e.g. a non-numeric PSA) only fails the future of this request and not the futures of the other producers.
+
+    Examples
+    --------
+    >>> with MicroBatcher(MskccPreRadicalProstatectomyNomogram(outcome), number_of_months=60) as micro_batcher:
+    ...     future = micro_batcher.submit({"AGE": 65, "PSA": 7.2, ...})
+    ...     probability = future.result()
+    ...     probability = await micro_batcher.submit_async({"AGE": 65, "PSA": 7.2, ...})
+    """
+
+    def __init__(
+            self,
+            nomogram: Any,
+            method: str = "predict_proba",
+            number_of_months: Optional[float] = None,
+            max_batch_size: int = 1024,
+            max_wait: float = 0.002
+    ):
+        """
+        Initializes the micro-batcher. It must be started, with start() or as a context manager, before scoring.
+
+        Parameters
+        ----------
+        nomogram : Any
+            The constructed nomogram, e.g. a MSKCC nomogram or a fitted CapraNomogram.
+        method : str
+            The scoring method of the nomogram, i.e. "predict_proba" or "predict_risk".
+        number_of_months : Optional[float]
+            The default number of months of the patients. It is used only by predict_proba of survival models.
+        max_batch_size : int
+            The maximum number of patients scored in one batch.
+        max_wait : float
+            The maximum time, in seconds, a patient waits for other patients to be batched with.
+        """
+        if method not in ("predict_proba", "predict_risk"):
+            raise ValueError(f"Method must be 'predict_proba' or 'predict_risk', not {method}.")
+        assert max_batch_size > 0, "The maximum batch size must be positive."
+
+        self.nomogram = nomogram
+        self.method = method
+        self.number_of_months = number_of_months
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._uses_months = method == "predict_proba" and getattr(nomogram, "model_type", None) == "survival"
+        self._pending: Deque[MicroBatchRequest] = deque()
+        self._number_of_pending_patients = 0
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._worker: Optional[threading.Thread] = None
+
+        self._number_of_requests = 0
+        self._number_of_patients = 0
+        self._number_of_batches = 0
+        self._number_of_failed_requests = 0
+        self._max_queue_depth = 0
+        self._max_batch_size = 0
+
+    def __enter__(self) -> "MicroBatcher":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def metrics(self) -> MicroBatcherMetrics:
+        """
+        Metrics of the micro-batcher, i.e. the number of scored requests, patients and batches, the number of failed
+        requests, the current and maximum queue depths in requests, and the largest batch size in patients.
+
+        Returns
+        -------
+        metrics : MicroBatcherMetrics
+            The metrics.
+        """
+        with self._condition:
+            return MicroBatcherMetrics(
+                number_of_requests=self._number_of_requests,
+                number_of_patients=self._number_of_patients,
+                number_of_batches=self._number_of_batches,
+                number_of_failed_requests=self._number_of_failed_requests,
+                queue_depth=len(self._pending),
+                max_queue_depth=self._max_queue_depth,
+                max_batch_size=self._max_batch_size
+            )
+
+    def start(self) -> None:
+        """
+        Starts the worker thread. The numba threading layer is initialized in the calling thread beforehand, so it
+        should be called from the main thread.
+        """
+        if self._worker is not None:
+            return
+
+        initialize_threading_layer()
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="MicroBatcher", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        """
+        Stops the worker thread, after scoring the patients still in the queue.
+        """
+        if self._worker is None:
+            return
+
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._worker.join()
+        self._worker = None
+
+    def _submit(self, request: MicroBatchRequest) -> Future:
+        """
+        Queues a request. It is thread-safe.
+
+        Parameters
+        ----------
+        request : MicroBatchRequest
+            The request.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            The future of the request.
+        """
+        if self._uses_months and request.number_of_months is None:
+            raise ValueError("Number of months must be given.")
+
+        with self._condition:
+            if self._worker is None or self._stopping:
+                raise RuntimeError("The micro-batcher is not started.")
+            self._pending.append(request)
+            self._number_of_pending_patients += len(request.patients)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._pending))
+            if len(self._pending) == 1 or self._number_of_pending_patients >= self.max_batch_size:
+                self._condition.notify()
+
+        return request.future
+
+    def submit(self, patient: Mapping[str, Any], number_of_months: Optional[float] = None) -> Future:
+        """
+        Submits a patient. It is thread-safe.
+
+        Parameters
+        ----------
+        patient : Mapping[str, Any]
+            The patient data, by column name, e.g. {"AGE": 65, "PSA": 7.2, ...}.
+        number_of_months : Optional[float]
+            The number of months of the patient. Defaults to the number of months of the micro-batcher.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            The future resolved with the prediction of the patient.
+        """
+        if number_of_months is None:
+            number_of_months = self.number_of_months
+
+        return self._submit(MicroBatchRequest([patient], number_of_months, Future()))
+
+    def submit_many(self, patients: Sequence[Mapping[str, Any]], number_of_months: Optional[float] = None) -> Future:
+        """
+        Submits the patients of a single request, e.g. of one client, which are batched together with the other
+        requests and succeed or fail together. It is thread-safe.
+
+        Parameters
+        ----------
+        patients : Sequence[Mapping[str, Any]]
+            The patients data, by column name.
+        number_of_months : Optional[float]
+            The number of months of the patients. Defaults to the number of months of the micro-batcher.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            The future resolved with the list of the predictions of the patients.
+        """
+        if number_of_months is None:
+            number_of_months = self.number_of_months
+
+        future = Future()
+        if not patients:
+            future.set_result([])
+            return future
+
+        return self._submit(MicroBatchRequest(list(patients), number_of_months, future, is_single_patient=False))
+
+    async def submit_async(self, patient: Mapping[str, Any], number_of_months: Optional[float] = None) -> float:
+        """
+        Submits a patient and awaits its prediction, without blocking the event loop.
+
+        Parameters
+        ----------
+        patient : Mapping[str, Any]
+            The patient data, by column name.
+        number_of_months : Optional[float]
+            The number of months of the patient. Defaults to the number of months of the micro-batcher.
+
+        Returns
+        -------
+        prediction : float
+            The prediction of the patient.
+        """
+        return await asyncio.wrap_future(self.submit(patient, number_of_months))
+
+    async def submit_many_async(
+            self,
+            patients: Sequence[Mapping[str, Any]],
+            number_of_months: Optional[float] = None
+    ) -> List[float]:
+        """
+        Submits the patients of a single request and awaits their predictions, without blocking the event loop.
+
+        Parameters
+        ----------
+        patients : Sequence[Mapping[str, Any]]
+            The patients data, by column name.
+        number_of_months : Optional[float]
+            The number of months of the patients. Defaults to the number of months of the micro-batcher.
+
+        Returns
+        -------
+        predictions : List[float]
+            The predictions of the patients.
+        """
+        return await asyncio.wrap_future(self.submit_many(patients, number_of_months))
+
+    def _next_batch(self) -> Optional[List[MicroBatchRequest]]:
+        """
+        Waits for the next batch, i.e. requests of up to max_batch_size patients in total, or the requests received
+        up to max_wait seconds after the first one. A request with more than max_batch_size patients is a batch.
+
+        Returns
+        -------
+        batch : Optional[List[MicroBatchRequest]]
+            The requests of the batch, or None when the micro-batcher is stopped and the queue is empty.
+        """
+        with self._condition:
+            while not self._pending:
+                if self._stopping:
+                    return None
+                self._condition.wait()
+
+            deadline = time.monotonic() + self.max_wait
+            while self._number_of_pending_patients < self.max_batch_size and not self._stopping:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                self._condition.wait(timeout)
+
+            batch = [self._pending.popleft()]
+            number_of_patients = len(batch[0].patients)
+            while self._pending and number_of_patients + len(self._pending[0].patients) <= self.max_batch_size:
+                number_of_patients += len(self._pending[0].patients)
+                batch.append(self._pending.popleft())
+            self._number_of_pending_patients -= number_of_patients
+
+            return batch
+
+    def _predict(self, batch: List[MicroBatchRequest]) -> List[float]:
+        """
+        Scores the patients of requests with a single call of the scoring method.
+
+        Parameters
+        ----------
+        batch : List[MicroBatchRequest]
+            The requests.
+
+        Returns
+        -------
+        predictions : List[float]
+            The predictions of the patients of all the requests, in order.
+        """
+        dataframe = pd.DataFrame.from_records([patient for request in batch for patient in request.patients])
+        if self.method == "predict_risk":
+            predictions = self.nomogram.predict_risk(dataframe)
+        elif self._uses_months:
+            number_of_months = np.repeat(
+                np.array([request.number_of_months for request in batch], dtype=float),
+                [len(request.patients) for request in batch]
+            )
+            predictions = self.nomogram.predict_proba(dataframe, number_of_months)
+        else:
+            predictions = self.nomogram.predict_proba(dataframe)
+
+        return np.asarray(predictions).tolist()
+
+    @staticmethod
+    def _set_result(request: MicroBatchRequest, predictions: List[float]) -> None:
+        """
+        Resolves the future of a request with the predictions of its patients.
+
+        Parameters
+        ----------
+        request : MicroBatchRequest
+            The request.
+        predictions : List[float]
+            The predictions of the patients of the request.
+        """
+        request.future.set_result(predictions[0] if request.is_single_patient else predictions)
+
+    def _score_batch(self, batch: List[MicroBatchRequest]) -> None:
+        """
+        Scores a batch with a single call of the scoring method and resolves the futures of its requests. If the call
+        fails, each request is scored again on its own, so that only the futures of the failing requests are resolved
+        with their exception. Cancelled requests are dropped.
+
+        Parameters
+        ----------
+        batch : List[MicroBatchRequest]
+            The requests.
+        """
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        number_of_failed_requests = 0
+        try:
+            predictions = self._predict(batch)
+        except Exception as exception:
+            if len(batch) == 1:
+                batch[0].future.set_exception(exception)
+                number_of_failed_requests += 1
+            else:
+                for request in batch:
+                    try:
+                        self._set_result(request, self._predict([request]))
+                    except Exception as request_exception:
+                        request.future.set_exception(request_exception)
+                        number_of_failed_requests += 1
+        else:
+            start = 0
+            for request in batch:
+                self._set_result(request, predictions[start:start + len(request.patients)])
+                start += len(request.patients)
+
+        with self._condition:
+            number_of_patients = sum(len(request.patients) for request in batch)
+            self._number_of_requests += len(batch)
+            self._number_of_patients += number_of_patients
+            self._number_of_batches += 1
+            self._number_of_failed_requests += number_of_failed_requests
+            self._max_batch_size = max(self._max_batch_size, number_of_patients)
+
+    def _run(self) -> None:
+        """
+        Scores the batches until the micro-batcher is stopped.
+        """
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._score_batch(batch)
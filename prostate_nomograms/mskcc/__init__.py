@@ -1 +1,2 @@
+from .post_radical_prostatectomy_nomogram import MskccPostRadicalProstatectomyNomogram
 from .pre_radical_prostatectomy_nomogram import MskccPreRadicalProstatectomyNomogram
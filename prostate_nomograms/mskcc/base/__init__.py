@@ -1 +1,11 @@
+from .acquisition_counters import AcquisitionCounters, get_process_counters
+from .backends import Backend, get_available_backends, initialize_threading_layer
+from .coefficients_bundle import CoefficientsBundle
+from .coefficients_refresher import CoefficientsRefresher, RefreshResult
+from .compiled_model import CompiledModel, compile_model
+from .fallback_model import FallbackModel, REDUCED_OUTCOMES
 from .model import Model
+from .model_spec import FEATURES, InputSpec, INPUTS, MODEL_SPEC, TermSpec, TermType
+from .patient_scorer import PatientScorer
+from .prediction_cache import PredictionCache
+from .validation import InvalidRows, validate_inputs, ValidationReport, Violation
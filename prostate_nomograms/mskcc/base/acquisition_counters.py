@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+import threading
+import time
+from typing import Dict, Iterator, Optional, Union
+
+
+class AcquisitionCounters:
+    """
+    Counters of the coefficients acquisition, i.e. HTTP requests, bytes downloaded, json files read, hits and misses
+    of each cache and time spent parsing coefficients. The page cache counts the pages served from memory or validated
+    by a 304 response, the file cache the json files found on disk and the bundle cache the coefficients bundles found
+    on disk, so that page_cache_misses and http_requests tell whether the network was hit. Each scraper has its own
+    counters, which also increment the process-wide counters returned by get_process_counters.
+    """
+
+    NAMES = (
+        "http_requests",
+        "bytes_downloaded",
+        "json_reads",
+        "page_cache_hits",
+        "page_cache_misses",
+        "file_cache_hits",
+        "file_cache_misses",
+        "bundle_cache_hits",
+        "bundle_cache_misses",
+        "parse_time"
+    )
+
+    def __init__(self, parent: Optional["AcquisitionCounters"] = None):
+        """
+        Initializes the counters to zero.
+
+        Parameters
+        ----------
+        parent : Optional[AcquisitionCounters]
+            Counters also incremented by these counters, e.g. the process-wide counters.
+        """
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._values: Dict[str, Union[int, float]] = dict.fromkeys(self.NAMES, 0)
+
+    def increment(self, name: str, value: Union[int, float] = 1) -> None:
+        """
+        Increments a counter.
+
+        Parameters
+        ----------
+        name : str
+            Name of the counter, one of NAMES.
+        value : Union[int, float]
+            The increment.
+        """
+        if name not in self._values:
+            raise ValueError(f"Unknown counter: {name}. Available counters are {self.NAMES}.")
+
+        with self._lock:
+            self._values[name] += value
+        if self.parent is not None:
+            self.parent.increment(name, value)
+
+    @contextmanager
+    def time_parse(self) -> Iterator[None]:
+        """
+        Adds the wall time of the enclosed block to the parse_time counter, in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.increment("parse_time", time.perf_counter() - start)
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        Gets the values of the counters.
+
+        Returns
+        -------
+        counters : Dict[str, Union[int, float]]
+            The values of the counters, by name.
+        """
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        """
+        Resets the counters to zero. The parent counters are not reset.
+        """
+        with self._lock:
+            self._values = dict.fromkeys(self.NAMES, 0)
+
+    def __getattr__(self, name: str) -> Union[int, float]:
+        """
+        Gets the value of a counter, e.g. counters.http_requests.
+
+        Parameters
+        ----------
+        name : str
+            Name of the counter.
+
+        Returns
+        -------
+        value : Union[int, float]
+            The value of the counter.
+        """
+        if name in AcquisitionCounters.NAMES:
+            return self.as_dict()[name]
+        raise AttributeError(name)
+
+
+_PROCESS_COUNTERS = AcquisitionCounters()
+
+
+def get_process_counters() -> AcquisitionCounters:
+    """
+    Gets the process-wide coefficients acquisition counters, aggregating the counters of all the scrapers and
+    refreshers.
+
+    Returns
+    -------
+    counters : AcquisitionCounters
+        The process-wide counters.
+    """
+    return _PROCESS_COUNTERS
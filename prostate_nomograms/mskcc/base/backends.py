@@ -0,0 +1,422 @@
+from enum import Enum, StrEnum
+import hashlib
+import importlib.util
+import os
+import sys
+import tempfile
+from typing import Callable, Dict, List, Mapping, Optional, Union
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+from ...profiling import stage
+from .compiled_model import CompiledModel, FeatureEffect
+from .model_spec import FEATURES
+
+
+class Backend(StrEnum):
+    NUMPY = "numpy"
+    NUMEXPR = "numexpr"
+    NUMBA = "numba"
+
+
+class Link(Enum):
+    LINEAR_PREDICTOR: str = "linear_predictor"
+    LOGISTIC: str = "logistic"
+    SURVIVAL: str = "survival"
+    RISK: str = "risk"
+
+
+def get_available_backends() -> List[Backend]:
+    """
+    Gets the available backends, from the fastest to the slowest.
+
+    Returns
+    -------
+    backends : List[Backend]
+        The available backends.
+    """
+    backends = []
+    if numba is not None:
+        backends.append(Backend.NUMBA)
+    if numexpr is not None:
+        backends.append(Backend.NUMEXPR)
+    backends.append(Backend.NUMPY)
+
+    return backends
+
+
+def get_backend(backend: Optional[Union[str, Backend]] = None) -> Backend:
+    """
+    Gets a backend. If no backend is given, the fastest available backend is used, i.e. numba if it is installed,
+    then numexpr, then NumPy.
+
+    Parameters
+    ----------
+    backend : Optional[Union[str, Backend]]
+        The backend.
+
+    Returns
+    -------
+    backend : Backend
+        The backend.
+    """
+    if backend is None:
+        return get_available_backends()[0]
+
+    backend = Backend(backend)
+    if backend not in get_available_backends():
+        raise ImportError(f"The {backend} backend requires the {backend} package to be installed.")
+
+    return backend
+
+
+def _get_feature_variable(feature: str) -> str:
+    """
+    Gets the name of the variable holding the values of a feature in the fused expression. Categorical features
+    without conditions (e.g. the clinical stage, which is a string) are encoded beforehand, the others are read
+    directly from their input.
+
+    Parameters
+    ----------
+    feature : str
+        The feature.
+
+    Returns
+    -------
+    variable : str
+        The name of the variable.
+    """
+    feature_spec = FEATURES[feature]
+    if feature_spec.encoder and not feature_spec.conditions:
+        return feature
+    else:
+        return feature_spec.inputs[0]
+
+
+def _get_feature_expression(feature: str, effect: FeatureEffect, ref: Callable[[str], str]) -> List[str]:
+    """
+    Gets the expressions of the terms of a feature.
+
+    Parameters
+    ----------
+    feature : str
+        The feature.
+    effect : FeatureEffect
+        The compiled effect of the feature.
+    ref : Callable[[str], str]
+        Function giving the expression referencing a variable, e.g. "psa" for numexpr or "psa[i]" for numba.
+
+    Returns
+    -------
+    expressions : List[str]
+        The expressions of the terms.
+    """
+    feature_spec = FEATURES[feature]
+    variable = ref(_get_feature_variable(feature))
+    expressions = []
+
+    if effect.table is not None:
+        table = [float(value) for value in effect.table]
+        expression = repr(table[0])
+        if feature_spec.conditions:
+            inputs = [ref(_input) for _input in feature_spec.inputs]
+            for condition, code in reversed(feature_spec.conditions):
+                expression = f"where({condition.format(*inputs)}, {table[code]!r}, {expression})"
+        else:
+            for code in reversed(range(1, len(table))):
+                expression = f"where({variable} == {code}, {table[code]!r}, {expression})"
+        expressions.append(expression)
+    if effect.coefficient:
+        expressions.append(f"({effect.coefficient!r})*{variable}")
+    for knot, weight in zip(effect.knots, effect.weights):
+        expressions.append(f"({weight!r})*where({variable} > {knot!r}, ({variable} - {knot!r})**3, 0.0)")
+
+    return expressions
+
+
+def get_expression(compiled_model: CompiledModel, link: Link, ref: Callable[[str], str] = str) -> str:
+    """
+    Gets a single expression computing the encoding of the features, the linear predictor and the link function of a
+    compiled model, using numexpr syntax.
+
+    Parameters
+    ----------
+    compiled_model : CompiledModel
+        The compiled model.
+    link : Link
+        The link function.
+    ref : Callable[[str], str]
+        Function giving the expression referencing a variable.
+
+    Returns
+    -------
+    expression : str
+        The expression.
+    """
+    expressions = [repr(float(compiled_model.intercept))]
+    for feature, effect in compiled_model.effects.items():
+        expressions += _get_feature_expression(feature, effect, ref)
+
+    linear_predictor = " + ".join(expressions)
+    if link == Link.LINEAR_PREDICTOR:
+        return linear_predictor
+    elif link == Link.LOGISTIC:
+        return f"exp({linear_predictor})/(1 + exp({linear_predictor}))"
+    elif link == Link.SURVIVAL:
+        months = ref("number_of_months")
+        return f"1/(1 + (exp(-({linear_predictor}))*{months}/12)**(1/{compiled_model.scaling_parameter!r}))"
+    elif link == Link.RISK:
+        return f"-({linear_predictor})/{compiled_model.scaling_parameter!r}"
+    else:
+        raise ValueError(f"Unknown link: {link}")
+
+
+_NUMBA_KERNELS: Dict[str, Callable] = {}
+
+_NUMBA_KERNEL_MODULE_HEADER = (
+    "import math\n"
+    "\n"
+    "from numba import njit, prange\n"
+    "\n"
+    "exp = math.exp\n"
+    "\n"
+    "\n"
+    "@njit(cache=True)\n"
+    "def where(condition, x, y):\n"
+    "    return x if condition else y\n"
+    "\n"
+    "\n"
+    "@njit(parallel=True, cache=True)\n"
+)
+
+
+def get_kernels_folder_path() -> str:
+    """
+    Gets the folder where the sources of the numba kernels are written, and next to which numba caches their compiled
+    machine code. It is the NUMBA_CACHE_DIR folder if it is set, or else a folder of the user cache, or else of the
+    temporary directory if the user cache is not writable.
+
+    Returns
+    -------
+    kernels_folder_path : str
+        The path of the kernels folder.
+    """
+    cache_folder_paths = [
+        os.environ.get("NUMBA_CACHE_DIR") or os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        tempfile.gettempdir()
+    ]
+    for cache_folder_path in cache_folder_paths:
+        kernels_folder_path = os.path.join(cache_folder_path, "prostate_nomograms", "kernels")
+        try:
+            os.makedirs(kernels_folder_path, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(kernels_folder_path, os.W_OK):
+            return kernels_folder_path
+
+    raise OSError(f"None of the folders {cache_folder_paths} is writable.")
+
+
+def _load_numba_kernel(source: str) -> Callable:
+    """
+    Loads a numba kernel from a module file named after the hash of its source, written on first use. Since the
+    kernel is defined in a file, it is compiled with cache=True and its machine code is reused by the next processes
+    instead of being compiled again.
+
+    Parameters
+    ----------
+    source : str
+        The source of the kernel function.
+
+    Returns
+    -------
+    kernel : Callable
+        The kernel.
+    """
+    module_source = _NUMBA_KERNEL_MODULE_HEADER + source
+    module_name = f"kernel_{hashlib.sha1(module_source.encode('utf-8')).hexdigest()}"
+    kernels_folder_path = get_kernels_folder_path()
+    module_path = os.path.join(kernels_folder_path, f"{module_name}.py")
+
+    if not os.path.exists(module_path):
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=kernels_folder_path, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w") as file:
+            file.write(module_source)
+        os.replace(temporary_path, module_path)
+
+    spec = importlib.util.spec_from_file_location(f"{__name__}.{module_name}", module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+
+    return module.kernel
+
+
+def _get_numba_kernel(expression: str, variables: List[str]) -> Callable:
+    """
+    Gets the numba kernel evaluating an expression row by row. Kernels are cached by expression in the process, and
+    their machine code is cached on disk across processes.
+
+    Parameters
+    ----------
+    expression : str
+        The expression, referencing the row i of each variable.
+    variables : List[str]
+        The variables of the expression.
+
+    Returns
+    -------
+    kernel : Callable
+        The kernel. Its arguments are the variables followed by the output array.
+    """
+    source = (
+        f"def kernel({', '.join(variables)}, out):\n"
+        f"    for i in prange(out.shape[0]):\n"
+        f"        out[i] = {expression}\n"
+    )
+
+    if source not in _NUMBA_KERNELS:
+        _NUMBA_KERNELS[source] = _load_numba_kernel(source)
+
+    return _NUMBA_KERNELS[source]
+
+
+def initialize_threading_layer() -> None:
+    """
+    Launches a trivial parallel numba kernel in the calling thread, which initializes the numba threading layer. It
+    must be called from the main thread before the numba kernels are called from other threads, since the TBB
+    threading layer prevents the process from exiting when it is first launched from a worker thread. Does nothing if
+    numba is not installed.
+    """
+    if numba is not None:
+        _get_numba_kernel("x[i]", ["x"])(np.zeros(1), np.empty(1))
+
+
+class FusedKernel:
+    """
+    Evaluates the encoding of the features, the linear predictor and the link function of a compiled model in a
+    single pass over the rows, using numexpr or numba, instead of one NumPy pass (and one temporary array) per
+    operation.
+    """
+
+    def __init__(self, compiled_model: CompiledModel, link: Link, backend: Backend):
+        """
+        Initializes the kernel.
+
+        Parameters
+        ----------
+        compiled_model : CompiledModel
+            The compiled model.
+        link : Link
+            The link function.
+        backend : Backend
+            The backend, either numexpr or numba.
+        """
+        if backend == Backend.NUMPY:
+            raise ValueError("The NumPy backend has no fused kernel.")
+
+        self.compiled_model = compiled_model
+        self.link = link
+        self.backend = backend
+
+        self.variables = []
+        for feature in compiled_model.features:
+            if FEATURES[feature].conditions:
+                self.variables += [_input for _input in FEATURES[feature].inputs if _input not in self.variables]
+            else:
+                self.variables.append(_get_feature_variable(feature))
+        if link == Link.SURVIVAL:
+            self.variables.append("number_of_months")
+
+        if backend == Backend.NUMEXPR:
+            self.expression = get_expression(compiled_model, link)
+        else:
+            self.expression = get_expression(compiled_model, link, ref=lambda variable: f"{variable}[i]")
+
+    def _get_arrays(
+            self,
+            inputs: Mapping[str, np.ndarray],
+            number_of_months: Optional[Union[np.ndarray, list, float, int]] = None,
+            dtype: DTypeLike = np.float64
+    ) -> Dict[str, np.ndarray]:
+        """
+        Gets the arrays of the variables of the expression.
+
+        Parameters
+        ----------
+        inputs : Mapping[str, np.ndarray]
+            The inputs, i.e. the patients data.
+        number_of_months : Optional[Union[np.ndarray, list, float, int]]
+            The number of months. It is used only for the survival link.
+        dtype : DTypeLike
+            The floating point type of non integer inputs.
+
+        Returns
+        -------
+        arrays : Dict[str, np.ndarray]
+            The arrays, by variable.
+        """
+        arrays = {}
+        for feature in self.compiled_model.features:
+            feature_spec = FEATURES[feature]
+            if feature_spec.encoder and not feature_spec.conditions:
+                arrays[feature] = self.compiled_model.encode_feature(feature, inputs)
+            else:
+                for _input in feature_spec.inputs:
+                    array = np.asarray(inputs[_input])
+                    arrays[_input] = array.astype(dtype) if array.dtype.kind in "Ob" else array
+
+        if self.link == Link.SURVIVAL:
+            size = len(next(iter(arrays.values())))
+            arrays["number_of_months"] = np.broadcast_to(np.asarray(number_of_months, dtype=dtype), (size,))
+
+        return arrays
+
+    def __call__(
+            self,
+            inputs: Mapping[str, np.ndarray],
+            number_of_months: Optional[Union[np.ndarray, list, float, int]] = None,
+            dtype: DTypeLike = np.float64
+    ) -> np.ndarray:
+        """
+        Evaluates the kernel. With a reduced precision dtype, the inputs and the output are stored with this dtype,
+        while the intermediate values, which only live in registers (numba) or in cache-sized blocks (numexpr), are
+        computed in double precision.
+
+        Parameters
+        ----------
+        inputs : Mapping[str, np.ndarray]
+            The inputs, i.e. the patients data.
+        number_of_months : Optional[Union[np.ndarray, list, float, int]]
+            The number of months. It is used only for the survival link.
+        dtype : DTypeLike
+            The floating point type of the output.
+
+        Returns
+        -------
+        result : np.ndarray
+            The result of the link function.
+        """
+        with stage("FusedKernel.get_arrays"):
+            arrays = self._get_arrays(inputs, number_of_months, dtype)
+        out = np.empty(len(next(iter(arrays.values()))), dtype=dtype)
+
+        with stage(f"FusedKernel.{self.backend}.{self.link.value}", rows=len(out)):
+            if self.backend == Backend.NUMEXPR:
+                numexpr.evaluate(self.expression, local_dict=arrays, out=out, casting="same_kind")
+            else:
+                kernel = _get_numba_kernel(self.expression, self.variables)
+                kernel(*[arrays[variable] for variable in self.variables], out)
+
+        return out
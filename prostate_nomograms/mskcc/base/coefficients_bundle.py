@@ -0,0 +1,246 @@
+import os
+import shutil
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+def _decode(strings: np.ndarray) -> List[str]:
+    """
+    Decodes an array of UTF-8 strings.
+
+    Parameters
+    ----------
+    strings : numpy.ndarray
+        The UTF-8 strings.
+
+    Returns
+    -------
+    strings : List[str]
+        The decoded strings.
+    """
+    return [string.decode("utf-8") for string in strings.tolist()]
+
+
+class CoefficientsBundle:
+    """
+    Binary bundle of the coefficients of all the MSKCC models. It is a folder of .npy files: UTF-8 string tables of
+    the models, their types and the variables, a dense coefficients matrix (models x variables, NaN when a model does
+    not use a variable) and the spline knots. The files are memory-mapped, so loading a model does no parsing and
+    only touches the few pages that hold its row.
+    """
+
+    ARRAYS_NAMES = ("models", "model_types", "variables", "coefficients", "knots", "knots_values")
+
+    def __init__(self, folder_path: str):
+        """
+        Loads a bundle.
+
+        Parameters
+        ----------
+        folder_path : str
+            The path of the bundle folder.
+        """
+        self.folder_path = folder_path
+        self._arrays = {
+            name: np.load(os.path.join(folder_path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+            for name in self.ARRAYS_NAMES
+        }
+
+    @classmethod
+    def create(
+            cls,
+            variables_dataframe: pd.DataFrame,
+            spline_dataframe: pd.DataFrame,
+            folder_path: str,
+            overwrite: bool = False
+    ) -> "CoefficientsBundle":
+        """
+        Creates a bundle from the variables and spline coefficients tables. The files are written to a temporary
+        folder which is then renamed, so that readers never see a partial bundle. If the bundle already exists, e.g.
+        because another process created it in the meantime, the temporary folder is deleted and the existing bundle is
+        opened, unless overwrite is True, in which case the existing bundle is moved aside and replaced. Bundles
+        already opened keep their memory-mapped files.
+
+        Parameters
+        ----------
+        variables_dataframe : pandas.DataFrame
+            The variables coefficients table, with the columns "Model Type", "Model", "Variable" and "Value".
+        spline_dataframe : pandas.DataFrame
+            The spline coefficients table, with the columns "Knot" and "Value".
+        folder_path : str
+            The path of the bundle folder.
+        overwrite : bool
+            Whether to replace an existing bundle, e.g. when the coefficients of its date were corrected.
+
+        Returns
+        -------
+        bundle : CoefficientsBundle
+            The bundle.
+        """
+        models, models_indexes = np.unique(variables_dataframe["Model"].to_numpy(dtype=str), return_inverse=True)
+        variables_indexes, variables = pd.factorize(variables_dataframe["Variable"])
+
+        coefficients = np.full((len(models), len(variables)), np.nan)
+        coefficients[models_indexes, variables_indexes] = variables_dataframe["Value"].to_numpy(dtype=np.float64)
+
+        model_types = np.empty(len(models), dtype=object)
+        model_types[models_indexes] = variables_dataframe["Model Type"].to_numpy()
+
+        arrays = {
+            "models": np.char.encode(models, "utf-8"),
+            "model_types": np.char.encode(model_types.astype(str), "utf-8"),
+            "variables": np.char.encode(variables.to_numpy(dtype=str), "utf-8"),
+            "coefficients": coefficients,
+            "knots": np.char.encode(spline_dataframe["Knot"].to_numpy(dtype=str), "utf-8"),
+            "knots_values": spline_dataframe["Value"].to_numpy(dtype=np.float64)
+        }
+
+        parent_folder_path = os.path.dirname(os.path.abspath(folder_path))
+        os.makedirs(parent_folder_path, exist_ok=True)
+        temporary_folder_path = tempfile.mkdtemp(dir=parent_folder_path)
+        try:
+            os.chmod(temporary_folder_path, 0o755)
+            for name, array in arrays.items():
+                np.save(os.path.join(temporary_folder_path, f"{name}.npy"), array, allow_pickle=False)
+            try:
+                os.replace(temporary_folder_path, folder_path)
+            except OSError:
+                if not os.path.isdir(folder_path):
+                    raise
+                if overwrite:
+                    cls._replace(temporary_folder_path, folder_path)
+                shutil.rmtree(temporary_folder_path, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(temporary_folder_path, ignore_errors=True)
+            raise
+
+        return cls(folder_path)
+
+    @staticmethod
+    def _replace(temporary_folder_path: str, folder_path: str) -> None:
+        """
+        Replaces an existing bundle folder by a new one, by renaming the existing folder to a free temporary name,
+        renaming the new folder to its path and deleting the existing folder. If another process created the bundle
+        between the two renames, its bundle is kept.
+
+        Parameters
+        ----------
+        temporary_folder_path : str
+            The path of the new bundle folder.
+        folder_path : str
+            The path of the existing bundle folder.
+        """
+        stale_folder_path = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(folder_path)))
+        os.rmdir(stale_folder_path)
+        os.replace(folder_path, stale_folder_path)
+        try:
+            os.replace(temporary_folder_path, folder_path)
+        except OSError:
+            if not os.path.isdir(folder_path):
+                raise
+        finally:
+            shutil.rmtree(stale_folder_path, ignore_errors=True)
+
+    @classmethod
+    def from_json(cls, variables_json_path: str, spline_json_path: str, folder_path: str) -> "CoefficientsBundle":
+        """
+        Creates a bundle from the json files saved by the WebTableScraper.
+
+        Parameters
+        ----------
+        variables_json_path : str
+            The path of the variables coefficients json file.
+        spline_json_path : str
+            The path of the spline coefficients json file.
+        folder_path : str
+            The path of the bundle folder.
+
+        Returns
+        -------
+        bundle : CoefficientsBundle
+            The bundle.
+        """
+        return cls.create(pd.read_json(variables_json_path), pd.read_json(spline_json_path), folder_path)
+
+    @property
+    def outcomes(self) -> List[str]:
+        """
+        The outcomes of the models of the bundle.
+
+        Returns
+        -------
+        outcomes : List[str]
+            The outcomes.
+        """
+        return _decode(self._arrays["models"])
+
+    def _get_model_index(self, outcome: str) -> int:
+        """
+        Gets the row of a model in the coefficients matrix.
+
+        Parameters
+        ----------
+        outcome : str
+            Name of the outcome.
+
+        Returns
+        -------
+        model_index : int
+            The row of the model.
+        """
+        models = self._arrays["models"]
+        encoded_outcome = str(outcome).encode("utf-8")
+        model_index = np.searchsorted(models, encoded_outcome)
+        if model_index == len(models) or models[model_index] != encoded_outcome:
+            raise ValueError(f"No coefficients found for outcome: {outcome}")
+
+        return int(model_index)
+
+    def get_model_type(self, outcome: str) -> str:
+        """
+        Gets the type of a model, i.e. "logistic" or "survival".
+
+        Parameters
+        ----------
+        outcome : str
+            Name of the outcome.
+
+        Returns
+        -------
+        model_type : str
+            The type of the model.
+        """
+        return self._arrays["model_types"][self._get_model_index(outcome)].decode("utf-8")
+
+    def get_variables_coefficients(self, outcome: str) -> Dict[str, float]:
+        """
+        Gets the coefficients of the variables of a model.
+
+        Parameters
+        ----------
+        outcome : str
+            Name of the outcome.
+
+        Returns
+        -------
+        variables_coefficients : Dict[str, float]
+            The coefficients, by variable.
+        """
+        coefficients = self._arrays["coefficients"][self._get_model_index(outcome)]
+        used = ~np.isnan(coefficients)
+
+        return dict(zip(_decode(self._arrays["variables"][used]), coefficients[used].tolist()))
+
+    def get_spline_coefficients(self) -> Dict[str, float]:
+        """
+        Gets the spline knots values.
+
+        Returns
+        -------
+        spline_coefficients : Dict[str, float]
+            The knots values, by knot.
+        """
+        return dict(zip(_decode(self._arrays["knots"]), self._arrays["knots_values"].tolist()))
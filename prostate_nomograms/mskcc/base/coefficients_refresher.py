@@ -0,0 +1,262 @@
+import asyncio
+from io import StringIO
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+import requests
+
+from .acquisition_counters import AcquisitionCounters, get_process_counters
+from .coefficients_bundle import CoefficientsBundle
+from .web_table_scraper import (
+    Date,
+    get_bundle_folder_name,
+    get_page,
+    parse_date,
+    read_json_table,
+    save_tables,
+    WebTableScraper,
+    write_atomically,
+    write_manifest
+)
+
+
+class RefreshResult(NamedTuple):
+    modified: bool
+    date: Optional[Date] = None
+    json_file_paths: List[str] = []
+    bundle_folder_path: Optional[str] = None
+
+
+class CoefficientsRefresher:
+    """
+    Refreshes the coefficients of the MSKCC nomograms without blocking the event loop. The page is requested with the
+    ETag and Last-Modified validators of the previous response, so that an unchanged page costs a single empty 304
+    response. A modified page is parsed once, all its coefficients tables are written atomically to dated json files
+    and to a coefficients bundle, and the date and the bundle are recorded in the manifest of the json folder. The
+    WebTableScraper of the models resolves the coefficients from this manifest and never goes to the network while
+    coefficients exist locally.
+    """
+
+    VALIDATORS_FILE_NAME = "http_validators.json"
+
+    def __init__(
+            self,
+            url: str,
+            json_folder_path: str,
+            timeout: float = 30.0,
+            session: Optional[requests.Session] = None
+    ):
+        """
+        Initializes the refresher.
+
+        Parameters
+        ----------
+        url : str
+            The url of the coefficients page, e.g. a local HTTP server in tests.
+        json_folder_path : str
+            The path of the folder where the json files are saved.
+        timeout : float
+            Timeout of the requests, in seconds.
+        session : Optional[requests.Session]
+            Session used to send the requests. A new session is created by default.
+        """
+        self.url = url
+        self.json_folder_path = json_folder_path
+        self.timeout = timeout
+        self.session = session if session else requests.Session()
+        self.counters = AcquisitionCounters(parent=get_process_counters())
+        self.last_result: Optional[RefreshResult] = None
+        self.last_exception: Optional[Exception] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def validators_file_path(self) -> str:
+        """
+        The path of the json file containing the validators of the last response, by url.
+
+        Returns
+        -------
+        validators_file_path : str
+            The path of the validators file.
+        """
+        return os.path.join(self.json_folder_path, self.VALIDATORS_FILE_NAME)
+
+    def _load_validators(self) -> Dict[str, Dict[str, str]]:
+        """
+        Loads the validators of the last responses.
+
+        Returns
+        -------
+        validators : Dict[str, Dict[str, str]]
+            The ETag and Last-Modified headers of the last response, by url.
+        """
+        if os.path.exists(self.validators_file_path):
+            with open(self.validators_file_path) as file:
+                return json.load(file)
+        else:
+            return {}
+
+    def _get_request_headers(self) -> Dict[str, str]:
+        """
+        Gets the conditional request headers built from the validators of the last response.
+
+        Returns
+        -------
+        headers : Dict[str, str]
+            The request headers.
+        """
+        validators = self._load_validators().get(self.url, {})
+        headers = {}
+        if "ETag" in validators:
+            headers["If-None-Match"] = validators["ETag"]
+        if "Last-Modified" in validators:
+            headers["If-Modified-Since"] = validators["Last-Modified"]
+
+        return headers
+
+    def _fetch(self) -> requests.Response:
+        """
+        Sends the conditional request.
+
+        Returns
+        -------
+        response : requests.Response
+            The response.
+        """
+        response = self.session.get(self.url, headers=self._get_request_headers(), timeout=self.timeout)
+        self.counters.increment("http_requests")
+        self.counters.increment("bytes_downloaded", len(response.content))
+        response.raise_for_status()
+
+        return response
+
+    def _save(self, response: requests.Response) -> RefreshResult:
+        """
+        Parses all the tables of a page in one pass and writes the coefficients tables, their bundle, the manifest
+        and the validators of the response atomically. The bundle is rebuilt from the json files even if a bundle of
+        the same date exists, since a modified page may hold corrected coefficients without a new date.
+
+        Parameters
+        ----------
+        response : requests.Response
+            The response.
+
+        Returns
+        -------
+        result : RefreshResult
+            The result of the refresh.
+        """
+        url_content = response.text
+        with self.counters.time_parse():
+            date = parse_date(url_content)
+            tables = pd.read_html(StringIO(url_content))
+        json_file_paths = save_tables(tables, WebTableScraper.DATAFRAME_CATEGORIES, date, self.json_folder_path)
+
+        bundle_folder_path = os.path.join(self.json_folder_path, get_bundle_folder_name(date))
+        variables_json_file_path, spline_json_file_path = json_file_paths
+        CoefficientsBundle.create(
+            variables_dataframe=read_json_table(variables_json_file_path),
+            spline_dataframe=read_json_table(spline_json_file_path),
+            folder_path=bundle_folder_path,
+            overwrite=True
+        )
+        self.counters.increment("json_reads", 2)
+        write_manifest(self.json_folder_path, self.url, date)
+
+        validators = self._load_validators()
+        validators[self.url] = {
+            header: response.headers[header] for header in ("ETag", "Last-Modified") if header in response.headers
+        }
+        write_atomically(self.validators_file_path, json.dumps(validators, indent=1))
+
+        page = get_page(self.url)
+        with page.lock:
+            page.url_content, page.date, page.tables = url_content, date, tables
+
+        return RefreshResult(
+            modified=True,
+            date=date,
+            json_file_paths=json_file_paths,
+            bundle_folder_path=bundle_folder_path
+        )
+
+    def refresh_sync(self) -> RefreshResult:
+        """
+        Refreshes the coefficients, blocking the calling thread.
+
+        Returns
+        -------
+        result : RefreshResult
+            The result of the refresh.
+        """
+        response = self._fetch()
+        if response.status_code == requests.codes.not_modified:
+            self.counters.increment("page_cache_hits")
+            return RefreshResult(modified=False)
+
+        self.counters.increment("page_cache_misses")
+
+        return self._save(response)
+
+    async def refresh(self) -> RefreshResult:
+        """
+        Refreshes the coefficients. The request, the parsing and the writing run in a worker thread, so that the
+        event loop is never blocked.
+
+        Returns
+        -------
+        result : RefreshResult
+            The result of the refresh.
+        """
+        return await asyncio.to_thread(self.refresh_sync)
+
+    async def _run(self, interval: float) -> None:
+        """
+        Refreshes the coefficients periodically. A failed refresh, e.g. a network error, is stored in last_exception
+        and retried at the next interval, so that the background task never dies.
+
+        Parameters
+        ----------
+        interval : float
+            Interval between two refreshes, in seconds.
+        """
+        while True:
+            try:
+                self.last_result = await self.refresh()
+                self.last_exception = None
+            except Exception as exception:
+                self.last_exception = exception
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float = 24*60*60) -> asyncio.Task:
+        """
+        Starts refreshing the coefficients periodically as a background task of the running event loop.
+
+        Parameters
+        ----------
+        interval : float
+            Interval between two refreshes, in seconds.
+
+        Returns
+        -------
+        task : asyncio.Task
+            The background task.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+        return self._task
+
+    async def stop(self) -> None:
+        """
+        Stops the background task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,431 @@
+from functools import lru_cache
+import re
+from typing import Collection, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+from numpy.typing import DTypeLike
+import pandas as pd
+
+from ...profiling import stage
+from .model_spec import FEATURES, MODEL_SPEC, TermSpec, TermType, get_term
+
+
+class FeatureEffect(NamedTuple):
+    coefficient: float = 0.0
+    knots: Tuple[float, ...] = ()
+    weights: Tuple[float, ...] = ()
+    table: Optional[np.ndarray] = None
+
+
+class CompiledModel:
+    """
+    A model compiled from a coefficients table. The effects of all the terms of a feature (e.g. the linear and the
+    spline terms of the PSA) are folded into a single FeatureEffect so that the linear predictor is evaluated in one
+    fused pass over each feature, accumulating in place in a single output array.
+    """
+
+    def __init__(
+            self,
+            intercept: float,
+            effects: Mapping[str, FeatureEffect],
+            scaling_parameter: Optional[float] = None,
+            sub_model_months: Optional[float] = None
+    ):
+        """
+        Initializes the compiled model.
+
+        Parameters
+        ----------
+        intercept : float
+            The intercept.
+        effects : Mapping[str, FeatureEffect]
+            The effect of each feature used by the model, by feature.
+        scaling_parameter : Optional[float]
+            The scaling parameter of survival models.
+        sub_model_months : Optional[float]
+            The number of months at which the survival probability of the sub-model is used as a variable.
+        """
+        self.intercept = intercept
+        self.effects = effects
+        self.scaling_parameter = scaling_parameter
+        self.sub_model_months = sub_model_months
+
+    @property
+    def features(self) -> Tuple[str, ...]:
+        """
+        The features used by the model.
+
+        Returns
+        -------
+        features : Tuple[str, ...]
+            The features used by the model.
+        """
+        return tuple(self.effects)
+
+    @property
+    def inputs(self) -> Tuple[str, ...]:
+        """
+        The inputs needed to compute the features of the model, e.g. "primary_gleason" and "secondary_gleason" for
+        the "biopsy_grade_group" feature.
+
+        Returns
+        -------
+        inputs : Tuple[str, ...]
+            The inputs of the model.
+        """
+        inputs = []
+        for feature in self.features:
+            inputs += [_input for _input in FEATURES[feature].inputs if _input not in inputs]
+
+        return tuple(inputs)
+
+    @staticmethod
+    def encode_feature(
+            feature: str,
+            inputs: Mapping[str, np.ndarray],
+            dtype: DTypeLike = np.float64
+    ) -> np.ndarray:
+        """
+        Encodes a feature from the inputs.
+
+        Parameters
+        ----------
+        feature : str
+            The feature.
+        inputs : Mapping[str, np.ndarray]
+            The inputs, i.e. the patients data.
+        dtype : DTypeLike
+            The floating point type of numerical features.
+
+        Returns
+        -------
+        values : np.ndarray
+            The encoded feature.
+        """
+        feature_spec = FEATURES[feature]
+        if feature_spec.encoder:
+            values = [inputs[_input] for _input in feature_spec.inputs]
+            return feature_spec.encoder(
+                *[value if isinstance(value, pd.Categorical) else np.asarray(value) for value in values]
+            )
+        else:
+            return np.asarray(inputs[feature_spec.inputs[0]], dtype=dtype)
+
+    def encode(self, inputs: Mapping[str, np.ndarray], dtype: DTypeLike = np.float64) -> Dict[str, np.ndarray]:
+        """
+        Encodes all the features of the model.
+
+        Parameters
+        ----------
+        inputs : Mapping[str, np.ndarray]
+            The inputs, i.e. the patients data.
+        dtype : DTypeLike
+            The floating point type of numerical features.
+
+        Returns
+        -------
+        features : Dict[str, np.ndarray]
+            The encoded features.
+        """
+        features = {}
+        for feature in self.features:
+            with stage(f"CompiledModel.encode.{feature}"):
+                features[feature] = self.encode_feature(feature, inputs, dtype)
+
+        return features
+
+    def accumulate(self, feature: str, values: np.ndarray, out: np.ndarray, buffer: np.ndarray) -> None:
+        """
+        Adds the effect of a feature to the linear predictor.
+
+        Parameters
+        ----------
+        feature : str
+            The feature.
+        values : np.ndarray
+            The encoded feature.
+        out : np.ndarray
+            The linear predictor, modified in place.
+        buffer : np.ndarray
+            A scratch array of the same shape and type as out.
+        """
+        effect = self.effects[feature]
+
+        if effect.table is not None:
+            np.take(effect.table.astype(out.dtype, copy=False), values, out=buffer)
+            out += buffer
+        if effect.coefficient:
+            np.multiply(values, effect.coefficient, out=buffer)
+            out += buffer
+        for knot, weight in zip(effect.knots, effect.weights):
+            np.subtract(values, knot, out=buffer)
+            np.maximum(buffer, 0, out=buffer)
+            np.power(buffer, 3, out=buffer)
+            buffer *= weight
+            out += buffer
+
+    def linear_predictor_from_features(
+            self,
+            features: Mapping[str, np.ndarray],
+            dtype: DTypeLike = np.float64
+    ) -> np.ndarray:
+        """
+        Computes the linear predictor from the encoded features.
+
+        Parameters
+        ----------
+        features : Mapping[str, np.ndarray]
+            The encoded features.
+        dtype : DTypeLike
+            The floating point type of the linear predictor and of the intermediate arrays.
+
+        Returns
+        -------
+        linear_predictor : np.ndarray
+            The linear predictor.
+        """
+        shape = np.shape(next(iter(features.values())))
+        linear_predictor = np.full(shape, self.intercept, dtype=dtype)
+        buffer = np.empty(shape, dtype=dtype)
+
+        for feature in self.effects:
+            with stage(f"CompiledModel.accumulate.{feature}", rows=len(linear_predictor)):
+                self.accumulate(feature, features[feature], linear_predictor, buffer)
+
+        return linear_predictor
+
+    def linear_predictor(self, inputs: Mapping[str, np.ndarray], dtype: DTypeLike = np.float64) -> np.ndarray:
+        """
+        Computes the linear predictor from the inputs.
+
+        Parameters
+        ----------
+        inputs : Mapping[str, np.ndarray]
+            The inputs, i.e. the patients data.
+        dtype : DTypeLike
+            The floating point type of the linear predictor and of the intermediate arrays.
+
+        Returns
+        -------
+        linear_predictor : np.ndarray
+            The linear predictor.
+        """
+        return self.linear_predictor_from_features(self.encode(inputs, dtype), dtype)
+
+    def encode_feature_on_grid(
+            self,
+            feature: str,
+            inputs: Mapping[str, np.ndarray],
+            varied_inputs: Collection[str],
+            dtype: DTypeLike = np.float64
+    ) -> np.ndarray:
+        """
+        Encodes a feature depending on varied inputs. Its per-patient inputs are broadcast against the varied inputs,
+        so that a feature depending only on varied inputs, e.g. the PSA, is encoded once per grid point instead of
+        once per patient and grid point.
+
+        Parameters
+        ----------
+        feature : str
+            The feature.
+        inputs : Mapping[str, np.ndarray]
+            The inputs. The varied inputs have one axis per grid dimension after the patients axis, the other inputs
+            are 1-dimensional arrays of the patients data.
+        varied_inputs : Collection[str]
+            The varied inputs.
+        dtype : DTypeLike
+            The floating point type of numerical features.
+
+        Returns
+        -------
+        values : np.ndarray
+            The encoded feature, broadcastable to the shape of the grid.
+        """
+        feature_spec = FEATURES[feature]
+        number_of_axes = max(np.ndim(inputs[_input]) for _input in varied_inputs)
+        values = np.broadcast_arrays(*[
+            np.asarray(inputs[_input]) if _input in varied_inputs
+            else np.asarray(inputs[_input]).reshape((-1, ) + (1, )*(number_of_axes - 1))
+            for _input in feature_spec.inputs
+        ])
+        if feature_spec.encoder:
+            return feature_spec.encoder(*[value.ravel() for value in values]).reshape(values[0].shape)
+        else:
+            return np.asarray(values[0], dtype=dtype)
+
+    def linear_predictor_grid(
+            self,
+            inputs: Mapping[str, np.ndarray],
+            varied_inputs: Collection[str],
+            shape: Tuple[int, ...],
+            dtype: DTypeLike = np.float64
+    ) -> np.ndarray:
+        """
+        Computes the linear predictor of each patient at each point of a grid of values of some inputs. The effects
+        of the features that do not depend on the varied inputs are computed once per patient, and the effects of
+        the other features only on the shape of their inputs.
+
+        Parameters
+        ----------
+        inputs : Mapping[str, np.ndarray]
+            The inputs. The varied inputs have one axis per grid dimension after the patients axis, e.g. the shape
+            (1, G1, 1) for the first dimension of a 2-dimensional grid, the other inputs are 1-dimensional arrays of
+            the patients data.
+        varied_inputs : Collection[str]
+            The varied inputs.
+        shape : Tuple[int, ...]
+            The shape of the linear predictor, i.e. (N, G1, ..., Gk).
+        dtype : DTypeLike
+            The floating point type of the linear predictor and of the intermediate arrays.
+
+        Returns
+        -------
+        linear_predictor : np.ndarray
+            The linear predictor, of the given shape.
+        """
+        is_varied = {feature: bool(set(FEATURES[feature].inputs) & set(varied_inputs)) for feature in self.features}
+
+        linear_predictor = np.full(shape[0], self.intercept, dtype=dtype)
+        buffer = np.empty_like(linear_predictor)
+        for feature in self.features:
+            if not is_varied[feature]:
+                with stage(f"CompiledModel.accumulate.{feature}", rows=shape[0]):
+                    self.accumulate(feature, self.encode_feature(feature, inputs, dtype), linear_predictor, buffer)
+
+        linear_predictor = linear_predictor.reshape((-1, ) + (1, )*(len(shape) - 1))
+        for feature in self.features:
+            if is_varied[feature]:
+                with stage(f"CompiledModel.accumulate_grid.{feature}"):
+                    values = self.encode_feature_on_grid(feature, inputs, varied_inputs, dtype)
+                    effect = np.zeros(values.shape, dtype=dtype)
+                    self.accumulate(feature, values, effect, np.empty_like(effect))
+                    linear_predictor = linear_predictor + effect
+
+        return np.ascontiguousarray(np.broadcast_to(linear_predictor, shape))
+
+
+def _get_knots(spline_coefficients: Mapping[str, float], knots_prefix: str) -> Tuple[float, ...]:
+    """
+    Gets the knots of a spline, sorted by their number, e.g. PSAPreopKnot1, PSAPreopKnot2, etc.
+
+    Parameters
+    ----------
+    spline_coefficients : Mapping[str, float]
+        The spline knots values.
+    knots_prefix : str
+        The prefix of the knots names.
+
+    Returns
+    -------
+    knots : Tuple[float, ...]
+        The knots.
+    """
+    knots = {
+        int(match.group(1)): value for name, value in spline_coefficients.items()
+        if (match := re.fullmatch(rf"{knots_prefix}(\d+)", name))
+    }
+
+    return tuple(knots[number] for number in sorted(knots))
+
+
+def _get_spline_weights(knots: Tuple[float, ...], coefficients: Mapping[int, float]) -> Tuple[float, ...]:
+    """
+    Folds the coefficients of the restricted cubic spline basis into one weight per knot, so that the spline terms
+    sum to sum_k(weight_k * max(x - knot_k, 0)**3). The basis j (from 1 to K - 2) is
+
+        (x - t_j)+^3 - (x - t_{K-1})+^3 (t_K - t_j)/(t_K - t_{K-1}) + (x - t_K)+^3 (t_{K-1} - t_j)/(t_K - t_{K-1}).
+
+    Parameters
+    ----------
+    knots : Tuple[float, ...]
+        The K knots.
+    coefficients : Mapping[int, float]
+        The coefficient of each basis, by basis number.
+
+    Returns
+    -------
+    weights : Tuple[float, ...]
+        The weight of each knot.
+    """
+    weights = [0.0]*len(knots)
+    penultimate_knot, last_knot = knots[-2], knots[-1]
+    for basis, coefficient in coefficients.items():
+        knot = knots[basis - 1]
+        weights[basis - 1] += coefficient
+        weights[-2] -= coefficient*(last_knot - knot)/(last_knot - penultimate_knot)
+        weights[-1] += coefficient*(penultimate_knot - knot)/(last_knot - penultimate_knot)
+
+    return tuple(weights)
+
+
+@lru_cache(maxsize=None)
+def _compile_model(
+        variables_coefficients: Tuple[Tuple[str, float], ...],
+        spline_coefficients: Tuple[Tuple[str, float], ...],
+        model_spec: Tuple[TermSpec, ...]
+) -> CompiledModel:
+    intercept, scaling_parameter, sub_model_months = 0.0, None, None
+    coefficients, categories, splines = {}, {}, {}
+    for variable, value in variables_coefficients:
+        term = get_term(variable, model_spec)
+        if term.term_type == TermType.INTERCEPT:
+            intercept = value
+        elif term.term_type == TermType.SCALING_PARAMETER:
+            scaling_parameter = value
+        elif term.term_type in (TermType.LINEAR, TermType.SUB_MODEL):
+            coefficients[term.feature] = value
+            if term.term_type == TermType.SUB_MODEL:
+                sub_model_months = 12*float(term.level)
+        elif term.term_type == TermType.CATEGORICAL:
+            categories.setdefault(term.feature, {})[term.level] = value
+        elif term.term_type == TermType.SPLINE:
+            splines.setdefault((term.feature, term.knots_prefix), {})[int(term.level)] = value
+
+    spline_coefficients = dict(spline_coefficients)
+    effects = {feature: FeatureEffect(coefficient=value) for feature, value in coefficients.items()}
+    for feature, levels in categories.items():
+        table = np.array([levels.get(level, 0.0) for level in FEATURES[feature].levels])
+        table.setflags(write=False)
+        effects[feature] = effects.get(feature, FeatureEffect())._replace(table=table)
+    for (feature, knots_prefix), basis_coefficients in splines.items():
+        knots = _get_knots(spline_coefficients, knots_prefix)
+        weights = _get_spline_weights(knots, basis_coefficients)
+        effects[feature] = effects.get(feature, FeatureEffect())._replace(knots=knots, weights=weights)
+
+    return CompiledModel(
+        intercept=intercept,
+        effects={feature: effects[feature] for feature in FEATURES if feature in effects},
+        scaling_parameter=scaling_parameter,
+        sub_model_months=sub_model_months
+    )
+
+
+def compile_model(
+        variables_coefficients: Mapping[str, float],
+        spline_coefficients: Mapping[str, float],
+        model_spec: Tuple[TermSpec, ...] = MODEL_SPEC
+) -> CompiledModel:
+    """
+    Compiles a model from its coefficients table. Compiled models are cached by coefficients values, so models
+    sharing the same coefficients (e.g. the BCR model used as a variable of the prostate cancer death model) are only
+    compiled once.
+
+    Parameters
+    ----------
+    variables_coefficients : Mapping[str, float]
+        Coefficients of the variables, by variable name.
+    spline_coefficients : Mapping[str, float]
+        The spline knots values, by knot name.
+    model_spec : Tuple[TermSpec, ...]
+        The model specification mapping each variable name of the coefficients table to a term.
+
+    Returns
+    -------
+    compiled_model : CompiledModel
+        The compiled model.
+    """
+    return _compile_model(
+        tuple(variables_coefficients.items()),
+        tuple(spline_coefficients.items()),
+        model_spec
+    )
@@ -0,0 +1,232 @@
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ...enum import ClassificationOutcome, SurvivalOutcome
+from ...frames import Frame, get_column_names, get_number_of_rows
+from ...profiling import stage
+from .backends import Link
+from .model import Model
+from .validation import validate_inputs, Violation
+
+
+REDUCED_OUTCOMES: Dict[str, str] = {
+    ClassificationOutcome.EXTRACAPSULAR_EXTENSION_CORES: ClassificationOutcome.EXTRACAPSULAR_EXTENSION,
+    ClassificationOutcome.LYMPH_NODE_INVOLVEMENT_CORES: ClassificationOutcome.LYMPH_NODE_INVOLVEMENT,
+    ClassificationOutcome.ORGAN_CONFINED_DISEASE_CORES: ClassificationOutcome.ORGAN_CONFINED_DISEASE,
+    ClassificationOutcome.SEMINAL_VESICLE_INVASION_CORES: ClassificationOutcome.SEMINAL_VESICLE_INVASION,
+    SurvivalOutcome.PREOPERATIVE_BCR_CORES: SurvivalOutcome.PREOPERATIVE_BCR,
+    SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH_CORES: SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH,
+    SurvivalOutcome.POSTOPERATIVE_BCR_CLINICAL: SurvivalOutcome.POSTOPERATIVE_BCR,
+    SurvivalOutcome.POSTOPERATIVE_PROSTATE_CANCER_DEATH_CLINICAL: SurvivalOutcome.POSTOPERATIVE_PROSTATE_CANCER_DEATH
+}
+
+
+class FallbackModel:
+
+    def __init__(self, models: Sequence[Model]):
+        """
+        Initializes the models, ordered from the most complete to the most reduced, e.g. the "(Cores)" model of an
+        outcome followed by its plain model, or a postoperative "(Clinical)" model followed by its plain model. Each
+        row is scored by the first model whose inputs are all available in the row, and the models are evaluated once
+        each, on the group of rows routed to them.
+
+        Parameters
+        ----------
+        models : Sequence[Model]
+            The models, from the most complete to the most reduced. They must all be logistic or all be survival
+            models.
+        """
+        assert len(models) > 0, "At least one model must be given."
+        assert len(set(model.model_type for model in models)) == 1, "Models must all be of the same type."
+        assert len(models) < 128, "Too many models."
+
+        self.models = list(models)
+
+    @property
+    def model_type(self) -> str:
+        """
+        Type of the models, i.e. "logistic" or "survival".
+
+        Returns
+        -------
+        model_type : str
+            The type of the models.
+        """
+        return self.models[0].model_type
+
+    @property
+    def outcomes(self) -> Tuple[str, ...]:
+        """
+        Outcomes of the models, indexed by the model indices returned with the predictions.
+
+        Returns
+        -------
+        outcomes : Tuple[str, ...]
+            The outcomes of the models.
+        """
+        return tuple(str(model.outcome) for model in self.models)
+
+    def get_availability(self, dataframe: Frame) -> np.ndarray:
+        """
+        Gets, for each model, the rows in which all its inputs are available, i.e. neither missing nor malformed.
+        No row is available for a model whose columns are absent from the dataframe or not given (e.g. the cores
+        columns of a "(Cores)" model).
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        availability : numpy.ndarray
+            A boolean mask of shape (number of models, number of rows).
+        """
+        return np.stack([self._get_inputs(model, dataframe)[1] for model in self.models])
+
+    def get_model_indices(self, dataframe: Frame) -> np.ndarray:
+        """
+        Routes each row to the most complete model its data supports.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        model_indices : numpy.ndarray
+            The index of the model scoring each row in models, or -1 if no model supports the row.
+        """
+        model_indices = np.full(get_number_of_rows(dataframe), -1, dtype=np.int8)
+        for model_index, is_available in enumerate(self.get_availability(dataframe)):
+            model_indices[is_available & (model_indices == -1)] = model_index
+
+        return model_indices
+
+    @staticmethod
+    def _get_inputs(model: Model, dataframe: Frame) -> Tuple[Optional[Dict[str, np.ndarray]], np.ndarray]:
+        """
+        Gets the validated inputs of a model and the rows in which they are all available.
+
+        Parameters
+        ----------
+        model : Model
+            The model.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        inputs, is_available : Tuple[Optional[Dict[str, numpy.ndarray]], numpy.ndarray]
+            The inputs, by input name, or None if a column is absent, and the boolean mask of the available rows.
+        """
+        column_names = set(get_column_names(dataframe))
+        if not all(column_name in column_names for column_name in model.inputs_column_names):
+            return None, np.zeros(get_number_of_rows(dataframe), dtype=bool)
+
+        inputs, report = validate_inputs(model._get_validation_inputs(dataframe))
+        is_available = (report.violations & np.uint8(Violation.MISSING | Violation.MALFORMED)) == 0
+
+        return inputs, is_available
+
+    def _predict(
+            self,
+            dataframe: Frame,
+            link: Link,
+            number_of_months: Union[np.ndarray, list, float, int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes a link function for each row with the most complete model its data supports.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        link : Link
+            The link function.
+        number_of_months : Union[numpy.ndarray, list, float, int]
+            The number of months. It is used only for the survival link.
+
+        Returns
+        -------
+        predictions, model_indices : Tuple[numpy.ndarray, numpy.ndarray]
+            The predictions, NaN for the rows supported by no model, and the index of the model scoring each row in
+            models, or -1 if no model supports the row.
+        """
+        number_of_rows = get_number_of_rows(dataframe)
+        predictions = np.full(number_of_rows, np.nan, dtype=self.models[0].dtype)
+        model_indices = np.full(number_of_rows, -1, dtype=np.int8)
+        for model_index, model in enumerate(self.models):
+            is_unassigned = model_indices == -1
+            if not is_unassigned.any():
+                break
+
+            with stage("FallbackModel.route", rows=number_of_rows):
+                inputs, is_available = self._get_inputs(model, dataframe)
+                rows = np.flatnonzero(is_available & is_unassigned)
+            if len(rows) == 0:
+                continue
+
+            inputs = {_input: values[rows] for _input, values in inputs.items()}
+            months = number_of_months
+            if np.ndim(number_of_months) > 0:
+                months = np.asarray(number_of_months)[rows]
+
+            predictions[rows] = model._predict_from_inputs(inputs, link, months)
+            model_indices[rows] = model_index
+
+        return predictions, model_indices
+
+    def predict_proba(
+            self,
+            dataframe: Frame,
+            number_of_months: Union[np.ndarray, list, float, int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the predictions of each row with the most complete model its data supports.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        number_of_months : Union[numpy.ndarray, list, float, int], optional
+            The number of months. It is used only for survival models.
+
+        Returns
+        -------
+        predictions, model_indices : Tuple[numpy.ndarray, numpy.ndarray]
+            The predictions, NaN for the rows supported by no model, and the index of the model scoring each row in
+            models, or -1 if no model supports the row.
+        """
+        if self.model_type == "survival":
+            if number_of_months is None:
+                raise ValueError("Number of months must be given.")
+            return self._predict(dataframe, Link.SURVIVAL, number_of_months)
+        elif self.model_type == "logistic":
+            return self._predict(dataframe, Link.LOGISTIC, None)
+        else:
+            raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def predict_risk(self, dataframe: Frame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the risk predictions of each row with the most complete model its data supports.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        predictions, model_indices : Tuple[numpy.ndarray, numpy.ndarray]
+            The risk predictions, NaN for the rows supported by no model, and the index of the model scoring each row
+            in models, or -1 if no model supports the row.
+        """
+        if self.model_type == "survival":
+            return self._predict(dataframe, Link.RISK, None)
+        elif self.model_type == "logistic":
+            raise ValueError("Logistic models don't have risk predictions.")
+        else:
+            raise ValueError(f"Model type {self.model_type} doesn't exist.")
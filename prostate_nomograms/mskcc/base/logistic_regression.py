@@ -1,15 +1,24 @@
 from __future__ import annotations
-from typing import Mapping, Optional, TYPE_CHECKING
+import copy
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING, Union
 
 if TYPE_CHECKING:
     from .survival_regression import SurvivalRegression
 
 import numpy as np
-import pandas as pd
+from numpy.typing import DTypeLike
+
+from ...frames import Frame, get_column, get_number_of_rows
+from ...profiling import stage
+from .backends import Backend, FusedKernel, get_backend, Link
+from .compiled_model import compile_model
 
 
 class LogisticRegression:
 
+    LINKS = (Link.LINEAR_PREDICTOR, Link.LOGISTIC)
+
     def __init__(
             self,
             variables_coefficients: Mapping[str, float],
@@ -22,6 +31,14 @@ class LogisticRegression:
             clinical_stage_column_name: str = "CLINICAL_STAGE",
             number_of_positive_cores_column_name: Optional[str] = None,
             number_of_negative_cores_column_name: Optional[str] = None,
+            pathologic_primary_gleason_column_name: str = "PATHOLOGIC_GLEASON_PRIMARY",
+            pathologic_secondary_gleason_column_name: str = "PATHOLOGIC_GLEASON_SECONDARY",
+            extracapsular_extension_column_name: str = "EXTRACAPSULAR_EXTENSION",
+            seminal_vesicle_invasion_column_name: str = "SEMINAL_VESICLE_INVASION",
+            lymph_node_involvement_column_name: str = "LYMPH_NODE_INVOLVEMENT",
+            surgical_margin_status_column_name: str = "SURGICAL_MARGIN_STATUS",
+            backend: Optional[Union[str, Backend]] = None,
+            dtype: DTypeLike = np.float64
     ):
         """
         Initializes columns names.
@@ -48,6 +65,24 @@ class LogisticRegression:
             Name of the column containing the number of positive cores of the patients.
         number_of_negative_cores_column_name : str, optional
             Name of the column containing the number of negative cores of the patients.
+        pathologic_primary_gleason_column_name : str
+            Name of the column containing the primary pathologic Gleason score of the patients.
+        pathologic_secondary_gleason_column_name : str
+            Name of the column containing the secondary pathologic Gleason score of the patients.
+        extracapsular_extension_column_name : str
+            Name of the column containing the extracapsular extension status (0 or 1) of the patients.
+        seminal_vesicle_invasion_column_name : str
+            Name of the column containing the seminal vesicle invasion status (0 or 1) of the patients.
+        lymph_node_involvement_column_name : str
+            Name of the column containing the lymph node involvement status (0 or 1) of the patients.
+        surgical_margin_status_column_name : str
+            Name of the column containing the surgical margin status (0 or 1) of the patients.
+        backend : Optional[Union[str, Backend]]
+            Backend used to compute the predictions. Defaults to the fastest available backend, i.e. numba if it is
+            installed, then numexpr, then NumPy.
+        dtype : DTypeLike
+            Floating point type of the predictions and of the intermediate arrays, e.g. numpy.float32 to halve the
+            memory and bandwidth used by the predictions.
         """
         self.variables_coefficients = variables_coefficients
         self.spline_coefficients = spline_coefficients
@@ -60,94 +95,324 @@ class LogisticRegression:
         self.clinical_stage_column_name = clinical_stage_column_name
         self.number_of_positive_cores = number_of_positive_cores_column_name
         self.number_of_negative_cores = number_of_negative_cores_column_name
+        self.pathologic_primary_gleason_column_name = pathologic_primary_gleason_column_name
+        self.pathologic_secondary_gleason_column_name = pathologic_secondary_gleason_column_name
+        self.extracapsular_extension_column_name = extracapsular_extension_column_name
+        self.seminal_vesicle_invasion_column_name = seminal_vesicle_invasion_column_name
+        self.lymph_node_involvement_column_name = lymph_node_involvement_column_name
+        self.surgical_margin_status_column_name = surgical_margin_status_column_name
+
+        self.compiled_model = compile_model(variables_coefficients, spline_coefficients)
+        self.backend = get_backend(backend)
+        self.dtype = np.dtype(dtype)
+        self._fused_kernels = {}
+
+    @property
+    def inputs_column_names(self) -> Mapping[str, Optional[str]]:
+        """
+        Name of the column containing each input of the model specification.
 
-    def _get_gleason_value(self, data_dict: dict) -> np.ndarray:
-        primary_gleason = np.array(data_dict[self.primary_gleason_column_name])
-        secondary_gleason = np.array(data_dict[self.secondary_gleason_column_name])
-        total_gleason_score = primary_gleason + secondary_gleason
+        Returns
+        -------
+        inputs_column_names : Mapping[str, Optional[str]]
+            Name of the column containing each input.
+        """
+        return {
+            "age": self.age_column_name,
+            "psa": self.psa_column_name,
+            "primary_gleason": self.primary_gleason_column_name,
+            "secondary_gleason": self.secondary_gleason_column_name,
+            "clinical_stage": self.clinical_stage_column_name,
+            "number_of_positive_cores": self.number_of_positive_cores,
+            "number_of_negative_cores": self.number_of_negative_cores,
+            "pathologic_primary_gleason": self.pathologic_primary_gleason_column_name,
+            "pathologic_secondary_gleason": self.pathologic_secondary_gleason_column_name,
+            "extracapsular_extension": self.extracapsular_extension_column_name,
+            "seminal_vesicle_invasion": self.seminal_vesicle_invasion_column_name,
+            "lymph_node_involvement": self.lymph_node_involvement_column_name,
+            "surgical_margin_status": self.surgical_margin_status_column_name
+        }
+
+    def get_inputs(
+            self,
+            dataframe: Frame,
+            regressor_as_variable: Optional[SurvivalRegression] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Gets the inputs of the compiled model from the dataframe.
 
-        gleason_value = np.zeros_like(total_gleason_score, dtype=float)
-        mask_grade_2 = np.where(((primary_gleason == 3) & (secondary_gleason == 4)), True, False)
-        mask_grade_3 = np.where(((primary_gleason == 4) & (secondary_gleason == 3)), True, False)
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        regressor_as_variable : Optional[SurvivalRegression]
+            The regressor as variable.
 
-        gleason_value[mask_grade_2] = self.variables_coefficients["Biopsy Gleason Grade Group 2"]
-        gleason_value[mask_grade_3] = self.variables_coefficients["Biopsy Gleason Grade Group 3"]
-        gleason_value[total_gleason_score == 8] = self.variables_coefficients["Biopsy Gleason Grade Group 4"]
-        gleason_value[total_gleason_score == 9] = self.variables_coefficients["Biopsy Gleason Grade Group 5"]
-        gleason_value[total_gleason_score == 10] = self.variables_coefficients["Biopsy Gleason Grade Group 5"]
+        Returns
+        -------
+        inputs : Dict[str, np.ndarray]
+            The inputs, by input name.
+        """
+        inputs_column_names = self.inputs_column_names
+        inputs = {}
+        for _input in self.compiled_model.inputs:
+            if _input == "sub_model":
+                if regressor_as_variable is None:
+                    raise ValueError("The regressor as variable must be given for this model.")
+                with stage("LogisticRegression.get_inputs.sub_model", rows=get_number_of_rows(dataframe)):
+                    inputs[_input] = regressor_as_variable.get_predicted_survival_probability(
+                        dataframe,
+                        self.compiled_model.sub_model_months
+                    )
+            else:
+                with stage("LogisticRegression.get_inputs.get_column", rows=get_number_of_rows(dataframe)):
+                    inputs[_input] = get_column(dataframe, inputs_column_names[_input])
+
+        return inputs
+
+    def _get_fused_kernel(self, link: Link) -> FusedKernel:
+        """
+        Gets the fused kernel computing the given link function with the backend of the regressor.
 
-        return gleason_value
+        Parameters
+        ----------
+        link : Link
+            The link function.
 
-    def _get_clinical_stage_value(self, data_dict: dict) -> np.ndarray:
-        tumor_stage = data_dict[self.clinical_stage_column_name]
+        Returns
+        -------
+        fused_kernel : FusedKernel
+            The fused kernel.
+        """
+        if link not in self._fused_kernels:
+            self._fused_kernels[link] = FusedKernel(self.compiled_model, link, self.backend)
 
-        clinical_stage_value = np.zeros_like(tumor_stage, dtype=float)
-        clinical_stage_value[list(map("T2a".__eq__, tumor_stage))] = self.variables_coefficients["Clinical Stage 2A"]
-        clinical_stage_value[list(map("T2b".__eq__, tumor_stage))] = self.variables_coefficients["Clinical Stage 2B"]
-        clinical_stage_value[list(map("T2c".__eq__, tumor_stage))] = self.variables_coefficients["Clinical Stage 2C"]
-        clinical_stage_value[list(map("T3a".__eq__, tumor_stage))] = self.variables_coefficients["Clinical Stage 3+"]
-        clinical_stage_value[list(map("T3b".__eq__, tumor_stage))] = self.variables_coefficients["Clinical Stage 3+"]
-        clinical_stage_value[list(map("T3c".__eq__, tumor_stage))] = self.variables_coefficients["Clinical Stage 3+"]
+        return self._fused_kernels[link]
 
-        return clinical_stage_value
+    def predict_from_inputs(
+            self,
+            inputs: Mapping[str, np.ndarray],
+            link: Link,
+            number_of_months: Optional[Union[np.ndarray, list, float, int]] = None
+    ) -> np.ndarray:
+        """
+        Computes a link function of the model from inputs already extracted from the patients data, including the
+        "sub_model" input for the models using a regressor as variable.
+
+        Parameters
+        ----------
+        inputs : Mapping[str, np.ndarray]
+            The inputs, by input name.
+        link : Link
+            The link function.
+        number_of_months : Optional[Union[np.ndarray, list, float, int]]
+            The number of months. It is used only for the survival link.
+
+        Returns
+        -------
+        result : numpy.ndarray
+            The result of the link function.
+        """
+        if self.backend != Backend.NUMPY:
+            return self._get_fused_kernel(link)(inputs, number_of_months, self.dtype)
+
+        linear_predictor = self.compiled_model.linear_predictor(inputs, self.dtype)
+        if link == Link.LINEAR_PREDICTOR:
+            return linear_predictor
+        elif link == Link.LOGISTIC:
+            return self.get_probability_from_linear_predictor(linear_predictor)
+        elif link == Link.SURVIVAL:
+            return self.get_survival_probability_from_linear_predictor(linear_predictor, number_of_months)
+        elif link == Link.RISK:
+            return self.get_risk_from_linear_predictor(linear_predictor)
+        else:
+            raise ValueError(f"Unknown link: {link}")
+
+    def freeze(self) -> LogisticRegression:
+        """
+        Gets a copy of the regressor whose fused kernels of all its link functions are built beforehand and stored in
+        a read-only mapping, so that predicting never modifies the regressor.
+
+        Returns
+        -------
+        regressor : LogisticRegression
+            The frozen copy of the regressor.
+        """
+        regressor = copy.copy(self)
+        if self.backend == Backend.NUMPY:
+            regressor._fused_kernels = MappingProxyType({})
+        else:
+            regressor._fused_kernels = MappingProxyType({link: self._get_fused_kernel(link) for link in self.LINKS})
+
+        return regressor
+
+    def get_encoded_features(
+            self,
+            dataframe: Frame,
+            regressor_as_variable: Optional[SurvivalRegression] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Gets the encoded features of the compiled model, i.e. the intermediate arrays from which the linear
+        predictor is computed.
 
-    def _get_positive_cores_value(self, data_dict: dict) -> np.ndarray:
-        return np.array(data_dict[self.number_of_positive_cores])*self.variables_coefficients["No. of Positive Cores"]
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        regressor_as_variable : Optional[SurvivalRegression]
+            The regressor as variable.
 
-    def _get_negative_cores_value(self, data_dict: dict):
-        return np.array(data_dict[self.number_of_negative_cores])*self.variables_coefficients["No. of Negative Cores"]
+        Returns
+        -------
+        features : Dict[str, np.ndarray]
+            The encoded features, by feature name.
+        """
+        return self.compiled_model.encode(self.get_inputs(dataframe, regressor_as_variable), self.dtype)
 
-    def _get_spline_term_1(self, psa: np.array) -> np.ndarray:
+    def get_linear_predictor_grid(
+            self,
+            dataframe: Frame,
+            grid: Mapping[str, Sequence],
+            regressor_as_variable: Optional[SurvivalRegression] = None
+    ) -> np.ndarray:
         """
-        Gets the spline term 1.
+        Gets the linear predictor of each patient at each point of a grid of values of some inputs, e.g. the PSA.
+        The terms that do not depend on the varied inputs are computed once per patient and the terms that depend on
+        them, e.g. the PSA spline, once per grid point, without building a frame of N x G rows.
 
         Parameters
         ----------
-        psa : numpy.ndarray
-            The PSA values.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        grid : Mapping[str, Sequence]
+            The values of each varied input, by input name, e.g. {"psa": numpy.linspace(2, 50, 100)}. Each varied
+            input is a dimension of the grid, in order.
+        regressor_as_variable : Optional[SurvivalRegression]
+            The regressor as variable.
 
         Returns
         -------
-        spline_term_1 : numpy.ndarray
-            The spline term 1.
+        linear_predictor : numpy.ndarray
+            The linear predictor, of shape (N, G1, ..., Gk).
         """
-        knot1 = self.spline_coefficients["PSAPreopKnot1"]
-        knot3 = self.spline_coefficients["PSAPreopKnot3"]
-        knot4 = self.spline_coefficients["PSAPreopKnot4"]
+        shape = (get_number_of_rows(dataframe), ) + tuple(len(values) for values in grid.values())
 
-        spline_term_1 = np.maximum(psa - knot1, np.zeros_like(psa))**3
-        spline_term_1 += -(np.maximum(psa - knot3, np.zeros_like(psa))**3) * (knot4 - knot1) / (knot4 - knot3)
-        spline_term_1 += (np.maximum(psa - knot4, np.zeros_like(psa))**3) * (knot3 - knot1) / (knot4 - knot3)
+        varied_inputs = {}
+        for axis, (_input, values) in enumerate(grid.items()):
+            axis_shape = [1]*len(shape)
+            axis_shape[axis + 1] = len(values)
+            varied_inputs[_input] = np.reshape(np.asarray(values), axis_shape)
 
-        return spline_term_1
+        return self._get_linear_predictor_on_varied_inputs(dataframe, varied_inputs, shape, regressor_as_variable)
 
-    def _get_spline_term_2(self, psa: np.array) -> np.ndarray:
+    def get_linear_predictor_replicates(
+            self,
+            dataframe: Frame,
+            replicates: Mapping[str, np.ndarray],
+            regressor_as_variable: Optional[SurvivalRegression] = None
+    ) -> np.ndarray:
         """
-        Gets the spline term 2.
+        Gets the linear predictor of each patient for each replicate of the values of some inputs, e.g. the multiple
+        imputations of missing values. The terms that do not depend on the replicated inputs are computed once per
+        patient and the other terms on all the replicates at once.
 
         Parameters
         ----------
-        psa : numpy.ndarray
-            The PSA values.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        replicates : Mapping[str, np.ndarray]
+            The values of each replicated input, by input name, of shape (N, M) where M is the number of replicates.
+        regressor_as_variable : Optional[SurvivalRegression]
+            The regressor as variable.
 
         Returns
         -------
-        spline_term_2 : numpy.ndarray
-            The spline term 2.
+        linear_predictor : numpy.ndarray
+            The linear predictor, of shape (N, M).
         """
-        knot2 = self.spline_coefficients["PSAPreopKnot2"]
-        knot3 = self.spline_coefficients["PSAPreopKnot3"]
-        knot4 = self.spline_coefficients["PSAPreopKnot4"]
+        replicates = {_input: np.asarray(values) for _input, values in replicates.items()}
+        shape = next(iter(replicates.values())).shape
+        assert all(values.shape == shape for values in replicates.values()), "Replicates must have the same shape."
+        assert len(shape) == 2 and shape[0] == get_number_of_rows(dataframe), "Replicates must be of shape (N, M)."
 
-        spline_term_2 = np.maximum(psa - knot2, np.zeros_like(psa)) ** 3
-        spline_term_2 += -(np.maximum(psa - knot3, np.zeros_like(psa)) ** 3) * (knot4 - knot2) / (knot4 - knot3)
-        spline_term_2 += (np.maximum(psa - knot4, np.zeros_like(psa)) ** 3) * (knot3 - knot2) / (knot4 - knot3)
+        return self._get_linear_predictor_on_varied_inputs(dataframe, replicates, shape, regressor_as_variable)
 
-        return spline_term_2
+    def _get_linear_predictor_on_varied_inputs(
+            self,
+            dataframe: Frame,
+            varied_inputs: Mapping[str, np.ndarray],
+            shape: Tuple[int, ...],
+            regressor_as_variable: Optional[SurvivalRegression] = None
+    ) -> np.ndarray:
+        """
+        Gets the linear predictor of each patient for varied values of some inputs, given with one axis per varied
+        dimension after the patients axis.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        varied_inputs : Mapping[str, np.ndarray]
+            The values of each varied input, by input name, broadcastable to the given shape.
+        shape : Tuple[int, ...]
+            The shape of the linear predictor, i.e. (N, G1, ..., Gk).
+        regressor_as_variable : Optional[SurvivalRegression]
+            The regressor as variable.
+
+        Returns
+        -------
+        linear_predictor : numpy.ndarray
+            The linear predictor, of the given shape.
+        """
+        number_of_rows = shape[0]
+        inputs_column_names = self.inputs_column_names
+
+        inputs = dict(varied_inputs)
+        varied = set(varied_inputs)
+        for _input in self.compiled_model.inputs:
+            if _input in varied:
+                continue
+            elif _input == "sub_model":
+                if regressor_as_variable is None:
+                    raise ValueError("The regressor as variable must be given for this model.")
+                sub_model_months = self.compiled_model.sub_model_months
+                if varied & set(regressor_as_variable.compiled_model.inputs):
+                    inputs[_input] = regressor_as_variable.get_survival_probability_from_linear_predictor(
+                        regressor_as_variable._get_linear_predictor_on_varied_inputs(dataframe, varied_inputs, shape),
+                        sub_model_months
+                    )
+                    varied.add(_input)
+                else:
+                    inputs[_input] = regressor_as_variable.get_predicted_survival_probability(
+                        dataframe,
+                        sub_model_months
+                    )
+            else:
+                with stage("LogisticRegression.get_inputs.get_column", rows=number_of_rows):
+                    inputs[_input] = get_column(dataframe, inputs_column_names[_input])
+
+        return self.compiled_model.linear_predictor_grid(inputs, varied, shape, self.dtype)
+
+    def get_probability_from_linear_predictor(self, linear_predictor: np.ndarray) -> np.ndarray:
+        """
+        Gets the predicted probability from the linear predictor.
+
+        Parameters
+        ----------
+        linear_predictor : numpy.ndarray
+            The linear predictor.
+
+        Returns
+        -------
+        predicted_probability : numpy.ndarray
+            The predicted probability.
+        """
+        with stage("LogisticRegression.logistic", rows=len(linear_predictor)):
+            return np.exp(linear_predictor)/(1 + np.exp(linear_predictor))
 
     def get_predicted_result(
             self,
-            dataframe: pd.DataFrame,
+            dataframe: Frame,
             regressor_as_variable: Optional[SurvivalRegression] = None
     ) -> np.array:
         """
@@ -155,8 +420,8 @@ class LogisticRegression:
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe that contains the patients data.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         regressor_as_variable : Optional[SurvivalRegression]
             The regressor as variable.
 
@@ -165,36 +430,16 @@ class LogisticRegression:
         predicted_result : numpy.ndarray
             The predicted result.
         """
-        data_dict = dataframe.to_dict(orient="list")
+        inputs = self.get_inputs(dataframe, regressor_as_variable)
 
-        result = self.variables_coefficients["Intercept"]
-
-        if regressor_as_variable:
-            keys = [k for k in self.variables_coefficients.keys() if k.startswith("Survival probability")]
-            assert len(keys) == 1, "There should be only one key that starts with 'Survival probability'"
-            coefficient = self.variables_coefficients[keys[0]]
-            result += coefficient*regressor_as_variable.get_predicted_survival_probability(dataframe, 60)
-            return result
+        if self.backend == Backend.NUMPY:
+            return self.compiled_model.linear_predictor(inputs, self.dtype)
         else:
-            result += np.array(data_dict[self.psa_column_name]) * self.variables_coefficients["Preoperative PSA"]
-
-            spline_term_1 = self._get_spline_term_1(np.array(data_dict[self.psa_column_name]))
-            spline_term_2 = self._get_spline_term_2(np.array(data_dict[self.psa_column_name]))
-            result += spline_term_1 * self.variables_coefficients["Preoperative PSA Spline 1"]
-            result += spline_term_2 * self.variables_coefficients["Preoperative PSA Spline 2"]
-
-            result += np.array(data_dict[self.age_column_name]) * self.variables_coefficients["Patient Age"]
-            result += self._get_gleason_value(data_dict)
-            result += self._get_clinical_stage_value(data_dict)
-
-            if self.cores:
-                result += self._get_positive_cores_value(data_dict)
-                result += self._get_negative_cores_value(data_dict)
-            return result
+            return self._get_fused_kernel(Link.LINEAR_PREDICTOR)(inputs, dtype=self.dtype)
 
     def get_predicted_probability(
             self,
-            dataframe: pd.DataFrame,
+            dataframe: Frame,
             regressor_as_variable: Optional[SurvivalRegression] = None
     ) -> np.array:
         """
@@ -202,8 +447,8 @@ class LogisticRegression:
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe that contains the patients data.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         regressor_as_variable : SurvivalRegression
             The regressor as variable.
 
@@ -212,5 +457,12 @@ class LogisticRegression:
         predicted_probability : numpy.ndarray
             The predicted probability.
         """
-        predicted_result = self.get_predicted_result(dataframe, regressor_as_variable)
-        return np.exp(predicted_result)/(1 + np.exp(predicted_result))
+        if self.backend == Backend.NUMPY:
+            return self.get_probability_from_linear_predictor(
+                self.get_predicted_result(dataframe, regressor_as_variable)
+            )
+        else:
+            return self._get_fused_kernel(Link.LOGISTIC)(
+                self.get_inputs(dataframe, regressor_as_variable),
+                dtype=self.dtype
+            )
@@ -1,12 +1,48 @@
-from typing import Mapping, Optional, Union
+import copy
+import hashlib
+from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
 
 import numpy as np
+from numpy.typing import DTypeLike
 import pandas as pd
 
 from ...enum import SurvivalOutcome
+from ...frames import Frame, get_column, get_number_of_rows
+from ...frozen import FrozenNomogram
+from ...imputation import (
+    get_imputed_values,
+    get_number_of_imputations,
+    ImputedPredictions,
+    pool_predictions,
+    PoolingScale
+)
+from ...precision import check_precision, PrecisionReport
+from ...profiling import stage
+from .backends import Backend, Link
+from .coefficients_bundle import CoefficientsBundle
 from .logistic_regression import LogisticRegression
+from .prediction_cache import PredictionCache
 from .survival_regression import SurvivalRegression
-from .web_table_scraper import CoefficientCategory, WebTableScraper
+from .acquisition_counters import AcquisitionCounters
+from .validation import get_validation_error, InvalidRows, validate_inputs, ValidationReport
+from .web_table_scraper import WebTableScraper
+
+
+WARM_UP_INPUTS: Mapping[str, Union[int, float, str]] = {
+    "age": 60,
+    "psa": 5.0,
+    "primary_gleason": 3,
+    "secondary_gleason": 4,
+    "pathologic_primary_gleason": 3,
+    "pathologic_secondary_gleason": 4,
+    "clinical_stage": "T1c",
+    "number_of_positive_cores": 2,
+    "number_of_negative_cores": 10,
+    "extracapsular_extension": 0,
+    "seminal_vesicle_invasion": 0,
+    "lymph_node_involvement": 0,
+    "surgical_margin_status": 0
+}
 
 
 class Model:
@@ -23,6 +59,15 @@ class Model:
             clinical_stage_column_name: str = "CLINICAL_STAGE",
             number_of_positive_cores_column_name: Optional[str] = None,
             number_of_negative_cores_column_name: Optional[str] = None,
+            pathologic_primary_gleason_column_name: str = "PATHOLOGIC_GLEASON_PRIMARY",
+            pathologic_secondary_gleason_column_name: str = "PATHOLOGIC_GLEASON_SECONDARY",
+            extracapsular_extension_column_name: str = "EXTRACAPSULAR_EXTENSION",
+            seminal_vesicle_invasion_column_name: str = "SEMINAL_VESICLE_INVASION",
+            lymph_node_involvement_column_name: str = "LYMPH_NODE_INVOLVEMENT",
+            surgical_margin_status_column_name: str = "SURGICAL_MARGIN_STATUS",
+            backend: Optional[Union[str, Backend]] = None,
+            dtype: DTypeLike = np.float64,
+            _coefficients_bundle: Optional[CoefficientsBundle] = None
     ):
         """
         Initializes columns names.
@@ -49,15 +94,40 @@ class Model:
             Name of the column containing the number of positive cores of the patients.
         number_of_negative_cores_column_name : str, optional
             Name of the column containing the number of negative cores of the patients.
+        pathologic_primary_gleason_column_name : str
+            Name of the column containing the primary pathologic Gleason score of the patients.
+        pathologic_secondary_gleason_column_name : str
+            Name of the column containing the secondary pathologic Gleason score of the patients.
+        extracapsular_extension_column_name : str
+            Name of the column containing the extracapsular extension status (0 or 1) of the patients.
+        seminal_vesicle_invasion_column_name : str
+            Name of the column containing the seminal vesicle invasion status (0 or 1) of the patients.
+        lymph_node_involvement_column_name : str
+            Name of the column containing the lymph node involvement status (0 or 1) of the patients.
+        surgical_margin_status_column_name : str
+            Name of the column containing the surgical margin status (0 or 1) of the patients.
+        backend : Optional[Union[str, Backend]]
+            Backend used to compute the predictions, i.e. "numba", "numexpr" or "numpy". Defaults to the fastest
+            available backend.
+        dtype : DTypeLike
+            Floating point type of the predictions and of the intermediate arrays, e.g. numpy.float32 to halve the
+            memory and bandwidth used by the predictions. Use check_precision to measure the resulting deviation.
+        _coefficients_bundle : Optional[CoefficientsBundle]
+            Already loaded coefficients bundle. Used internally to build the regressor used as a variable without
+            scraping the coefficients a second time.
         """
         self.outcome = outcome
         self.url = url
         self.json_folder_path = json_folder_path
 
-        web_table_scrapper = WebTableScraper(url, json_folder_path)
-        coefficients_dataframe = web_table_scrapper.get_models_coefficients(CoefficientCategory.VARIABLES)
-        self._variables_coefficients_dataframe = coefficients_dataframe[coefficients_dataframe["Model"] == outcome]
-        self._splines_coefficients_dataframe = web_table_scrapper.get_models_coefficients(CoefficientCategory.SPLINE)
+        self.acquisition_counters: Optional[AcquisitionCounters] = None
+        if _coefficients_bundle is None:
+            with stage("Model.load_coefficients"):
+                scraper = WebTableScraper(url, json_folder_path)
+                _coefficients_bundle = scraper.get_coefficients_bundle()
+                self.acquisition_counters = scraper.counters
+
+        self._coefficients_bundle = _coefficients_bundle
 
         if self.model_type == "survival":
             regressor_constructor = SurvivalRegression
@@ -76,7 +146,15 @@ class Model:
             secondary_gleason_column_name=secondary_gleason_column_name,
             clinical_stage_column_name=clinical_stage_column_name,
             number_of_positive_cores_column_name=number_of_positive_cores_column_name,
-            number_of_negative_cores_column_name=number_of_negative_cores_column_name
+            number_of_negative_cores_column_name=number_of_negative_cores_column_name,
+            pathologic_primary_gleason_column_name=pathologic_primary_gleason_column_name,
+            pathologic_secondary_gleason_column_name=pathologic_secondary_gleason_column_name,
+            extracapsular_extension_column_name=extracapsular_extension_column_name,
+            seminal_vesicle_invasion_column_name=seminal_vesicle_invasion_column_name,
+            lymph_node_involvement_column_name=lymph_node_involvement_column_name,
+            surgical_margin_status_column_name=surgical_margin_status_column_name,
+            backend=backend,
+            dtype=dtype
         )
 
         if self.is_predicting_death:
@@ -84,32 +162,6 @@ class Model:
         else:
             self._regressor_as_variable = None
 
-    @staticmethod
-    def _get_dict_from_two_columns_of_a_dataframe(
-            dataframe: pd.DataFrame,
-            keys_column_name: str,
-            values_column_name: str
-    ) -> Mapping[str, float]:
-        """
-        Gets a dictionary from two columns of a dataframe. The first column is the keys and the second column is the
-        values.
-
-        Parameters
-        ----------
-        dataframe : pandas.DataFrame
-            The dataframe.
-        keys_column_name : str
-            The name of the column that contains the keys.
-        values_column_name : str
-            The name of the column that contains the values.
-
-        Returns
-        -------
-        dict : Mapping[str, float]
-            The dictionary.
-        """
-        return pd.Series(data=dataframe[values_column_name].values, index=dataframe[keys_column_name]).to_dict()
-
     @property
     def cores(self):
         """
@@ -125,6 +177,18 @@ class Model:
         else:
             return False
 
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        Floating point type of the predictions.
+
+        Returns
+        -------
+        dtype : numpy.dtype
+            Floating point type of the predictions.
+        """
+        return self.regressor.dtype
+
     @property
     def model_type(self) -> str:
         """
@@ -135,9 +199,7 @@ class Model:
         model_type : str
             The type of the model. It is used to determine which model to use for the prediction.
         """
-        model_type = self._variables_coefficients_dataframe["Model Type"].values[0]
-
-        return model_type
+        return self._coefficients_bundle.get_model_type(self.outcome)
 
     @property
     def is_predicting_death(self):
@@ -166,7 +228,9 @@ class Model:
         """
         return {
             SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH: SurvivalOutcome.PREOPERATIVE_BCR,
-            SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH_CORES: SurvivalOutcome.PREOPERATIVE_BCR_CORES
+            SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH_CORES: SurvivalOutcome.PREOPERATIVE_BCR_CORES,
+            SurvivalOutcome.POSTOPERATIVE_PROSTATE_CANCER_DEATH: SurvivalOutcome.POSTOPERATIVE_BCR,
+            SurvivalOutcome.POSTOPERATIVE_PROSTATE_CANCER_DEATH_CLINICAL: SurvivalOutcome.POSTOPERATIVE_BCR_CLINICAL
         }
 
     def _create_regressor_as_variable(self) -> SurvivalRegression:
@@ -189,93 +253,642 @@ class Model:
             secondary_gleason_column_name=self.regressor.secondary_gleason_column_name,
             clinical_stage_column_name=self.regressor.clinical_stage_column_name,
             number_of_positive_cores_column_name=self.regressor.number_of_positive_cores,
-            number_of_negative_cores_column_name=self.regressor.number_of_negative_cores
+            number_of_negative_cores_column_name=self.regressor.number_of_negative_cores,
+            pathologic_primary_gleason_column_name=self.regressor.pathologic_primary_gleason_column_name,
+            pathologic_secondary_gleason_column_name=self.regressor.pathologic_secondary_gleason_column_name,
+            extracapsular_extension_column_name=self.regressor.extracapsular_extension_column_name,
+            seminal_vesicle_invasion_column_name=self.regressor.seminal_vesicle_invasion_column_name,
+            lymph_node_involvement_column_name=self.regressor.lymph_node_involvement_column_name,
+            surgical_margin_status_column_name=self.regressor.surgical_margin_status_column_name,
+            backend=self.regressor.backend,
+            dtype=self.regressor.dtype,
+            _coefficients_bundle=self._coefficients_bundle
         ).regressor
 
     @property
     def variables_coefficients(self) -> Mapping[str, float]:
         """
-        Gets the variables values from the dataframe.
+        Gets the variables values from the coefficients bundle.
 
         Returns
         -------
         variables_values : Mapping[str, float]
             The variables values.
         """
-        variables_values = self._get_dict_from_two_columns_of_a_dataframe(
-            dataframe=self._variables_coefficients_dataframe,
-            keys_column_name="Variable",
-            values_column_name="Value"
-        )
-
-        return variables_values
+        return self._coefficients_bundle.get_variables_coefficients(self.outcome)
 
     @property
     def spline_coefficients(self) -> Mapping[str, float]:
         """
-        Gets the spline knots values from the dataframe.
+        Gets the spline knots values from the coefficients bundle.
 
         Returns
         -------
         spline_knots_values : Mapping[str, float]
             The spline knots values.
         """
-        spline_knots_values = self._get_dict_from_two_columns_of_a_dataframe(
-            dataframe=self._splines_coefficients_dataframe,
-            keys_column_name="Knot",
-            values_column_name="Value"
-        )
+        return self._coefficients_bundle.get_spline_coefficients()
+
+    @property
+    def inputs_column_names(self) -> Tuple[str, ...]:
+        """
+        Names of the columns used by the model, including the columns used by the regressor used as a variable.
+
+        Returns
+        -------
+        inputs_column_names : Tuple[str, ...]
+            Names of the columns used by the model.
+        """
+        column_names = []
+        for regressor in (self.regressor, self._regressor_as_variable):
+            if regressor is not None:
+                inputs_column_names = regressor.inputs_column_names
+                column_names += [
+                    inputs_column_names[_input] for _input in regressor.compiled_model.inputs
+                    if _input != "sub_model" and inputs_column_names[_input] not in column_names
+                ]
+
+        return tuple(column_names)
+
+    @property
+    def coefficients_version(self) -> str:
+        """
+        Digest of the outcome, the coefficients and the dtype of the model and of the regressor used as a variable.
+        Models with the same coefficients version give the same predictions.
+
+        Returns
+        -------
+        coefficients_version : str
+            The coefficients version.
+        """
+        digest = hashlib.sha256(f"{self.outcome}|{self.dtype}".encode("utf-8"))
+        for regressor in (self.regressor, self._regressor_as_variable):
+            if regressor is not None:
+                digest.update(repr(sorted(regressor.variables_coefficients.items())).encode("utf-8"))
+                digest.update(repr(sorted(regressor.spline_coefficients.items())).encode("utf-8"))
 
-        return spline_knots_values
+        return digest.hexdigest()
 
     def predict_proba(
             self,
-            dataframe: pd.DataFrame,
-            number_of_months: Union[np.ndarray, list, float, int] = None
+            dataframe: Frame,
+            number_of_months: Union[np.ndarray, list, float, int] = None,
+            cache: Optional[PredictionCache] = None
     ) -> np.ndarray:
         """
         Gets the predictions. If the model is survival, the number of years must be given.
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         number_of_months : Union[numpy.ndarray, list, float, int], optional
             The number of months. It is used only for survival models.
+        cache : Optional[PredictionCache]
+            Cache of the predictions. Only the patients missing from the cache are scored.
 
         Returns
         -------
         predictions : numpy.ndarray
             The predictions.
         """
-        if self.model_type == "survival":
-            if number_of_months is None:
+        if cache is not None:
+            if self.model_type == "survival" and number_of_months is None:
                 raise ValueError("Number of months must be given.")
-            else:
-                return self.regressor.get_predicted_survival_probability(
+            return cache.get_or_predict(
+                version=f"{self.coefficients_version}|proba",
+                dataframe=dataframe,
+                column_names=self.inputs_column_names,
+                predict=self.predict_proba,
+                number_of_months=number_of_months if self.model_type == "survival" else None,
+                dtype=self.dtype
+            )
+
+        with stage("Model.predict_proba", rows=get_number_of_rows(dataframe)):
+            if self.model_type == "survival":
+                if number_of_months is None:
+                    raise ValueError("Number of months must be given.")
+                else:
+                    return self.regressor.get_predicted_survival_probability(
+                        dataframe,
+                        number_of_months,
+                        self._regressor_as_variable
+                    )
+            elif self.model_type == "logistic":
+                return self.regressor.get_predicted_probability(
                     dataframe,
-                    number_of_months,
                     self._regressor_as_variable
                 )
-        elif self.model_type == "logistic":
-            return self.regressor.get_predicted_probability(
-                dataframe,
-                self._regressor_as_variable
+            else:
+                raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def predict_risk(
+            self,
+            dataframe: Frame,
+            cache: Optional[PredictionCache] = None
+    ) -> np.ndarray:
+        """
+        Gets the risk predictions.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        cache : Optional[PredictionCache]
+            Cache of the predictions. Only the patients missing from the cache are scored.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        if cache is not None:
+            return cache.get_or_predict(
+                version=f"{self.coefficients_version}|risk",
+                dataframe=dataframe,
+                column_names=self.inputs_column_names,
+                predict=lambda missing_dataframe, _: self.predict_risk(missing_dataframe),
+                dtype=self.dtype
+            )
+
+        with stage("Model.predict_risk", rows=get_number_of_rows(dataframe)):
+            if self.model_type == "survival":
+                return self.regressor.get_predicted_risk(dataframe, self._regressor_as_variable)
+            elif self.model_type == "logistic":
+                raise ValueError("Logistic models don't have risk predictions.")
+            else:
+                raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def validate(self, dataframe: Frame) -> ValidationReport:
+        """
+        Validates the columns used by the model, i.e. flags, for each row, missing values, values out of range,
+        unknown categories (e.g. clinical stages) and malformed values.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        report : ValidationReport
+            The validation report, with the bitmask of the violations of each row.
+        """
+        return validate_inputs(self._get_validation_inputs(dataframe))[1]
+
+    def _get_validation_inputs(self, dataframe: Frame) -> Dict[str, np.ndarray]:
+        """
+        Gets the inputs of the model and of the regressor used as a variable from the dataframe, each column once.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        inputs : Dict[str, numpy.ndarray]
+            The inputs, by input name.
+        """
+        inputs = {}
+        for regressor in (self.regressor, self._regressor_as_variable):
+            if regressor is not None:
+                for _input in regressor.compiled_model.inputs:
+                    if _input != "sub_model" and _input not in inputs:
+                        inputs[_input] = get_column(dataframe, regressor.inputs_column_names[_input])
+
+        return inputs
+
+    def _predict_from_inputs(
+            self,
+            inputs: Dict[str, np.ndarray],
+            link: Link,
+            number_of_months: Union[np.ndarray, list, float, int]
+    ) -> np.ndarray:
+        """
+        Computes a link function of the model from its (validated) inputs, including the prediction of the regressor
+        used as a variable.
+
+        Parameters
+        ----------
+        inputs : Dict[str, numpy.ndarray]
+            The inputs, by input name. The prediction of the regressor used as a variable is added to it.
+        link : Link
+            The link function.
+        number_of_months : Union[numpy.ndarray, list, float, int]
+            The number of months. It is used only for the survival link.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        if self._regressor_as_variable is not None:
+            inputs["sub_model"] = self._regressor_as_variable.predict_from_inputs(
+                inputs,
+                Link.SURVIVAL,
+                self.regressor.compiled_model.sub_model_months
             )
+
+        return self.regressor.predict_from_inputs(inputs, link, number_of_months)
+
+    def _predict_validated(
+            self,
+            dataframe: Frame,
+            link: Link,
+            number_of_months: Union[np.ndarray, list, float, int],
+            invalid_rows: Union[str, InvalidRows]
+    ) -> Tuple[np.ndarray, ValidationReport]:
+        """
+        Validates the inputs and computes a link function of the model from the validated inputs, so that the columns
+        are extracted once and the categorical inputs are factorized once for both the validation and the encoding.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        link : Link
+            The link function.
+        number_of_months : Union[numpy.ndarray, list, float, int]
+            The number of months. It is used only for the survival link.
+        invalid_rows : Union[str, InvalidRows]
+            What to do with the invalid rows, i.e. "drop" (they are not scored and their predictions are NaN), "flag"
+            (they are scored) or "raise" (a ValueError is raised).
+
+        Returns
+        -------
+        predictions, report : Tuple[numpy.ndarray, ValidationReport]
+            The predictions and the validation report.
+        """
+        invalid_rows = InvalidRows(invalid_rows)
+        with stage("Model.validate", rows=get_number_of_rows(dataframe)):
+            inputs, report = validate_inputs(self._get_validation_inputs(dataframe))
+
+        is_valid = None
+        if report.number_of_invalid_rows:
+            if invalid_rows == InvalidRows.RAISE:
+                raise get_validation_error(report)
+            elif invalid_rows == InvalidRows.DROP:
+                is_valid = report.is_valid
+                inputs = {_input: values[is_valid] for _input, values in inputs.items()}
+                if np.ndim(number_of_months) > 0:
+                    number_of_months = np.asarray(number_of_months)[is_valid]
+
+        predictions = self._predict_from_inputs(inputs, link, number_of_months)
+
+        if is_valid is not None:
+            all_predictions = np.full(len(is_valid), np.nan, dtype=predictions.dtype)
+            all_predictions[is_valid] = predictions
+            predictions = all_predictions
+
+        return predictions, report
+
+    def predict_proba_validated(
+            self,
+            dataframe: Frame,
+            number_of_months: Union[np.ndarray, list, float, int] = None,
+            invalid_rows: Union[str, InvalidRows] = InvalidRows.FLAG
+    ) -> Tuple[np.ndarray, ValidationReport]:
+        """
+        Gets the predictions after validating the inputs in the same pass as their encoding.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        number_of_months : Union[numpy.ndarray, list, float, int], optional
+            The number of months. It is used only for survival models.
+        invalid_rows : Union[str, InvalidRows]
+            What to do with the invalid rows, i.e. "drop" (they are not scored and their predictions are NaN), "flag"
+            (they are scored) or "raise" (a ValueError is raised).
+
+        Returns
+        -------
+        predictions, report : Tuple[numpy.ndarray, ValidationReport]
+            The predictions and the validation report, with the bitmask of the violations of each row.
+        """
+        if self.model_type == "survival":
+            if number_of_months is None:
+                raise ValueError("Number of months must be given.")
+            return self._predict_validated(dataframe, Link.SURVIVAL, number_of_months, invalid_rows)
+        elif self.model_type == "logistic":
+            return self._predict_validated(dataframe, Link.LOGISTIC, None, invalid_rows)
         else:
             raise ValueError(f"Model type {self.model_type} doesn't exist.")
 
-    def predict_risk(
+    def predict_risk_validated(
+            self,
+            dataframe: Frame,
+            invalid_rows: Union[str, InvalidRows] = InvalidRows.FLAG
+    ) -> Tuple[np.ndarray, ValidationReport]:
+        """
+        Gets the risk predictions after validating the inputs in the same pass as their encoding.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        invalid_rows : Union[str, InvalidRows]
+            What to do with the invalid rows, i.e. "drop" (they are not scored and their predictions are NaN), "flag"
+            (they are scored) or "raise" (a ValueError is raised).
+
+        Returns
+        -------
+        predictions, report : Tuple[numpy.ndarray, ValidationReport]
+            The risk predictions and the validation report, with the bitmask of the violations of each row.
+        """
+        if self.model_type == "survival":
+            return self._predict_validated(dataframe, Link.RISK, None, invalid_rows)
+        elif self.model_type == "logistic":
+            raise ValueError("Logistic models don't have risk predictions.")
+        else:
+            raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def _get_linear_predictor_grid(self, dataframe: Frame, grid: Mapping[str, Sequence]) -> np.ndarray:
+        """
+        Gets the linear predictor of each patient at each point of a grid of values of some columns.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        grid : Mapping[str, Sequence]
+            The values of each varied column, by column name.
+
+        Returns
+        -------
+        linear_predictor : numpy.ndarray
+            The linear predictor, of shape (N, G1, ..., Gk).
+        """
+        inputs_grid = {self._get_input(column_name): values for column_name, values in grid.items()}
+
+        return self.regressor.get_linear_predictor_grid(dataframe, inputs_grid, self._regressor_as_variable)
+
+    def _get_input(self, column_name: str) -> str:
+        """
+        Gets the name of the input of the model read from a column.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+
+        Returns
+        -------
+        input : str
+            Name of the input.
+        """
+        used_inputs = set(self.regressor.compiled_model.inputs)
+        if self._regressor_as_variable is not None:
+            used_inputs |= set(self._regressor_as_variable.compiled_model.inputs)
+
+        inputs = [
+            _input for _input, _column_name in self.regressor.inputs_column_names.items()
+            if _column_name == column_name and _input in used_inputs
+        ]
+        if not inputs:
+            raise ValueError(f"Column {column_name} is not used by the model {self.outcome}.")
+
+        return inputs[0]
+
+    def predict_proba_grid(
             self,
-            dataframe: pd.DataFrame
+            dataframe: Frame,
+            grid: Mapping[str, Sequence],
+            number_of_months: Union[np.ndarray, list, float, int] = None
     ) -> np.ndarray:
         """
-        Gets the risk predictions.
+        Gets the predictions of each patient at each point of a grid of values of one or more columns, e.g. to see
+        how the risk of a patient changes across PSA values. The terms that do not depend on the varied columns are
+        computed once per patient and the varied terms once per grid point.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        grid : Mapping[str, Sequence]
+            The values of each varied column, by column name, e.g. {"PSA": numpy.linspace(2, 50, 100)}. Each column
+            is a dimension of the grid, in order.
+        number_of_months : Union[numpy.ndarray, list, float, int], optional
+            The number of months, for all the patients or for each patient. It is used only for survival models.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions, of shape (N, G1, ..., Gk).
+        """
+        with stage("Model.predict_proba_grid", rows=get_number_of_rows(dataframe)):
+            linear_predictor = self._get_linear_predictor_grid(dataframe, grid)
+            if self.model_type == "survival":
+                if number_of_months is None:
+                    raise ValueError("Number of months must be given.")
+                if np.ndim(number_of_months) > 0:
+                    number_of_months = np.reshape(number_of_months, (-1, ) + (1, )*len(grid))
+                return self.regressor.get_survival_probability_from_linear_predictor(
+                    linear_predictor,
+                    number_of_months
+                )
+            elif self.model_type == "logistic":
+                return self.regressor.get_probability_from_linear_predictor(linear_predictor)
+            else:
+                raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def predict_risk_grid(self, dataframe: Frame, grid: Mapping[str, Sequence]) -> np.ndarray:
+        """
+        Gets the risk predictions of each patient at each point of a grid of values of one or more columns.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        grid : Mapping[str, Sequence]
+            The values of each varied column, by column name, e.g. {"PSA": numpy.linspace(2, 50, 100)}. Each column
+            is a dimension of the grid, in order.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions, of shape (N, G1, ..., Gk).
+        """
+        with stage("Model.predict_risk_grid", rows=get_number_of_rows(dataframe)):
+            if self.model_type == "survival":
+                return self.regressor.get_risk_from_linear_predictor(self._get_linear_predictor_grid(dataframe, grid))
+            elif self.model_type == "logistic":
+                raise ValueError("Logistic models don't have risk predictions.")
+            else:
+                raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def _get_linear_predictor_imputed(self, dataframe: Frame, imputations: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Gets the linear predictor of each patient in each imputation. The terms that do not depend on the imputed
+        columns are computed once per patient.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        imputations : Mapping[str, numpy.ndarray]
+            The imputed values of each column, by column name, of shape (N, M).
+
+        Returns
+        -------
+        linear_predictor : numpy.ndarray
+            The linear predictor, of shape (N, M).
+        """
+        get_number_of_imputations(imputations)
+        replicates = {
+            self._get_input(column_name): get_imputed_values(get_column(dataframe, column_name), imputed)
+            for column_name, imputed in imputations.items()
+        }
+
+        return self.regressor.get_linear_predictor_replicates(dataframe, replicates, self._regressor_as_variable)
+
+    def predict_proba_imputed(
+            self,
+            dataframe: Frame,
+            imputations: Mapping[str, np.ndarray],
+            number_of_months: Union[np.ndarray, list, float, int] = None,
+            confidence_level: float = 0.95
+    ) -> ImputedPredictions:
+        """
+        Gets the predictions of patients with multiply imputed missing values, pooled with Rubin's rules. Only the
+        imputed columns are given for each imputation, and all the imputations are evaluated at once, without copying
+        the dataframe. The predictions are pooled on the logit scale, on which they are linear in the linear predictor
+        for both the logistic and the (log-logistic) survival models.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        imputations : Mapping[str, numpy.ndarray]
+            The imputed values of each column with missing values, by column name, of shape (N, M) where M is the
+            number of imputations. The observed values of the dataframe are used where they are not missing.
+        number_of_months : Union[numpy.ndarray, list, float, int], optional
+            The number of months, for all the patients or for each patient. It is used only for survival models.
+        confidence_level : float
+            The confidence level of the confidence interval of the pooled predictions.
+
+        Returns
+        -------
+        predictions : ImputedPredictions
+            The pooled predictions, the bounds of their confidence interval and the predictions of each imputation.
+        """
+        with stage("Model.predict_proba_imputed", rows=get_number_of_rows(dataframe)):
+            linear_predictor = self._get_linear_predictor_imputed(dataframe, imputations)
+            if self.model_type == "survival":
+                if number_of_months is None:
+                    raise ValueError("Number of months must be given.")
+                if np.ndim(number_of_months) > 0:
+                    number_of_months = np.reshape(number_of_months, (-1, 1))
+                replicates = self.regressor.get_survival_probability_from_linear_predictor(
+                    linear_predictor,
+                    number_of_months
+                )
+            elif self.model_type == "logistic":
+                replicates = self.regressor.get_probability_from_linear_predictor(linear_predictor)
+            else:
+                raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+            return pool_predictions(replicates, PoolingScale.LOGIT, confidence_level)
+
+    def predict_risk_imputed(
+            self,
+            dataframe: Frame,
+            imputations: Mapping[str, np.ndarray],
+            confidence_level: float = 0.95
+    ) -> ImputedPredictions:
+        """
+        Gets the risk predictions of patients with multiply imputed missing values, pooled with Rubin's rules.
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        imputations : Mapping[str, numpy.ndarray]
+            The imputed values of each column with missing values, by column name, of shape (N, M) where M is the
+            number of imputations. The observed values of the dataframe are used where they are not missing.
+        confidence_level : float
+            The confidence level of the confidence interval of the pooled predictions.
+
+        Returns
+        -------
+        predictions : ImputedPredictions
+            The pooled risk predictions, the bounds of their confidence interval and the predictions of each
+            imputation.
+        """
+        with stage("Model.predict_risk_imputed", rows=get_number_of_rows(dataframe)):
+            if self.model_type == "survival":
+                replicates = self.regressor.get_risk_from_linear_predictor(
+                    self._get_linear_predictor_imputed(dataframe, imputations)
+                )
+                return pool_predictions(replicates, PoolingScale.IDENTITY, confidence_level)
+            elif self.model_type == "logistic":
+                raise ValueError("Logistic models don't have risk predictions.")
+            else:
+                raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def get_intermediates(self, dataframe: Frame) -> Dict[str, np.ndarray]:
+        """
+        Gets the per-patient intermediate arrays of the predictions, i.e. the encoded features (prefixed with
+        "feature.") and the linear predictor. The predictions can be computed from them for any number of months
+        without reading the patients data again.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+
+        Returns
+        -------
+        intermediates : Dict[str, numpy.ndarray]
+            The intermediate arrays, by name.
+        """
+        features = self.regressor.get_encoded_features(dataframe, self._regressor_as_variable)
+        linear_predictor = self.regressor.compiled_model.linear_predictor_from_features(features, self.dtype)
+
+        intermediates = {f"feature.{feature}": values for feature, values in features.items()}
+        intermediates["linear_predictor"] = linear_predictor
+
+        return intermediates
+
+    def predict_proba_from_intermediates(
+            self,
+            intermediates: Mapping[str, np.ndarray],
+            number_of_months: Union[np.ndarray, list, float, int] = None
+    ) -> np.ndarray:
+        """
+        Gets the predictions from the intermediate arrays returned by get_intermediates.
+
+        Parameters
+        ----------
+        intermediates : Mapping[str, numpy.ndarray]
+            The intermediate arrays, by name.
+        number_of_months : Union[numpy.ndarray, list, float, int], optional
+            The number of months. It is used only for survival models.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        linear_predictor = intermediates["linear_predictor"]
+        if self.model_type == "survival":
+            if number_of_months is None:
+                raise ValueError("Number of months must be given.")
+            return self.regressor.get_survival_probability_from_linear_predictor(linear_predictor, number_of_months)
+        elif self.model_type == "logistic":
+            return self.regressor.get_probability_from_linear_predictor(linear_predictor)
+        else:
+            raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def predict_risk_from_intermediates(self, intermediates: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Gets the risk predictions from the intermediate arrays returned by get_intermediates.
+
+        Parameters
+        ----------
+        intermediates : Mapping[str, numpy.ndarray]
+            The intermediate arrays, by name.
 
         Returns
         -------
@@ -283,8 +896,110 @@ class Model:
             The predictions.
         """
         if self.model_type == "survival":
-            return self.regressor.get_predicted_risk(dataframe, self._regressor_as_variable)
+            return self.regressor.get_risk_from_linear_predictor(intermediates["linear_predictor"])
         elif self.model_type == "logistic":
             raise ValueError("Logistic models don't have risk predictions.")
         else:
             raise ValueError(f"Model type {self.model_type} doesn't exist.")
+
+    def freeze(self) -> FrozenNomogram:
+        """
+        Gets an immutable inference object of the model that can be shared across threads. See FrozenNomogram.
+
+        Returns
+        -------
+        frozen_nomogram : FrozenNomogram
+            The frozen model.
+        """
+        model = copy.copy(self)
+        model.acquisition_counters = None
+        model.regressor = self.regressor.freeze()
+        if self._regressor_as_variable is not None:
+            model._regressor_as_variable = self._regressor_as_variable.freeze()
+
+        frozen_nomogram = FrozenNomogram(model)
+        with stage("Model.freeze.warm_up"):
+            for dataframe in self._get_warm_up_dataframes():
+                if self.model_type == "survival":
+                    frozen_nomogram.predict_proba(dataframe, 60)
+                    frozen_nomogram.predict_risk(dataframe)
+                else:
+                    frozen_nomogram.predict_proba(dataframe)
+
+        return frozen_nomogram
+
+    def _get_warm_up_dataframes(self) -> Tuple[pd.DataFrame, ...]:
+        """
+        Gets single patient dataframes used to compile the numba kernels of a frozen model in the calling thread,
+        rather than at their first call in a worker thread. The kernels are compiled for each type of the columns, so
+        the dataframes have the default pandas types of clinical data: integer and float columns, then float columns
+        only, as read from a file with missing values.
+
+        Returns
+        -------
+        dataframes : Tuple[pandas.DataFrame, ...]
+            The dataframes, or no dataframe if a column of the model is not given.
+        """
+        columns = {}
+        for regressor in (self.regressor, self._regressor_as_variable):
+            if regressor is not None:
+                for _input in regressor.compiled_model.inputs:
+                    if _input != "sub_model":
+                        columns[regressor.inputs_column_names[_input]] = WARM_UP_INPUTS[_input]
+
+        if None in columns:
+            return ()
+
+        dataframe = pd.DataFrame({column_name: [value] for column_name, value in columns.items()})
+        float_dataframe = dataframe.astype({
+            column_name: np.float64 for column_name, value in columns.items() if not isinstance(value, str)
+        })
+
+        return dataframe, float_dataframe
+
+    def check_precision(
+            self,
+            dataframe: Frame,
+            number_of_months: Union[np.ndarray, list, float, int] = 60,
+            sample_size: int = 1000,
+            tolerance: float = 1e-3,
+            random_state: int = 0
+    ) -> PrecisionReport:
+        """
+        Measures the maximum absolute deviation between the predictions computed with the dtype of the model and the
+        predictions computed with float64, on a random sample of the patients.
+
+        Parameters
+        ----------
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        number_of_months : Union[numpy.ndarray, list, float, int]
+            The number of months. It is used only for survival models.
+        sample_size : int
+            The number of patients in the sample.
+        tolerance : float
+            The maximum absolute deviation considered acceptable.
+        random_state : int
+            Random state used to sample the patients.
+
+        Returns
+        -------
+        report : PrecisionReport
+            The precision report.
+        """
+        reference_model = copy.copy(self)
+        reference_model.regressor = copy.copy(self.regressor)
+        reference_model.regressor.dtype = np.dtype(np.float64)
+        if self._regressor_as_variable:
+            reference_model._regressor_as_variable = copy.copy(self._regressor_as_variable)
+            reference_model._regressor_as_variable.dtype = np.dtype(np.float64)
+
+        return check_precision(
+            nomogram=self,
+            reference_nomogram=reference_model,
+            dataframe=dataframe,
+            number_of_months=number_of_months,
+            sample_size=sample_size,
+            tolerance=tolerance,
+            random_state=random_state
+        )
@@ -0,0 +1,278 @@
+from enum import Enum
+import re
+from typing import Any, Callable, Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+class TermType(Enum):
+    LINEAR: str = "linear"
+    CATEGORICAL: str = "categorical"
+    SPLINE: str = "spline"
+    SUB_MODEL: str = "sub_model"
+    INTERCEPT: str = "intercept"
+    SCALING_PARAMETER: str = "scaling_parameter"
+    METADATA: str = "metadata"
+
+
+class Feature(NamedTuple):
+    inputs: Tuple[str, ...]
+    encoder: Optional[Callable[..., np.ndarray]] = None
+    levels: Optional[Tuple[str, ...]] = None
+    conditions: Optional[Tuple[Tuple[str, int], ...]] = None
+    scalar_encoder: Optional[Callable[..., int]] = None
+
+
+class InputSpec(NamedTuple):
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    categories: Optional[Tuple[Any, ...]] = None
+
+
+class TermSpec(NamedTuple):
+    pattern: str
+    term_type: TermType
+    feature: Optional[str] = None
+    knots_prefix: Optional[str] = None
+
+
+class Term(NamedTuple):
+    variable: str
+    term_type: TermType
+    feature: Optional[str] = None
+    level: Optional[str] = None
+    knots_prefix: Optional[str] = None
+
+
+GRADE_GROUP_CONDITIONS = (
+    ("({0} == 3) & ({1} == 4)", 1),
+    ("({0} == 4) & ({1} == 3)", 2),
+    ("{0} + {1} == 8", 3),
+    ("({0} + {1} == 9) | ({0} + {1} == 10)", 4)
+)
+
+
+def encode_grade_group(primary_gleason: np.ndarray, secondary_gleason: np.ndarray) -> np.ndarray:
+    """
+    Encodes the primary and secondary Gleason scores as grade group codes, i.e. the grade group minus 1.
+
+    Parameters
+    ----------
+    primary_gleason : numpy.ndarray
+        The primary Gleason scores.
+    secondary_gleason : numpy.ndarray
+        The secondary Gleason scores.
+
+    Returns
+    -------
+    codes : numpy.ndarray
+        The grade group codes, from 0 (grade group 1) to 4 (grade group 5).
+    """
+    total_gleason_score = primary_gleason + secondary_gleason
+
+    return np.select(
+        condlist=[
+            (primary_gleason == 3) & (secondary_gleason == 4),
+            (primary_gleason == 4) & (secondary_gleason == 3),
+            total_gleason_score == 8,
+            (total_gleason_score == 9) | (total_gleason_score == 10)
+        ],
+        choicelist=[1, 2, 3, 4],
+        default=0
+    )
+
+
+def encode_grade_group_scalar(primary_gleason: float, secondary_gleason: float) -> int:
+    """
+    Encodes the primary and secondary Gleason scores of a single patient as a grade group code, i.e. the grade group
+    minus 1. It is the scalar equivalent of encode_grade_group.
+
+    Parameters
+    ----------
+    primary_gleason : float
+        The primary Gleason score.
+    secondary_gleason : float
+        The secondary Gleason score.
+
+    Returns
+    -------
+    code : int
+        The grade group code, from 0 (grade group 1) to 4 (grade group 5).
+    """
+    total_gleason_score = primary_gleason + secondary_gleason
+    if primary_gleason == 3 and secondary_gleason == 4:
+        return 1
+    elif primary_gleason == 4 and secondary_gleason == 3:
+        return 2
+    elif total_gleason_score == 8:
+        return 3
+    elif total_gleason_score == 9 or total_gleason_score == 10:
+        return 4
+    else:
+        return 0
+
+
+CLINICAL_STAGES_CODES = {"T2a": 1, "T2b": 2, "T2c": 3, "T3a": 4, "T3b": 4, "T3c": 4}
+
+
+def encode_clinical_stage(clinical_stage: Union[np.ndarray, pd.Categorical]) -> np.ndarray:
+    """
+    Encodes the clinical stages as codes. Stages that are not in CLINICAL_STAGES_CODES, e.g. T1c, get the reference
+    code 0. Categorical stages, e.g. dictionary-encoded arrow columns, are mapped through their categories without
+    factorizing the values.
+
+    Parameters
+    ----------
+    clinical_stage : Union[numpy.ndarray, pandas.Categorical]
+        The clinical stages, e.g. "T2a".
+
+    Returns
+    -------
+    codes : numpy.ndarray
+        The clinical stage codes.
+    """
+    if isinstance(clinical_stage, pd.Categorical):
+        codes, stages = clinical_stage.codes, clinical_stage.categories
+    else:
+        codes, stages = pd.factorize(np.asarray(clinical_stage, dtype=object))
+
+    # The last entry is the code of missing stages, for which pd.factorize returns the code -1.
+    stages_codes = np.array([CLINICAL_STAGES_CODES.get(stage, 0) for stage in stages] + [0])
+
+    return stages_codes[codes]
+
+
+def encode_clinical_stage_scalar(clinical_stage: str) -> int:
+    """
+    Encodes the clinical stage of a single patient as a code. It is the scalar equivalent of encode_clinical_stage.
+
+    Parameters
+    ----------
+    clinical_stage : str
+        The clinical stage, e.g. "T2a".
+
+    Returns
+    -------
+    code : int
+        The clinical stage code.
+    """
+    return CLINICAL_STAGES_CODES.get(clinical_stage, 0)
+
+
+FEATURES: Mapping[str, Feature] = {
+    "age": Feature(inputs=("age",)),
+    "psa": Feature(inputs=("psa",)),
+    "biopsy_grade_group": Feature(
+        inputs=("primary_gleason", "secondary_gleason"),
+        encoder=encode_grade_group,
+        levels=("1", "2", "3", "4", "5"),
+        conditions=GRADE_GROUP_CONDITIONS,
+        scalar_encoder=encode_grade_group_scalar
+    ),
+    "pathologic_grade_group": Feature(
+        inputs=("pathologic_primary_gleason", "pathologic_secondary_gleason"),
+        encoder=encode_grade_group,
+        levels=("1", "2", "3", "4", "5"),
+        conditions=GRADE_GROUP_CONDITIONS,
+        scalar_encoder=encode_grade_group_scalar
+    ),
+    "clinical_stage": Feature(
+        inputs=("clinical_stage",),
+        encoder=encode_clinical_stage,
+        levels=("1", "2A", "2B", "2C", "3+"),
+        scalar_encoder=encode_clinical_stage_scalar
+    ),
+    "number_of_positive_cores": Feature(inputs=("number_of_positive_cores",)),
+    "number_of_negative_cores": Feature(inputs=("number_of_negative_cores",)),
+    "extracapsular_extension": Feature(inputs=("extracapsular_extension",)),
+    "seminal_vesicle_invasion": Feature(inputs=("seminal_vesicle_invasion",)),
+    "lymph_node_involvement": Feature(inputs=("lymph_node_involvement",)),
+    "surgical_margin_status": Feature(inputs=("surgical_margin_status",)),
+    "sub_model": Feature(inputs=("sub_model",))
+}
+
+CLINICAL_STAGES = ("T1", "T1a", "T1b", "T1c") + tuple(CLINICAL_STAGES_CODES)
+
+INPUTS: Mapping[str, InputSpec] = {
+    "age": InputSpec(minimum=0, maximum=120),
+    "psa": InputSpec(minimum=0),
+    "primary_gleason": InputSpec(minimum=3, maximum=5),
+    "secondary_gleason": InputSpec(minimum=3, maximum=5),
+    "pathologic_primary_gleason": InputSpec(minimum=3, maximum=5),
+    "pathologic_secondary_gleason": InputSpec(minimum=3, maximum=5),
+    "clinical_stage": InputSpec(categories=CLINICAL_STAGES),
+    "number_of_positive_cores": InputSpec(minimum=0),
+    "number_of_negative_cores": InputSpec(minimum=0),
+    "extracapsular_extension": InputSpec(categories=(0, 1)),
+    "seminal_vesicle_invasion": InputSpec(categories=(0, 1)),
+    "lymph_node_involvement": InputSpec(categories=(0, 1)),
+    "surgical_margin_status": InputSpec(categories=(0, 1))
+}
+
+MODEL_SPEC: Tuple[TermSpec, ...] = (
+    TermSpec(pattern=r"Intercept", term_type=TermType.INTERCEPT),
+    TermSpec(pattern=r"Scaling Parameter", term_type=TermType.SCALING_PARAMETER),
+    TermSpec(pattern=r"AUC|C-index|Model N", term_type=TermType.METADATA),
+    TermSpec(pattern=r"Patient Age", term_type=TermType.LINEAR, feature="age"),
+    TermSpec(pattern=r"Preoperative PSA", term_type=TermType.LINEAR, feature="psa"),
+    TermSpec(
+        pattern=r"Preoperative PSA Spline (?P<level>\d+)",
+        term_type=TermType.SPLINE,
+        feature="psa",
+        knots_prefix="PSAPreopKnot"
+    ),
+    TermSpec(
+        pattern=r"Biopsy Gleason Grade Group (?P<level>\d)",
+        term_type=TermType.CATEGORICAL,
+        feature="biopsy_grade_group"
+    ),
+    TermSpec(
+        pattern=r"Pathologic Gleason Grade Group (?P<level>\d)",
+        term_type=TermType.CATEGORICAL,
+        feature="pathologic_grade_group"
+    ),
+    TermSpec(pattern=r"Clinical Stage (?P<level>.+)", term_type=TermType.CATEGORICAL, feature="clinical_stage"),
+    TermSpec(pattern=r"No\. of Positive Cores", term_type=TermType.LINEAR, feature="number_of_positive_cores"),
+    TermSpec(pattern=r"No\. of Negative Cores", term_type=TermType.LINEAR, feature="number_of_negative_cores"),
+    TermSpec(pattern=r"Extracapsular Extension", term_type=TermType.LINEAR, feature="extracapsular_extension"),
+    TermSpec(pattern=r"Seminal Vesicle Invasion", term_type=TermType.LINEAR, feature="seminal_vesicle_invasion"),
+    TermSpec(pattern=r"Lymph Node Involvement", term_type=TermType.LINEAR, feature="lymph_node_involvement"),
+    TermSpec(pattern=r"Surgical Margin Status", term_type=TermType.LINEAR, feature="surgical_margin_status"),
+    TermSpec(
+        pattern=r"Survival probability from .* at (?P<level>\d+) years.*",
+        term_type=TermType.SUB_MODEL,
+        feature="sub_model"
+    )
+)
+
+
+def get_term(variable: str, model_spec: Tuple[TermSpec, ...] = MODEL_SPEC) -> Term:
+    """
+    Gets the term of a variable of the coefficients table, i.e. the first term specification whose pattern matches
+    the whole variable name.
+
+    Parameters
+    ----------
+    variable : str
+        Name of the variable in the coefficients table, e.g. "Biopsy Gleason Grade Group 2".
+    model_spec : Tuple[TermSpec, ...]
+        The model specification.
+
+    Returns
+    -------
+    term : Term
+        The term.
+    """
+    for term_spec in model_spec:
+        match = re.fullmatch(term_spec.pattern, variable)
+        if match:
+            return Term(
+                variable=variable,
+                term_type=term_spec.term_type,
+                feature=term_spec.feature,
+                level=match.groupdict().get("level"),
+                knots_prefix=term_spec.knots_prefix
+            )
+
+    raise ValueError(f"Unknown variable: {variable}. Add a TermSpec matching it to the model specification.")
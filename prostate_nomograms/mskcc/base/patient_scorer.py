@@ -0,0 +1,262 @@
+from math import exp
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from .compiled_model import CompiledModel
+from .logistic_regression import LogisticRegression
+from .model import Model
+from .model_spec import FEATURES
+
+
+class ScalarTerm(NamedTuple):
+    inputs: Tuple[str, ...]
+    scalar_encoder: Optional[Callable[..., int]]
+    coefficient: float
+    knots_weights: Tuple[Tuple[float, float], ...]
+    table: Optional[Tuple[float, ...]]
+
+
+class ScalarModel:
+    """
+    A compiled model evaluated on a single patient with plain Python floats. The effects of the compiled model are
+    flattened into tuples of coefficients, knots and categories effects, so that scoring a patient is a short loop
+    without any NumPy array, frame or encoder call on arrays.
+    """
+
+    def __init__(
+            self,
+            compiled_model: CompiledModel,
+            model_type: str,
+            sub_model: Optional["ScalarModel"] = None
+    ):
+        """
+        Flattens the compiled model.
+
+        Parameters
+        ----------
+        compiled_model : CompiledModel
+            The compiled model.
+        model_type : str
+            The type of the model, i.e. "logistic" or "survival".
+        sub_model : Optional[ScalarModel]
+            The scalar model whose survival probability is used as a variable, for prostate cancer death models.
+        """
+        self.model_type = model_type
+        self.intercept = float(compiled_model.intercept)
+        self.scaling_parameter = compiled_model.scaling_parameter
+        self.sub_model = sub_model
+        self.sub_model_months = compiled_model.sub_model_months
+        self.terms = tuple(
+            ScalarTerm(
+                inputs=FEATURES[feature].inputs,
+                scalar_encoder=FEATURES[feature].scalar_encoder,
+                coefficient=float(effect.coefficient),
+                knots_weights=tuple(zip(map(float, effect.knots), map(float, effect.weights))),
+                table=tuple(effect.table.tolist()) if effect.table is not None else None
+            )
+            for feature, effect in compiled_model.effects.items()
+        )
+
+    @property
+    def inputs(self) -> Tuple[str, ...]:
+        """
+        The inputs needed to score a patient, including the inputs of the sub-model.
+
+        Returns
+        -------
+        inputs : Tuple[str, ...]
+            The inputs.
+        """
+        inputs = []
+        for term in self.terms:
+            for _input in term.inputs:
+                if _input == "sub_model":
+                    inputs += [_sub_input for _sub_input in self.sub_model.inputs if _sub_input not in inputs]
+                elif _input not in inputs:
+                    inputs.append(_input)
+
+        return tuple(inputs)
+
+    def linear_predictor(self, fields: Dict[str, Any]) -> float:
+        """
+        Computes the linear predictor of a patient.
+
+        Parameters
+        ----------
+        fields : Dict[str, Any]
+            The patient data, by input name.
+
+        Returns
+        -------
+        linear_predictor : float
+            The linear predictor.
+        """
+        linear_predictor = self.intercept
+        for inputs, scalar_encoder, coefficient, knots_weights, table in self.terms:
+            if scalar_encoder:
+                value = scalar_encoder(*[fields[_input] for _input in inputs])
+            elif inputs[0] == "sub_model":
+                value = self.sub_model.survival_probability(fields, self.sub_model_months)
+            else:
+                value = float(fields[inputs[0]])
+
+            if table:
+                linear_predictor += table[value]
+            if coefficient:
+                linear_predictor += coefficient*value
+            for knot, weight in knots_weights:
+                if value > knot:
+                    linear_predictor += weight*(value - knot)**3
+
+        return linear_predictor
+
+    def probability(self, fields: Dict[str, Any]) -> float:
+        """
+        Computes the probability of a logistic model.
+
+        Parameters
+        ----------
+        fields : Dict[str, Any]
+            The patient data, by input name.
+
+        Returns
+        -------
+        probability : float
+            The probability.
+        """
+        return 1/(1 + exp(-self.linear_predictor(fields)))
+
+    def survival_probability(self, fields: Dict[str, Any], number_of_months: float) -> float:
+        """
+        Computes the survival probability of a survival model.
+
+        Parameters
+        ----------
+        fields : Dict[str, Any]
+            The patient data, by input name.
+        number_of_months : float
+            The number of months.
+
+        Returns
+        -------
+        survival_probability : float
+            The survival probability.
+        """
+        return 1/(1 + (exp(-self.linear_predictor(fields))*number_of_months/12)**(1/self.scaling_parameter))
+
+    def risk(self, fields: Dict[str, Any]) -> float:
+        """
+        Computes the risk of a survival model.
+
+        Parameters
+        ----------
+        fields : Dict[str, Any]
+            The patient data, by input name.
+
+        Returns
+        -------
+        risk : float
+            The risk.
+        """
+        return -self.linear_predictor(fields)/self.scaling_parameter
+
+
+class PatientScorer:
+    """
+    Low-latency scorer of a single patient for interactive use. It is built once from already constructed MSKCC
+    nomograms, so that no coefficients are scraped at scoring time, and scores all their outcomes with plain Python
+    floats, in microseconds.
+
+    Examples
+    --------
+    >>> scorer = PatientScorer([MskccPreRadicalProstatectomyNomogram(outcome) for outcome in outcomes])
+    >>> scorer.score_patient(age=65, psa=7.2, primary_gleason=3, secondary_gleason=4, clinical_stage="T2a")
+    """
+
+    def __init__(self, nomograms: Sequence[Model]):
+        """
+        Compiles the scalar models of the nomograms.
+
+        Parameters
+        ----------
+        nomograms : Sequence[Model]
+            The MSKCC nomograms.
+        """
+        scalar_models: Dict[int, ScalarModel] = {}
+
+        def get_scalar_model(regressor: LogisticRegression, model_type: str, sub_model: Optional[ScalarModel]):
+            key = id(regressor.compiled_model)
+            if key not in scalar_models:
+                scalar_models[key] = ScalarModel(regressor.compiled_model, model_type, sub_model)
+            return scalar_models[key]
+
+        self.models: Dict[str, ScalarModel] = {}
+        for nomogram in nomograms:
+            sub_model = None
+            if nomogram._regressor_as_variable is not None:
+                sub_model = get_scalar_model(nomogram._regressor_as_variable, "survival", None)
+            self.models[str(nomogram.outcome)] = get_scalar_model(nomogram.regressor, nomogram.model_type, sub_model)
+
+        inputs = []
+        for model in self.models.values():
+            inputs += [_input for _input in model.inputs if _input not in inputs]
+        self.inputs: Tuple[str, ...] = tuple(inputs)
+        self._required_inputs = frozenset(inputs)
+
+    def _check_fields(self, fields: Dict[str, Any]) -> None:
+        """
+        Checks that all the inputs of the models are given.
+
+        Parameters
+        ----------
+        fields : Dict[str, Any]
+            The patient data, by input name.
+        """
+        if not self._required_inputs <= fields.keys():
+            missing_inputs = [_input for _input in self.inputs if _input not in fields]
+            raise ValueError(f"Missing patient fields: {missing_inputs}. The required fields are {self.inputs}.")
+
+    def score_patient(self, number_of_months: float = 60, **fields: Any) -> Dict[str, float]:
+        """
+        Scores a patient with all the outcomes, i.e. the probability of the logistic outcomes and the survival
+        probability of the survival outcomes at the given number of months.
+
+        Parameters
+        ----------
+        number_of_months : float
+            The number of months. It is used only for survival outcomes.
+        **fields : Any
+            The patient data, by input name, e.g. age=65, psa=7.2, primary_gleason=3, secondary_gleason=4 and
+            clinical_stage="T2a". See the inputs attribute for the required fields.
+
+        Returns
+        -------
+        predictions : Dict[str, float]
+            The predictions, by outcome.
+        """
+        self._check_fields(fields)
+
+        return {
+            outcome: model.survival_probability(fields, number_of_months) if model.model_type == "survival"
+            else model.probability(fields)
+            for outcome, model in self.models.items()
+        }
+
+    def score_patient_risk(self, **fields: Any) -> Dict[str, float]:
+        """
+        Gets the risk of a patient with all the survival outcomes.
+
+        Parameters
+        ----------
+        **fields : Any
+            The patient data, by input name. See the inputs attribute for the required fields.
+
+        Returns
+        -------
+        predictions : Dict[str, float]
+            The risks, by survival outcome.
+        """
+        self._check_fields(fields)
+
+        return {
+            outcome: model.risk(fields) for outcome, model in self.models.items() if model.model_type == "survival"
+        }
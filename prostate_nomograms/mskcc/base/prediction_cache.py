@@ -0,0 +1,311 @@
+from __future__ import annotations
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ...frames import Frame, get_column, get_number_of_rows, take
+
+HASH_KEYS = ("prostate-nomogra", "mskcc-prediction")
+
+
+def hash_rows(
+        dataframe: Frame,
+        column_names: Sequence[str],
+        number_of_months: Optional[Union[np.ndarray, list, float, int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashes the values of some columns of each row into a 128-bit key, made of two 64-bit hashes computed with
+    different hash keys. Numeric values are hashed as float64, so that the same patient gets the same key whether its
+    age is stored as an integer or as a float, and categorical values are hashed as their category, whatever the type
+    of the frame.
+
+    Parameters
+    ----------
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    column_names : Sequence[str]
+        Names of the columns to hash.
+    number_of_months : Optional[Union[numpy.ndarray, list, float, int]]
+        The number of months, for each row or for all the rows, hashed as an additional column.
+
+    Returns
+    -------
+    keys : Tuple[numpy.ndarray, numpy.ndarray]
+        The two 64-bit hashes of each row, as signed integers so that they fit SQLite integers.
+    """
+    number_of_rows = get_number_of_rows(dataframe)
+    columns = {}
+    for column_name in column_names:
+        column = get_column(dataframe, column_name)
+        if not isinstance(column, pd.Categorical):
+            column = np.asarray(column)
+            if column.dtype.kind in "biuf":
+                column = column.astype(np.float64, copy=False)
+        columns[column_name] = column
+    if number_of_months is not None:
+        months = np.asarray(number_of_months, dtype=np.float64)
+        columns["number_of_months"] = np.broadcast_to(months, (number_of_rows, ))
+
+    rows = pd.DataFrame(columns, index=pd.RangeIndex(number_of_rows), copy=False)
+    return tuple(
+        pd.util.hash_pandas_object(rows, index=False, hash_key=hash_key).to_numpy().view(np.int64)
+        for hash_key in HASH_KEYS
+    )
+
+
+class PredictionCache:
+    """
+    Persistent cache of the predictions of the nomograms, stored in a SQLite database. Each prediction is keyed by
+    the coefficients version of the model (a digest of its coefficients, of the kind of prediction and of its dtype)
+    and by a hash of the model-relevant columns of the patient, so that rescoring unchanged patients with unchanged
+    coefficients only costs a lookup. When the number of cached predictions exceeds max_entries, the least recently
+    used predictions are evicted.
+
+    Examples
+    --------
+    >>> cache = PredictionCache("predictions.sqlite", max_entries=50_000_000)
+    >>> nomogram.predict_proba(dataframe, 60, cache=cache)
+    """
+
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        """
+        Opens the cache, creating the database if it does not exist.
+
+        Parameters
+        ----------
+        path : str
+            The path of the SQLite database, or ":memory:" for a cache living only as long as the object.
+        max_entries : Optional[int]
+            The maximum number of cached predictions. Defaults to no limit.
+        """
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError(f"max_entries must be positive, got {max_entries}.")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS versions (
+                version_id INTEGER PRIMARY KEY,
+                version TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS predictions (
+                version_id INTEGER NOT NULL,
+                key_1 INTEGER NOT NULL,
+                key_2 INTEGER NOT NULL,
+                value REAL,
+                last_access INTEGER NOT NULL,
+                PRIMARY KEY (version_id, key_1, key_2)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS predictions_last_access ON predictions (last_access);
+            CREATE TEMP TABLE lookup (position INTEGER PRIMARY KEY, key_1 INTEGER, key_2 INTEGER);
+            """
+        )
+
+    def __len__(self) -> int:
+        """
+        Gets the number of cached predictions.
+
+        Returns
+        -------
+        length : int
+            The number of cached predictions.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def close(self) -> None:
+        """
+        Closes the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def clear(self) -> None:
+        """
+        Removes all the cached predictions.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM predictions")
+            self._connection.execute("DELETE FROM versions")
+
+    def _get_version_id(self, version: str) -> int:
+        """
+        Gets the identifier of a coefficients version, registering it if it is new.
+
+        Parameters
+        ----------
+        version : str
+            The coefficients version.
+
+        Returns
+        -------
+        version_id : int
+            The identifier of the version.
+        """
+        self._connection.execute("INSERT OR IGNORE INTO versions (version) VALUES (?)", (version, ))
+        return self._connection.execute("SELECT version_id FROM versions WHERE version = ?", (version, )).fetchone()[0]
+
+    def _lookup(self, version_id: int, keys: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Looks up the cached predictions of the given keys and, if the cache is bounded, marks them as used.
+
+        Parameters
+        ----------
+        version_id : int
+            The identifier of the coefficients version.
+        keys : Tuple[numpy.ndarray, numpy.ndarray]
+            The two 64-bit hashes of each row.
+
+        Returns
+        -------
+        values : numpy.ndarray
+            The cached predictions, NaN for the rows missing from the cache.
+        found : numpy.ndarray
+            Whether each row was found in the cache.
+        """
+        values = np.full(len(keys[0]), np.nan)
+        found = np.zeros(len(keys[0]), dtype=bool)
+        self._connection.execute("DELETE FROM lookup")
+        self._connection.executemany(
+            "INSERT INTO lookup (position, key_1, key_2) VALUES (?, ?, ?)",
+            zip(range(len(keys[0])), keys[0].tolist(), keys[1].tolist())
+        )
+        rows = self._connection.execute(
+            """
+            SELECT lookup.position, predictions.value FROM lookup JOIN predictions
+            ON predictions.version_id = ? AND predictions.key_1 = lookup.key_1 AND predictions.key_2 = lookup.key_2
+            """,
+            (version_id, )
+        ).fetchall()
+        if rows:
+            positions, cached_values = zip(*rows)
+            positions = np.asarray(positions)
+            values[positions] = np.asarray(cached_values, dtype=np.float64)
+            found[positions] = True
+        if rows and self.max_entries is not None:
+            self._connection.execute(
+                """
+                UPDATE predictions SET last_access = ?
+                WHERE version_id = ? AND (key_1, key_2) IN (SELECT key_1, key_2 FROM lookup)
+                """,
+                (time.time_ns(), version_id)
+            )
+
+        return values, found
+
+    def _store(self, version_id: int, keys: Tuple[np.ndarray, np.ndarray], values: np.ndarray) -> None:
+        """
+        Stores predictions, then evicts the least recently used predictions if the cache is full.
+
+        Parameters
+        ----------
+        version_id : int
+            The identifier of the coefficients version.
+        keys : Tuple[numpy.ndarray, numpy.ndarray]
+            The two 64-bit hashes of each row.
+        values : numpy.ndarray
+            The predictions.
+        """
+        last_access = time.time_ns()
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO predictions (version_id, key_1, key_2, value, last_access) VALUES (?, ?, ?, ?, ?)",
+            zip(
+                [version_id]*len(values),
+                keys[0].tolist(),
+                keys[1].tolist(),
+                values.astype(np.float64).tolist(),
+                [last_access]*len(values)
+            )
+        )
+
+        if self.max_entries is not None:
+            number_of_entries = self._connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            if number_of_entries > self.max_entries:
+                self._connection.execute(
+                    """
+                    DELETE FROM predictions WHERE (version_id, key_1, key_2) IN (
+                        SELECT version_id, key_1, key_2 FROM predictions ORDER BY last_access LIMIT ?
+                    )
+                    """,
+                    (number_of_entries - self.max_entries, )
+                )
+
+    def get_or_predict(
+            self,
+            version: str,
+            dataframe: Frame,
+            column_names: Sequence[str],
+            predict: Callable[[Frame, Optional[np.ndarray]], np.ndarray],
+            number_of_months: Optional[Union[np.ndarray, list, float, int]] = None,
+            dtype: np.dtype = np.dtype(np.float64)
+    ) -> np.ndarray:
+        """
+        Gets the cached predictions of the patients and computes only the predictions of the patients missing from
+        the cache, which are then cached.
+
+        Parameters
+        ----------
+        version : str
+            The coefficients version of the model.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+        column_names : Sequence[str]
+            Names of the columns used by the model.
+        predict : Callable[[Frame, Optional[numpy.ndarray]], numpy.ndarray]
+            Function computing the predictions of some patients, given their data and their number of months.
+        number_of_months : Optional[Union[numpy.ndarray, list, float, int]]
+            The number of months, for each patient or for all the patients. It is used only for survival probabilities.
+        dtype : numpy.dtype
+            Floating point type of the predictions.
+
+        Returns
+        -------
+        predictions : numpy.ndarray
+            The predictions.
+        """
+        keys = hash_rows(dataframe, column_names, number_of_months)
+
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                version_id = self._get_version_id(version)
+                values, found = self._lookup(version_id, keys)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        missing = np.flatnonzero(~found)
+        self.hits += len(values) - len(missing)
+        self.misses += len(missing)
+
+        if len(missing):
+            if number_of_months is None:
+                missing_months = None
+            else:
+                missing_months = np.broadcast_to(np.asarray(number_of_months), values.shape)[missing]
+            missing_values = np.asarray(predict(take(dataframe, missing), missing_months))
+            values[missing] = missing_values
+
+            missing_keys = (keys[0][missing], keys[1][missing])
+            with self._lock:
+                self._connection.execute("BEGIN")
+                try:
+                    self._store(version_id, missing_keys, missing_values)
+                    self._connection.execute("COMMIT")
+                except BaseException:
+                    self._connection.execute("ROLLBACK")
+                    raise
+
+        return values.astype(dtype, copy=False)
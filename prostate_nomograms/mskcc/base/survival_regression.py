@@ -1,17 +1,21 @@
 from __future__ import annotations
 from typing import Optional, Union
 
-import pandas as pd
 import numpy as np
 
+from ...frames import Frame
+from ...profiling import stage
+from .backends import Backend, Link
 from .logistic_regression import LogisticRegression
 
 
 class SurvivalRegression(LogisticRegression):
 
+    LINKS = (Link.LINEAR_PREDICTOR, Link.SURVIVAL, Link.RISK)
+
     def get_predicted_risk(
             self,
-            dataframe: pd.DataFrame,
+            dataframe: Frame,
             regressor_as_variable: Optional[SurvivalRegression] = None,
     ) -> np.array:
         """
@@ -19,8 +23,8 @@ class SurvivalRegression(LogisticRegression):
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe that contains the patients data.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         regressor_as_variable : Optional[SurvivalRegression]
             The regressor as variable.
 
@@ -29,18 +33,41 @@ class SurvivalRegression(LogisticRegression):
         predicted_risk : numpy.ndarray
             The predicted risk.
         """
+        if self.backend != Backend.NUMPY:
+            return self._get_fused_kernel(Link.RISK)(
+                self.get_inputs(dataframe, regressor_as_variable),
+                dtype=self.dtype
+            )
+
         if regressor_as_variable:
             predicted_result = self.get_predicted_result(dataframe, regressor_as_variable)
         else:
             predicted_result = self.get_predicted_result(dataframe)
 
+        return self.get_risk_from_linear_predictor(predicted_result)
+
+    def get_risk_from_linear_predictor(self, linear_predictor: np.ndarray) -> np.ndarray:
+        """
+        Gets the predicted risk from the linear predictor.
+
+        Parameters
+        ----------
+        linear_predictor : numpy.ndarray
+            The linear predictor.
+
+        Returns
+        -------
+        predicted_risk : numpy.ndarray
+            The predicted risk.
+        """
         scaling_parameter = self.variables_coefficients["Scaling Parameter"]
 
-        return -predicted_result/scaling_parameter
+        with stage("SurvivalRegression.risk", rows=len(linear_predictor)):
+            return -linear_predictor/scaling_parameter
 
     def get_predicted_survival_probability(
             self,
-            dataframe: pd.DataFrame,
+            dataframe: Frame,
             number_of_months: Union[np.ndarray, list, float, int],
             regressor_as_variable: Optional[SurvivalRegression] = None,
     ) -> np.array:
@@ -49,8 +76,8 @@ class SurvivalRegression(LogisticRegression):
 
         Parameters
         ----------
-        dataframe : pandas.DataFrame
-            The dataframe that contains the patients data.
+        dataframe : Frame
+            The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
         number_of_months : Union[numpy.ndarray, list, float, int]
             The number of years.
         regressor_as_variable : Optional[SurvivalRegression]
@@ -61,14 +88,45 @@ class SurvivalRegression(LogisticRegression):
         predicted_probability : numpy.ndarray
             The predicted probability.
         """
+        if self.backend != Backend.NUMPY:
+            return self._get_fused_kernel(Link.SURVIVAL)(
+                self.get_inputs(dataframe, regressor_as_variable),
+                number_of_months,
+                self.dtype
+            )
+
         if regressor_as_variable:
             predicted_result = self.get_predicted_result(dataframe, regressor_as_variable)
         else:
             predicted_result = self.get_predicted_result(dataframe)
 
+        return self.get_survival_probability_from_linear_predictor(predicted_result, number_of_months)
+
+    def get_survival_probability_from_linear_predictor(
+            self,
+            linear_predictor: np.ndarray,
+            number_of_months: Union[np.ndarray, list, float, int]
+    ) -> np.ndarray:
+        """
+        Gets the predicted survival probability from the linear predictor.
+
+        Parameters
+        ----------
+        linear_predictor : numpy.ndarray
+            The linear predictor.
+        number_of_months : Union[numpy.ndarray, list, float, int]
+            The number of months.
+
+        Returns
+        -------
+        predicted_probability : numpy.ndarray
+            The predicted probability.
+        """
         scaling_parameter = self.variables_coefficients["Scaling Parameter"]
 
-        num = 1 + (np.exp(-predicted_result) * 0) ** (1 / scaling_parameter)
-        denum = 1 + (np.exp(-predicted_result) * number_of_months/12) ** (1 / scaling_parameter)
+        with stage("SurvivalRegression.survival_function", rows=len(linear_predictor)):
+            num = 1 + (np.exp(-linear_predictor) * 0) ** (1 / scaling_parameter)
+            number_of_months = np.asarray(number_of_months, dtype=self.dtype)
+            denum = 1 + (np.exp(-linear_predictor) * number_of_months/12) ** (1 / scaling_parameter)
 
-        return num/denum
+            return num/denum
@@ -0,0 +1,202 @@
+from enum import IntFlag, StrEnum
+from typing import Dict, Mapping, NamedTuple, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ...profiling import stage
+from .model_spec import INPUTS
+
+
+class Violation(IntFlag):
+    MISSING = 1
+    OUT_OF_RANGE = 2
+    UNKNOWN_CATEGORY = 4
+    MALFORMED = 8
+
+
+class InvalidRows(StrEnum):
+    DROP = "drop"
+    FLAG = "flag"
+    RAISE = "raise"
+
+
+class ValidationReport(NamedTuple):
+    violations: np.ndarray
+    violations_by_input: Dict[str, np.ndarray]
+
+    @property
+    def is_valid(self) -> np.ndarray:
+        """
+        Whether each row has no violation.
+
+        Returns
+        -------
+        is_valid : numpy.ndarray
+            Boolean mask of the valid rows.
+        """
+        return self.violations == 0
+
+    @property
+    def number_of_invalid_rows(self) -> int:
+        """
+        Number of rows with at least one violation.
+
+        Returns
+        -------
+        number_of_invalid_rows : int
+            The number of invalid rows.
+        """
+        return int(np.count_nonzero(self.violations))
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """
+        Counts the rows with each violation, by input. Inputs and violations without any row are omitted.
+
+        Returns
+        -------
+        summary : Dict[str, Dict[str, int]]
+            The number of rows, by violation name, by input.
+        """
+        summary = {}
+        for _input, violations in self.violations_by_input.items():
+            counts = {
+                violation.name: int(np.count_nonzero(violations & violation)) for violation in Violation
+            }
+            counts = {name: count for name, count in counts.items() if count}
+            if counts:
+                summary[_input] = counts
+
+        return summary
+
+
+def _validate_categorical(values: pd.Categorical, categories: Tuple) -> np.ndarray:
+    """
+    Validates a categorical input. The categories are checked once each and the result is gathered by code, without
+    comparing the values of the rows.
+
+    Parameters
+    ----------
+    values : pandas.Categorical
+        The values.
+    categories : Tuple
+        The known categories.
+
+    Returns
+    -------
+    violations : numpy.ndarray
+        The violations of each row.
+    """
+    # The last entry is the violation of missing values, whose code is -1.
+    violations_by_code = np.array(
+        [0 if category in categories else Violation.UNKNOWN_CATEGORY for category in values.categories]
+        + [Violation.MISSING],
+        dtype=np.uint8
+    )
+
+    return violations_by_code[values.codes]
+
+
+def _validate_numeric(values: np.ndarray, minimum: float, maximum: float, categories: Tuple) -> np.ndarray:
+    """
+    Validates a numeric input.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The values, as floats. Malformed values are already NaN.
+    minimum : float
+        The minimum value, or None.
+    maximum : float
+        The maximum value, or None.
+    categories : Tuple
+        The allowed values, or None.
+
+    Returns
+    -------
+    violations : numpy.ndarray
+        The violations of each row.
+    """
+    missing = np.isnan(values)
+    violations = missing.astype(np.uint8)
+    if minimum is not None:
+        violations[values < minimum] |= np.uint8(Violation.OUT_OF_RANGE)
+    if maximum is not None:
+        violations[values > maximum] |= np.uint8(Violation.OUT_OF_RANGE)
+    if categories is not None:
+        violations[~np.isin(values, categories) & ~missing] |= np.uint8(Violation.UNKNOWN_CATEGORY)
+
+    return violations
+
+
+def validate_inputs(
+        inputs: Mapping[str, Union[np.ndarray, pd.Categorical]]
+) -> Tuple[Dict[str, Union[np.ndarray, pd.Categorical]], ValidationReport]:
+    """
+    Validates the inputs of the models against their specification in INPUTS, i.e. flags missing values, values out
+    of range, unknown categories and malformed (non numeric) values of numeric inputs. It is the first step of the
+    encoding: categorical inputs are factorized once, and the returned inputs (the categorical values as
+    pandas.Categorical, the malformed values as NaN) are passed to the encoders, which then reuse the factorization.
+
+    Parameters
+    ----------
+    inputs : Mapping[str, Union[numpy.ndarray, pandas.Categorical]]
+        The inputs, i.e. the patients data, by input name.
+
+    Returns
+    -------
+    inputs, report : Tuple[Dict[str, Union[numpy.ndarray, pandas.Categorical]], ValidationReport]
+        The inputs to encode and the validation report.
+    """
+    number_of_rows = len(next(iter(inputs.values()))) if inputs else 0
+    encoded_inputs, violations_by_input = {}, {}
+    violations = np.zeros(number_of_rows, dtype=np.uint8)
+    for _input, values in inputs.items():
+        input_spec = INPUTS.get(_input)
+        if input_spec is None:
+            encoded_inputs[_input] = values
+            continue
+
+        with stage(f"validate_inputs.{_input}", rows=number_of_rows):
+            if input_spec.categories is not None and isinstance(input_spec.categories[0], str):
+                if not isinstance(values, pd.Categorical):
+                    values = pd.Categorical(np.asarray(values, dtype=object))
+                input_violations = _validate_categorical(values, input_spec.categories)
+            else:
+                malformed = np.zeros(number_of_rows, dtype=bool)
+                if isinstance(values, pd.Categorical) or np.asarray(values).dtype.kind in "OUS":
+                    numeric_values = pd.to_numeric(pd.Series(np.asarray(values, dtype=object)), errors="coerce")
+                    malformed = numeric_values.isna().to_numpy() & ~pd.isna(np.asarray(values, dtype=object))
+                    values = numeric_values.to_numpy(dtype=np.float64)
+                input_violations = _validate_numeric(
+                    np.asarray(values, dtype=np.float64),
+                    input_spec.minimum,
+                    input_spec.maximum,
+                    input_spec.categories
+                )
+                input_violations[malformed] = Violation.MALFORMED
+
+        encoded_inputs[_input] = values
+        violations_by_input[_input] = input_violations
+        violations |= input_violations
+
+    return encoded_inputs, ValidationReport(violations=violations, violations_by_input=violations_by_input)
+
+
+def get_validation_error(report: ValidationReport) -> ValueError:
+    """
+    Gets the error raised when some rows are invalid.
+
+    Parameters
+    ----------
+    report : ValidationReport
+        The validation report.
+
+    Returns
+    -------
+    error : ValueError
+        The error, describing the number of rows with each violation by input.
+    """
+    return ValueError(
+        f"{report.number_of_invalid_rows} of {len(report.violations)} rows have invalid inputs: {report.summary()}."
+    )
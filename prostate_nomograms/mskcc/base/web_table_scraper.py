@@ -1,12 +1,20 @@
+from datetime import datetime
 from enum import Enum
+from io import StringIO
 import json
 import os
 import re
-from typing import NamedTuple, Union
+import tempfile
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 
 import pandas as pd
 import requests
 
+from ...profiling import stage
+from .acquisition_counters import AcquisitionCounters, get_process_counters
+from .coefficients_bundle import CoefficientsBundle
+
 
 class Date(NamedTuple):
     day: str = None
@@ -14,8 +22,11 @@ class Date(NamedTuple):
     year: str = None
 
 
+MANIFEST_FILE_NAME = "coefficients_manifest.json"
+
+
 class DataframeCategory(NamedTuple):
-    table_index: int = None
+    header_signature: Tuple[str, ...] = ()
     file_name: str = ""
 
 
@@ -24,25 +35,340 @@ class CoefficientCategory(Enum):
     SPLINE: str = "spline"
 
 
+def parse_date(url_content: str) -> Date:
+    """
+    Parses the date of the last update of a coefficients page.
+
+    Parameters
+    ----------
+    url_content : str
+        The content of the page.
+
+    Returns
+    -------
+    date : Date
+        The date of the last update.
+    """
+    last_update_match = re.search('Updated:(\s\w+\s\w+),(\s(\w+))', url_content)
+    date_list = last_update_match.group(0).split()
+
+    return Date(day=date_list[2][:-1], month=date_list[1], year=date_list[3])
+
+
+def get_json_file_name(dataframe_category: DataframeCategory, date: Date) -> str:
+    """
+    The name of the json file of a dataframe category at a given date.
+
+    Parameters
+    ----------
+    dataframe_category : DataframeCategory
+        The dataframe category.
+    date : Date
+        The date of the coefficients.
+
+    Returns
+    -------
+    json_file_name : str
+        The name of the json file.
+    """
+    return f"{dataframe_category.file_name}_{date.day}_{date.month}_{date.year}.json"
+
+
+def get_bundle_folder_name(date: Date) -> str:
+    """
+    The name of the coefficients bundle folder at a given date.
+
+    Parameters
+    ----------
+    date : Date
+        The date of the coefficients.
+
+    Returns
+    -------
+    bundle_folder_name : str
+        The name of the bundle folder.
+    """
+    return f"coefficients_bundle_{date.day}_{date.month}_{date.year}"
+
+
+def _get_datetime(date: Date) -> Optional[datetime]:
+    """
+    Converts a date to a datetime, so that dates can be ordered.
+
+    Parameters
+    ----------
+    date : Date
+        The date.
+
+    Returns
+    -------
+    datetime : Optional[datetime]
+        The datetime, or None if the date is not a valid date.
+    """
+    try:
+        return datetime.strptime(f"{date.day} {date.month} {date.year}", "%d %B %Y")
+    except ValueError:
+        return None
+
+
+def get_local_dates(json_folder_path: str, dataframe_categories: Tuple[DataframeCategory, ...]) -> List[Date]:
+    """
+    Gets the dates of the coefficients available locally, i.e. the dates of the bundle folders and the dates for
+    which the json files of all the dataframe categories exist, from the oldest to the newest.
+
+    Parameters
+    ----------
+    json_folder_path : str
+        The path of the folder where the json files and the bundles are saved.
+    dataframe_categories : Tuple[DataframeCategory, ...]
+        The dataframe categories.
+
+    Returns
+    -------
+    dates : List[Date]
+        The dates, from the oldest to the newest.
+    """
+    if not os.path.isdir(json_folder_path):
+        return []
+
+    file_names = set(os.listdir(json_folder_path))
+    dates = {}
+    for file_name in file_names:
+        match = re.fullmatch(r"(?:coefficients_bundle|\w+_coefficients)_(\d+)_([A-Za-z]+)_(\d+)(?:\.json)?", file_name)
+        if match is None:
+            continue
+
+        date = Date(day=match.group(1), month=match.group(2), year=match.group(3))
+        is_available = get_bundle_folder_name(date) in file_names or all(
+            get_json_file_name(dataframe_category, date) in file_names for dataframe_category in dataframe_categories
+        )
+        if is_available and _get_datetime(date) is not None:
+            dates[date] = _get_datetime(date)
+
+    return sorted(dates, key=dates.get)
+
+
+def read_manifest(json_folder_path: str) -> Dict[str, Dict[str, Union[str, Dict[str, str]]]]:
+    """
+    Reads the manifest of the coefficients saved in a folder.
+
+    Parameters
+    ----------
+    json_folder_path : str
+        The path of the folder where the json files and the bundles are saved.
+
+    Returns
+    -------
+    manifest : Dict[str, Dict[str, Union[str, Dict[str, str]]]]
+        The date of the latest coefficients and the name of their bundle folder, by url.
+    """
+    manifest_file_path = os.path.join(json_folder_path, MANIFEST_FILE_NAME)
+    if os.path.exists(manifest_file_path):
+        with open(manifest_file_path) as file:
+            return json.load(file)
+    else:
+        return {}
+
+
+def write_manifest(json_folder_path: str, url: str, date: Date) -> None:
+    """
+    Records atomically in the manifest of a folder the date of the latest coefficients of a url and the name of their
+    bundle folder.
+
+    Parameters
+    ----------
+    json_folder_path : str
+        The path of the folder where the json files and the bundles are saved.
+    url : str
+        The url of the coefficients page.
+    date : Date
+        The date of the latest coefficients.
+    """
+    manifest = read_manifest(json_folder_path)
+    manifest[url] = {"date": date._asdict(), "bundle_folder_name": get_bundle_folder_name(date)}
+    write_atomically(os.path.join(json_folder_path, MANIFEST_FILE_NAME), json.dumps(manifest, indent=1))
+
+
+def read_json_table(json_file_path: str) -> pd.DataFrame:
+    """
+    Reads a coefficients table saved as a json file.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The path of the json file.
+
+    Returns
+    -------
+    dataframe : pd.DataFrame
+        The table.
+    """
+    with open(json_file_path) as file:
+        models_coefficients = json.load(file)
+
+    return pd.DataFrame.from_dict(models_coefficients, orient='columns')
+
+
+def find_table(tables: List[pd.DataFrame], dataframe_category: DataframeCategory) -> pd.DataFrame:
+    """
+    Finds the table of a dataframe category among the tables of a page, i.e. the first table whose columns are exactly
+    the header signature of the category. This does not depend on the position of the table in the page.
+
+    Parameters
+    ----------
+    tables : List[pd.DataFrame]
+        The tables of the page.
+    dataframe_category : DataframeCategory
+        The dataframe category.
+
+    Returns
+    -------
+    table : pd.DataFrame
+        The table.
+    """
+    for table in tables:
+        if tuple(str(column) for column in table.columns) == dataframe_category.header_signature:
+            return table
+
+    raise ValueError(f"No table with the columns {dataframe_category.header_signature} was found.")
+
+
+def write_atomically(path: str, content: str) -> None:
+    """
+    Writes a file atomically, i.e. the content is written to a temporary file of the same folder which then replaces
+    the file, so that readers never see a partially written file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    content : str
+        The content of the file.
+    """
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w") as file:
+            file.write(content)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def save_tables(
+        tables: List[pd.DataFrame],
+        dataframe_categories: Tuple[DataframeCategory, ...],
+        date: Date,
+        json_folder_path: str
+) -> List[str]:
+    """
+    Extracts the tables of all the given dataframe categories from the tables of a page and saves them atomically as
+    dated json files.
+
+    Parameters
+    ----------
+    tables : List[pd.DataFrame]
+        The tables of the page.
+    dataframe_categories : Tuple[DataframeCategory, ...]
+        The dataframe categories.
+    date : Date
+        The date of the last update of the page.
+    json_folder_path : str
+        The path of the folder where the json files are saved.
+
+    Returns
+    -------
+    json_file_paths : List[str]
+        The paths of the json files.
+    """
+    dataframes = [find_table(tables, dataframe_category) for dataframe_category in dataframe_categories]
+
+    os.makedirs(json_folder_path, exist_ok=True)
+    json_file_paths = []
+    for dataframe_category, dataframe in zip(dataframe_categories, dataframes):
+        json_file_path = os.path.join(json_folder_path, get_json_file_name(dataframe_category, date))
+        write_atomically(json_file_path, dataframe.to_json(orient="columns", indent=1))
+        json_file_paths.append(json_file_path)
+
+    return json_file_paths
+
+
+class Page:
+    """
+    The content, date and tables of a coefficients page. A single page is shared by all the scrapers of the process
+    requesting the same url, so that the page is fetched and parsed at most once per process.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty page.
+        """
+        self.lock = threading.RLock()
+        self.url_content: Optional[str] = None
+        self.date: Optional[Date] = None
+        self.tables: Optional[List[pd.DataFrame]] = None
+
+
+_PAGES: Dict[str, Page] = {}
+_PAGES_LOCK = threading.Lock()
+
+
+def get_page(url: str) -> Page:
+    """
+    Gets the process-wide page of a url.
+
+    Parameters
+    ----------
+    url : str
+        The url of the page.
+
+    Returns
+    -------
+    page : Page
+        The page, empty if it was never fetched.
+    """
+    with _PAGES_LOCK:
+        if url not in _PAGES:
+            _PAGES[url] = Page()
+
+        return _PAGES[url]
+
+
+def clear_pages() -> None:
+    """
+    Clears the process-wide pages, so that the next scrapers fetch their page again.
+    """
+    with _PAGES_LOCK:
+        _PAGES.clear()
+
+
 class WebTableScraper:
     """
-    The web table scraper. It scrapes the web table and saves it as a json file.
+    The web table scraper. It scrapes the web table and saves it as a json file. The coefficients are resolved
+    locally first, from the manifest written by the CoefficientsRefresher or else from the newest dated files of the
+    json folder, and the page is fetched only when no coefficients exist locally. The page is then fetched and parsed
+    at most once per process and url, whatever the number of scrapers, and all the coefficients tables are extracted
+    from this single parse.
     """
 
     VariablesCoefficientsDataframeCategory = DataframeCategory(
-        table_index=6,
+        header_signature=("Model Type", "Model", "Variable", "Value"),
         file_name="variables_coefficients"
     )
 
     SplineCoefficientsDataframeCategory = DataframeCategory(
-        table_index=7,
+        header_signature=("Knot", "Value"),
         file_name="spline_coefficients"
     )
 
+    DATAFRAME_CATEGORIES = (VariablesCoefficientsDataframeCategory, SplineCoefficientsDataframeCategory)
+
     def __init__(
             self,
             url: str,
-            json_folder_path: str
+            json_folder_path: str,
+            timeout: float = 30.0,
+            session: Optional[requests.Session] = None
     ):
         """
         Initializes the WebTableScraper class.
@@ -53,40 +379,104 @@ class WebTableScraper:
             The url of the web table.
         json_folder_path : str
             The path of the folder where the json file will be saved.
+        timeout : float
+            Timeout of the request, in seconds.
+        session : Optional[requests.Session]
+            Session used to send the request. A new session is created by default.
         """
         self.url = url
         self.json_folder_path = json_folder_path
+        self.timeout = timeout
+        self.session = session if session else requests.Session()
+        self.counters = AcquisitionCounters(parent=get_process_counters())
+        self.page = get_page(url)
 
     @property
     def url_content(self) -> str:
         """
-        The content of the url.
+        The content of the url. It is fetched once per process, on first access.
 
         Returns
         -------
         url_content : str
             The content of the url.
         """
-        url_content = requests.get(self.url).text
+        with self.page.lock:
+            if self.page.url_content is None:
+                self.counters.increment("page_cache_misses")
+                with stage("WebTableScraper.fetch"):
+                    response = self.session.get(self.url, timeout=self.timeout)
+                    self.counters.increment("http_requests")
+                    self.counters.increment("bytes_downloaded", len(response.content))
+                    response.raise_for_status()
+                    self.page.url_content = response.text
+            else:
+                self.counters.increment("page_cache_hits")
+
+            return self.page.url_content
 
-        return url_content
+    @property
+    def local_date(self) -> Optional[Date]:
+        """
+        The date of the coefficients available locally, i.e. the date recorded in the manifest of the json folder if
+        its coefficients exist, or else the newest date of the bundles and json files of the folder.
+
+        Returns
+        -------
+        local_date : Optional[Date]
+            The date of the local coefficients, or None if no coefficients exist locally.
+        """
+        local_dates = get_local_dates(self.json_folder_path, self.DATAFRAME_CATEGORIES)
+        entry = read_manifest(self.json_folder_path).get(self.url)
+        if entry is not None and Date(**entry["date"]) in local_dates:
+            return Date(**entry["date"])
+        elif local_dates:
+            return local_dates[-1]
+        else:
+            return None
 
     @property
     def date(self) -> Date:
         """
-        The date of the last update.
+        The date of the last update, i.e. the date of the page if it was already fetched or refreshed by this process,
+        or else the date of the local coefficients. The page is fetched only if no coefficients exist locally.
 
         Returns
         -------
         date : Date
             The date of the last update.
         """
-        last_update_match = re.search('Updated:(\s\w+\s\w+),(\s(\w+))', self.url_content)
-        date_list = last_update_match.group(0).split()
+        with self.page.lock:
+            if self.page.date is not None:
+                return self.page.date
+
+            local_date = self.local_date
+            if local_date is not None:
+                return local_date
 
-        date = Date(day=date_list[2][:-1], month=date_list[1], year=date_list[3])
+            url_content = self.url_content
+            with self.counters.time_parse():
+                self.page.date = parse_date(url_content)
 
-        return date
+            return self.page.date
+
+    @property
+    def tables(self) -> List[pd.DataFrame]:
+        """
+        All the tables of the page. They are parsed once per process, on first access.
+
+        Returns
+        -------
+        tables : List[pd.DataFrame]
+            The tables.
+        """
+        with self.page.lock:
+            if self.page.tables is None:
+                url_content = self.url_content
+                with stage("WebTableScraper.parse_tables"), self.counters.time_parse():
+                    self.page.tables = pd.read_html(StringIO(url_content))
+
+            return self.page.tables
 
     def _get_dataframe_category(self, coefficient_category: CoefficientCategory) -> DataframeCategory:
         """
@@ -123,35 +513,21 @@ class WebTableScraper:
         json_file_path : str
             The path of the json file.
         """
-        json_file_path = os.path.join(
-            self.json_folder_path,
-            f"{dataframe_category.file_name}_{self.date.day}_{self.date.month}_{self.date.year}.json"
-        )
+        json_file_path = os.path.join(self.json_folder_path, get_json_file_name(dataframe_category, self.date))
 
         return json_file_path
 
-    def create_dataframe(self, dataframe_category: DataframeCategory, json_file_path: str) -> None:
+    def create_dataframes(self) -> List[str]:
         """
-        Creates the dataframe and saves it as a json file.
+        Creates the dataframes of all the coefficient categories from a single parse of the page and saves them
+        together as json files.
 
-        Parameters
-        ----------
-        dataframe_category : DataframeCategory
-            The dataframe category.
-        json_file_path : str
-            The path of the json file.
+        Returns
+        -------
+        json_file_paths : List[str]
+            The paths of the json files.
         """
-        if not os.path.exists(self.json_folder_path):
-            os.makedirs(self.json_folder_path)
-
-        tables = pd.read_html(self.url_content)
-        dataframe = tables[dataframe_category.table_index]
-
-        dataframe.to_json(
-            path_or_buf=json_file_path,
-            orient="columns",
-            indent=1
-        )
+        return save_tables(self.tables, self.DATAFRAME_CATEGORIES, self.date, self.json_folder_path)
 
     def get_models_coefficients(self, coefficient_category: Union[str, CoefficientCategory]) -> pd.DataFrame:
         """
@@ -172,23 +548,39 @@ class WebTableScraper:
 
         json_path = self._get_json_file_path(dataframe_category)
         if os.path.exists(json_path):
-            pass
+            self.counters.increment("file_cache_hits")
         else:
-            self.create_dataframe(dataframe_category, json_path)
-
-        with open(json_path) as file:
-            models_coefficients = json.load(file)
+            self.counters.increment("file_cache_misses")
+            self.create_dataframes()
 
-        dataframe = pd.DataFrame.from_dict(models_coefficients, orient='columns')
+        with stage("WebTableScraper.read_json"), self.counters.time_parse():
+            dataframe = read_json_table(json_path)
+            self.counters.increment("json_reads")
 
         return dataframe
 
+    def get_coefficients_bundle(self) -> CoefficientsBundle:
+        """
+        Gets the binary coefficients bundle of the current date. It is created from the json files the first time,
+        and recorded in the manifest of the json folder.
 
-if __name__ == "__main__":
-    url = "https://www.mskcc.org/nomograms/prostate/post_op/coefficients"
-    web_scrapper = WebTableScraper(
-        url,
-        json_folder_path="post_radical_prostatectomy/models_coefficients",
-    )
+        Returns
+        -------
+        bundle : CoefficientsBundle
+            The coefficients bundle.
+        """
+        date = self.date
+        bundle_folder_path = os.path.join(self.json_folder_path, get_bundle_folder_name(date))
+        if os.path.exists(bundle_folder_path):
+            self.counters.increment("bundle_cache_hits")
+        else:
+            self.counters.increment("bundle_cache_misses")
+            CoefficientsBundle.create(
+                variables_dataframe=self.get_models_coefficients(CoefficientCategory.VARIABLES),
+                spline_dataframe=self.get_models_coefficients(CoefficientCategory.SPLINE),
+                folder_path=bundle_folder_path
+            )
+            write_manifest(self.json_folder_path, self.url, date)
+
+        return CoefficientsBundle(bundle_folder_path)
 
-    print(web_scrapper.get_models_coefficients(coefficient_category="variables"))
@@ -0,0 +1,98 @@
+import os
+from typing import Optional, Union
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from .base import Backend, Model
+from ..enum import SurvivalOutcome
+
+
+class MskccPostRadicalProstatectomyNomogram(Model):
+
+    OUTCOMES = [
+        SurvivalOutcome.POSTOPERATIVE_BCR,
+        SurvivalOutcome.POSTOPERATIVE_BCR_CLINICAL,
+        SurvivalOutcome.POSTOPERATIVE_PROSTATE_CANCER_DEATH,
+        SurvivalOutcome.POSTOPERATIVE_PROSTATE_CANCER_DEATH_CLINICAL
+    ]
+
+    def __init__(
+            self,
+            outcome: Union[str, SurvivalOutcome],
+            age_column_name: str = "AGE",
+            psa_column_name: str = "PSA",
+            pathologic_primary_gleason_column_name: str = "PATHOLOGIC_GLEASON_PRIMARY",
+            pathologic_secondary_gleason_column_name: str = "PATHOLOGIC_GLEASON_SECONDARY",
+            extracapsular_extension_column_name: str = "EXTRACAPSULAR_EXTENSION",
+            seminal_vesicle_invasion_column_name: str = "SEMINAL_VESICLE_INVASION",
+            lymph_node_involvement_column_name: str = "LYMPH_NODE_INVOLVEMENT",
+            surgical_margin_status_column_name: str = "SURGICAL_MARGIN_STATUS",
+            primary_gleason_column_name: str = "GLEASON_PRIMARY",
+            secondary_gleason_column_name: str = "GLEASON_SECONDARY",
+            clinical_stage_column_name: str = "CLINICAL_STAGE",
+            backend: Optional[Union[str, Backend]] = None,
+            dtype: DTypeLike = np.float64
+    ):
+        """
+        Initializes columns names. The postoperative models are published alongside the preoperative ones, so the
+        coefficients are read from the same tables as the MskccPreRadicalProstatectomyNomogram.
+
+        Parameters
+        ----------
+        outcome : Union[str, SurvivalOutcome]
+            Name of the outcome.
+        age_column_name : str
+            Name of the column containing the age of the patients.
+        psa_column_name : str
+            Name of the column containing the preoperative PSA of the patients.
+        pathologic_primary_gleason_column_name : str
+            Name of the column containing the primary pathologic Gleason score of the patients.
+        pathologic_secondary_gleason_column_name : str
+            Name of the column containing the secondary pathologic Gleason score of the patients.
+        extracapsular_extension_column_name : str
+            Name of the column containing the extracapsular extension status (0 or 1) of the patients.
+        seminal_vesicle_invasion_column_name : str
+            Name of the column containing the seminal vesicle invasion status (0 or 1) of the patients.
+        lymph_node_involvement_column_name : str
+            Name of the column containing the lymph node involvement status (0 or 1) of the patients.
+        surgical_margin_status_column_name : str
+            Name of the column containing the surgical margin status (0 or 1) of the patients.
+        primary_gleason_column_name : str
+            Name of the column containing the primary biopsy Gleason score of the patients. It is used only for the
+            "(Clinical)" outcomes.
+        secondary_gleason_column_name : str
+            Name of the column containing the secondary biopsy Gleason score of the patients. It is used only for the
+            "(Clinical)" outcomes.
+        clinical_stage_column_name : str
+            Name of the column containing the clinical stage of the patients. It is used only for the "(Clinical)"
+            outcomes.
+        backend : Optional[Union[str, Backend]]
+            Backend used to compute the predictions, i.e. "numba", "numexpr" or "numpy". Defaults to the fastest
+            available backend.
+        dtype : DTypeLike
+            Floating point type of the predictions, e.g. numpy.float32 to halve the memory used by the predictions.
+        """
+        if outcome in self.OUTCOMES:
+            self.outcome = SurvivalOutcome(outcome)
+        else:
+            raise ValueError(f"Invalid outcome: {outcome}")
+
+        super().__init__(
+            outcome=self.outcome,
+            url="https://www.mskcc.org/nomograms/prostate/pre_op/coefficients",
+            json_folder_path=os.path.join(os.path.dirname(__file__), "models_coefficients"),
+            age_column_name=age_column_name,
+            psa_column_name=psa_column_name,
+            primary_gleason_column_name=primary_gleason_column_name,
+            secondary_gleason_column_name=secondary_gleason_column_name,
+            clinical_stage_column_name=clinical_stage_column_name,
+            pathologic_primary_gleason_column_name=pathologic_primary_gleason_column_name,
+            pathologic_secondary_gleason_column_name=pathologic_secondary_gleason_column_name,
+            extracapsular_extension_column_name=extracapsular_extension_column_name,
+            seminal_vesicle_invasion_column_name=seminal_vesicle_invasion_column_name,
+            lymph_node_involvement_column_name=lymph_node_involvement_column_name,
+            surgical_margin_status_column_name=surgical_margin_status_column_name,
+            backend=backend,
+            dtype=dtype
+        )
@@ -1,7 +1,10 @@
 import os
 from typing import Optional, Union
 
-from .base import Model
+import numpy as np
+from numpy.typing import DTypeLike
+
+from .base import Backend, Model
 from ..enum import ClassificationOutcome, SurvivalOutcome
 
 
@@ -16,7 +19,9 @@ class MskccPreRadicalProstatectomyNomogram(Model):
             secondary_gleason_column_name: str = "GLEASON_SECONDARY",
             clinical_stage_column_name: str = "CLINICAL_STAGE",
             number_of_positive_cores_column_name: Optional[str] = None,
-            number_of_negative_cores_column_name: Optional[str] = None
+            number_of_negative_cores_column_name: Optional[str] = None,
+            backend: Optional[Union[str, Backend]] = None,
+            dtype: DTypeLike = np.float64
     ):
         """
         Initializes columns names.
@@ -39,6 +44,11 @@ class MskccPreRadicalProstatectomyNomogram(Model):
             Name of the column containing the number of positive cores of the patients.
         number_of_negative_cores_column_name : str, optional
             Name of the column containing the number of negative cores of the patients.
+        backend : Optional[Union[str, Backend]]
+            Backend used to compute the predictions, i.e. "numba", "numexpr" or "numpy". Defaults to the fastest
+            available backend.
+        dtype : DTypeLike
+            Floating point type of the predictions, e.g. numpy.float32 to halve the memory used by the predictions.
         """
         if outcome in ClassificationOutcome:
             self.outcome = ClassificationOutcome(outcome)
@@ -57,5 +67,7 @@ class MskccPreRadicalProstatectomyNomogram(Model):
             secondary_gleason_column_name=secondary_gleason_column_name,
             clinical_stage_column_name=clinical_stage_column_name,
             number_of_positive_cores_column_name=number_of_positive_cores_column_name,
-            number_of_negative_cores_column_name=number_of_negative_cores_column_name
+            number_of_negative_cores_column_name=number_of_negative_cores_column_name,
+            backend=backend,
+            dtype=dtype
         )
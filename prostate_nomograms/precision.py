@@ -0,0 +1,90 @@
+from typing import Any, Dict, NamedTuple, Union
+
+import numpy as np
+
+from .frames import Frame, get_number_of_rows, take
+
+
+class PrecisionReport(NamedTuple):
+    dtype: np.dtype
+    number_of_samples: int
+    max_absolute_deviation: Dict[str, float]
+    tolerance: float
+
+    @property
+    def is_within_tolerance(self) -> bool:
+        """
+        Whether the maximum absolute deviation of all the predictions is within the tolerance.
+
+        Returns
+        -------
+        is_within_tolerance : bool
+            Whether the predictions are within the tolerance.
+        """
+        return all(deviation <= self.tolerance for deviation in self.max_absolute_deviation.values())
+
+
+def check_precision(
+        nomogram: Any,
+        reference_nomogram: Any,
+        dataframe: Frame,
+        number_of_months: Union[np.ndarray, list, float, int] = 60,
+        sample_size: int = 1000,
+        tolerance: float = 1e-3,
+        random_state: int = 0
+) -> PrecisionReport:
+    """
+    Measures the maximum absolute deviation between the predictions of a nomogram using a reduced precision dtype and
+    the predictions of the same nomogram using float64, on a random sample of the patients.
+
+    Parameters
+    ----------
+    nomogram : Any
+        The nomogram using a reduced precision dtype.
+    reference_nomogram : Any
+        The same nomogram using float64.
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    number_of_months : Union[numpy.ndarray, list, float, int]
+        The number of months, either for all the patients or for each patient. It is used only for survival models.
+    sample_size : int
+        The number of patients in the sample.
+    tolerance : float
+        The maximum absolute deviation considered acceptable.
+    random_state : int
+        Random state used to sample the patients.
+
+    Returns
+    -------
+    report : PrecisionReport
+        The precision report.
+    """
+    number_of_rows = get_number_of_rows(dataframe)
+    random_generator = np.random.default_rng(random_state)
+    indices = np.sort(random_generator.choice(number_of_rows, size=min(sample_size, number_of_rows), replace=False))
+    sample = take(dataframe, indices)
+    if np.ndim(number_of_months) > 0:
+        number_of_months = np.asarray(number_of_months)[indices]
+
+    if nomogram.model_type == "survival":
+        predictions = {
+            "risk": (nomogram.predict_risk(sample), reference_nomogram.predict_risk(sample)),
+            "probability": (
+                nomogram.predict_proba(sample, number_of_months),
+                reference_nomogram.predict_proba(sample, number_of_months)
+            )
+        }
+    else:
+        predictions = {"probability": (nomogram.predict_proba(sample), reference_nomogram.predict_proba(sample))}
+
+    max_absolute_deviation = {
+        name: float(np.max(np.abs(np.asarray(prediction, dtype=np.float64) - reference), initial=0))
+        for name, (prediction, reference) in predictions.items()
+    }
+
+    return PrecisionReport(
+        dtype=np.dtype(nomogram.dtype),
+        number_of_samples=len(indices),
+        max_absolute_deviation=max_absolute_deviation,
+        tolerance=tolerance
+    )
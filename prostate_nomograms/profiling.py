@@ -0,0 +1,274 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import itertools
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+
+class StageRecord(NamedTuple):
+    name: str
+    span_id: int
+    parent_span_id: Optional[int]
+    start_time: int
+    end_time: int
+    rows: Optional[int] = None
+    bytes_allocated: Optional[int] = None
+
+    @property
+    def wall_time(self) -> float:
+        """
+        Wall time of the stage.
+
+        Returns
+        -------
+        wall_time : float
+            Wall time of the stage, in seconds.
+        """
+        return (self.end_time - self.start_time)/1e9
+
+
+class _OpenStage:
+    """
+    A stage that has not ended yet.
+    """
+
+    def __init__(self, name: str, span_id: int, parent: Optional["_OpenStage"], rows: Optional[int]):
+        """
+        Starts the stage.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+        span_id : int
+            Identifier of the stage.
+        parent : Optional[_OpenStage]
+            The stage enclosing this stage.
+        rows : Optional[int]
+            Number of rows processed by the stage.
+        """
+        self.name = name
+        self.span_id = span_id
+        self.parent = parent
+        self.rows = rows
+        self.start_time = time.time_ns()
+        self.start_memory = 0
+        self.peak_memory = 0
+
+
+_ACTIVE_PROFILER: ContextVar[Optional["Profiler"]] = ContextVar("active_profiler", default=None)
+_OPEN_STAGE: ContextVar[Optional[_OpenStage]] = ContextVar("open_stage", default=None)
+
+
+class Profiler:
+    """
+    Opt-in profiler of the prediction pipelines. While it is active, each pipeline stage (coefficients loading,
+    column extraction, encoding, regressor calls, survival function evaluation, ...) records its wall time, the number
+    of rows it processed and, if trace_memory is True, the bytes it allocated. The records can be exported as a dict
+    or as spans following the OpenTelemetry data model.
+
+    Examples
+    --------
+    >>> with Profiler(trace_memory=True) as profiler:
+    ...     nomogram.predict_proba(dataframe, 60)
+    >>> profiler.to_dict()["summary"]
+    """
+
+    def __init__(
+            self,
+            trace_memory: bool = False,
+            callback: Optional[Callable[[StageRecord], None]] = None
+    ):
+        """
+        Initializes the profiler.
+
+        Parameters
+        ----------
+        trace_memory : bool
+            Whether to record the bytes allocated by each stage with tracemalloc, which slows down the allocations.
+        callback : Optional[Callable[[StageRecord], None]]
+            Function called with the record of each stage when it ends.
+        """
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.records: List[StageRecord] = []
+        self.trace_id = int.from_bytes(os.urandom(16), "big")
+        self._span_ids = itertools.count(1)
+        self._tokens = []
+        self._started_tracemalloc = False
+
+    def __enter__(self) -> "Profiler":
+        """
+        Activates the profiler in the current context, i.e. the current thread or asyncio task.
+
+        Returns
+        -------
+        profiler : Profiler
+            The profiler.
+        """
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._tokens.append((_ACTIVE_PROFILER.set(self), _OPEN_STAGE.set(None)))
+
+        return self
+
+    def __exit__(self, *args) -> None:
+        """
+        Deactivates the profiler.
+        """
+        profiler_token, stage_token = self._tokens.pop()
+        _OPEN_STAGE.reset(stage_token)
+        _ACTIVE_PROFILER.reset(profiler_token)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _start(self, name: str, rows: Optional[int]) -> _OpenStage:
+        """
+        Starts a stage.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+        rows : Optional[int]
+            Number of rows processed by the stage.
+
+        Returns
+        -------
+        stage : _OpenStage
+            The stage.
+        """
+        parent = _OPEN_STAGE.get()
+        stage = _OpenStage(name, next(self._span_ids), parent, rows)
+        if self.trace_memory:
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent.peak_memory = max(parent.peak_memory, peak_memory)
+            tracemalloc.reset_peak()
+            stage.start_memory = stage.peak_memory = current_memory
+
+        return stage
+
+    def _end(self, stage: _OpenStage) -> None:
+        """
+        Ends a stage and records it.
+
+        Parameters
+        ----------
+        stage : _OpenStage
+            The stage.
+        """
+        end_time = time.time_ns()
+        bytes_allocated = None
+        if self.trace_memory:
+            stage.peak_memory = max(stage.peak_memory, tracemalloc.get_traced_memory()[1])
+            bytes_allocated = stage.peak_memory - stage.start_memory
+            if stage.parent is not None:
+                stage.parent.peak_memory = max(stage.parent.peak_memory, stage.peak_memory)
+
+        record = StageRecord(
+            name=stage.name,
+            span_id=stage.span_id,
+            parent_span_id=stage.parent.span_id if stage.parent else None,
+            start_time=stage.start_time,
+            end_time=end_time,
+            rows=stage.rows,
+            bytes_allocated=bytes_allocated
+        )
+        self.records.append(record)
+        if self.callback:
+            self.callback(record)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregates the records by stage name.
+
+        Returns
+        -------
+        summary : Dict[str, Dict[str, Any]]
+            The number of calls, the total wall time, the total number of rows and the total bytes allocated, by
+            stage name.
+        """
+        summary = {}
+        for record in self.records:
+            stage_summary = summary.setdefault(
+                record.name,
+                {"calls": 0, "wall_time": 0.0, "rows": 0, "bytes_allocated": 0 if self.trace_memory else None}
+            )
+            stage_summary["calls"] += 1
+            stage_summary["wall_time"] += record.wall_time
+            stage_summary["rows"] += record.rows or 0
+            if self.trace_memory:
+                stage_summary["bytes_allocated"] += record.bytes_allocated
+
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Exports the records as a dict.
+
+        Returns
+        -------
+        profile : Dict[str, Any]
+            The records, in the order in which the stages ended, and their summary by stage name.
+        """
+        return {
+            "stages": [{**record._asdict(), "wall_time": record.wall_time} for record in self.records],
+            "summary": self.summary()
+        }
+
+    def to_spans(self) -> List[Dict[str, Any]]:
+        """
+        Exports the records as spans following the OpenTelemetry data model, with hexadecimal trace and span ids and
+        start and end times in nanoseconds since the epoch.
+
+        Returns
+        -------
+        spans : List[Dict[str, Any]]
+            The spans.
+        """
+        trace_id = f"{self.trace_id:032x}"
+        return [
+            {
+                "name": record.name,
+                "context": {"trace_id": trace_id, "span_id": f"{record.span_id:016x}"},
+                "parent_id": f"{record.parent_span_id:016x}" if record.parent_span_id else None,
+                "start_time": record.start_time,
+                "end_time": record.end_time,
+                "attributes": {
+                    key: value for key, value in (("rows", record.rows), ("bytes_allocated", record.bytes_allocated))
+                    if value is not None
+                }
+            }
+            for record in self.records
+        ]
+
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None) -> Iterator[None]:
+    """
+    Records a pipeline stage in the active profiler. It does nothing when no profiler is active.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, e.g. "Model.predict_proba".
+    rows : Optional[int]
+        Number of rows processed by the stage.
+    """
+    profiler = _ACTIVE_PROFILER.get()
+    if profiler is None:
+        yield
+        return
+
+    open_stage = profiler._start(name, rows)
+    token = _OPEN_STAGE.set(open_stage)
+    try:
+        yield
+    finally:
+        _OPEN_STAGE.reset(token)
+        profiler._end(open_stage)
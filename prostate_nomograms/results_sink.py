@@ -0,0 +1,607 @@
+from abc import ABC, abstractmethod
+import os
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+from numpy.typing import DTypeLike
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from .frames import Frame, get_number_of_rows, slice_rows
+from .profiling import stage
+
+if TYPE_CHECKING:
+    from .cohort_summary import CohortAggregator
+
+
+class ResultsSink(ABC):
+    """
+    Preallocated results of N patients x K columns (e.g. outcomes x horizons), written column by column and chunk of
+    rows by chunk of rows, instead of inserting one column per prediction in the patients DataFrame and formatting
+    every float as text at the end. Used as a context manager, the sink is closed if the block succeeds and aborted
+    if it raises, so that the results of a failed job cannot be mistaken for complete results.
+    """
+
+    def __init__(self, number_of_rows: int, column_names: Sequence[str], dtype: DTypeLike = np.float64):
+        """
+        Initializes the sink.
+
+        Parameters
+        ----------
+        number_of_rows : int
+            The number of rows, i.e. patients.
+        column_names : Sequence[str]
+            Names of the columns.
+        dtype : DTypeLike
+            Floating point type of the stored results.
+        """
+        if len(set(column_names)) != len(column_names):
+            raise ValueError(f"Columns names must be unique, got {list(column_names)}.")
+
+        self.number_of_rows = number_of_rows
+        self.column_names = list(column_names)
+        self.dtype = np.dtype(dtype)
+
+    def __enter__(self) -> "ResultsSink":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @property
+    def chunk_size(self) -> int:
+        """
+        Number of rows scored at once by write_results.
+
+        Returns
+        -------
+        chunk_size : int
+            The number of rows.
+        """
+        return 1_000_000
+
+    def _check_write(self, column_name: str, start: int, stop: int) -> None:
+        """
+        Checks that a range of rows of a column can be written.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+        start : int
+            The index of the first row.
+        stop : int
+            The index after the last row.
+        """
+        if column_name not in self.column_names:
+            raise ValueError(f"Unknown column: {column_name}. Available columns are {self.column_names}.")
+        if start < 0 or stop > self.number_of_rows:
+            raise ValueError(f"Rows {start} to {stop} are out of the {self.number_of_rows} rows of the sink.")
+
+    @abstractmethod
+    def write(self, column_name: str, values: np.ndarray, start: int = 0) -> None:
+        """
+        Writes the values of a range of rows of a column.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+        values : numpy.ndarray
+            The values of the rows start to start + len(values).
+        start : int
+            The index of the first row.
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Flushes the results and releases the sink.
+        """
+        pass
+
+    @abstractmethod
+    def abort(self) -> None:
+        """
+        Releases the sink and deletes the results written so far, e.g. after an error.
+        """
+        pass
+
+
+class MemmapResultsSink(ResultsSink):
+    """
+    Results sink backed by a folder of memory-mapped .npy files, one per column, plus the columns names. Each write
+    goes straight into the mapped pages of its column, which the operating system flushes to disk in the background,
+    so results larger than the memory can be written and read back without parsing. The columns names are saved by
+    close, so that the folder of a sink that is not closed, e.g. after an error, cannot be loaded.
+
+    Examples
+    --------
+    >>> column_names = get_results_column_names(nomograms, [60, 120, 180])
+    >>> with MemmapResultsSink("results", len(dataframe), column_names) as sink:
+    ...     write_results(sink, nomograms, dataframe, [60, 120, 180])
+    >>> results = MemmapResultsSink.load("results")
+    """
+
+    COLUMNS_FILENAME = "columns.npy"
+
+    def __init__(
+            self,
+            folder_path: str,
+            number_of_rows: int,
+            column_names: Sequence[str],
+            dtype: DTypeLike = np.float64
+    ):
+        """
+        Creates the folder and preallocates the files of the columns, filled with NaN until written. The columns names
+        are saved when the sink is closed.
+
+        Parameters
+        ----------
+        folder_path : str
+            The path of the results folder.
+        number_of_rows : int
+            The number of rows, i.e. patients.
+        column_names : Sequence[str]
+            Names of the columns. They are also the names of the files of the columns.
+        dtype : DTypeLike
+            Floating point type of the stored results.
+        """
+        super().__init__(number_of_rows, column_names, dtype)
+        self.folder_path = folder_path
+
+        os.makedirs(folder_path, exist_ok=True)
+        columns_path = os.path.join(folder_path, self.COLUMNS_FILENAME)
+        if os.path.exists(columns_path):
+            os.remove(columns_path)
+        self._columns: Optional[Dict[str, np.memmap]] = {}
+        for column_name in self.column_names:
+            column = np.lib.format.open_memmap(
+                os.path.join(folder_path, f"{column_name}.npy"),
+                mode="w+",
+                dtype=self.dtype,
+                shape=(number_of_rows, )
+            )
+            column[:] = np.nan
+            self._columns[column_name] = column
+
+    def write(self, column_name: str, values: np.ndarray, start: int = 0) -> None:
+        """
+        Writes the values of a range of rows of a column in its mapped file.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+        values : numpy.ndarray
+            The values of the rows start to start + len(values).
+        start : int
+            The index of the first row.
+        """
+        stop = start + len(values)
+        self._check_write(column_name, start, stop)
+        self._columns[column_name][start:stop] = values
+
+    def flush(self) -> None:
+        """
+        Flushes the written values of all the columns to disk.
+        """
+        for column in self._columns.values():
+            column.flush()
+
+    def close(self) -> None:
+        """
+        Flushes the results, unmaps the files and saves the columns names.
+        """
+        if self._columns is None:
+            return
+
+        self.flush()
+        self._columns = None
+        np.save(
+            os.path.join(self.folder_path, self.COLUMNS_FILENAME),
+            np.char.encode(np.array(self.column_names, dtype=str), "utf-8"),
+            allow_pickle=False
+        )
+
+    def abort(self) -> None:
+        """
+        Unmaps and deletes the files of the columns, and the folder if it is then empty.
+        """
+        if self._columns is None:
+            return
+
+        self._columns = None
+        for column_name in self.column_names:
+            column_path = os.path.join(self.folder_path, f"{column_name}.npy")
+            if os.path.exists(column_path):
+                os.remove(column_path)
+        if not os.listdir(self.folder_path):
+            os.rmdir(self.folder_path)
+
+    @classmethod
+    def load(cls, folder_path: str) -> Dict[str, np.ndarray]:
+        """
+        Loads the columns of a results folder, memory-mapped in read-only mode.
+
+        Parameters
+        ----------
+        folder_path : str
+            The path of the results folder.
+
+        Returns
+        -------
+        results : Dict[str, numpy.ndarray]
+            The results, by column name, in the order of the columns.
+        """
+        column_names = np.char.decode(np.load(os.path.join(folder_path, cls.COLUMNS_FILENAME)), "utf-8")
+
+        return {
+            column_name: np.load(os.path.join(folder_path, f"{column_name}.npy"), mmap_mode="r")
+            for column_name in column_names.tolist()
+        }
+
+
+class ParquetResultsSink(ResultsSink):
+    """
+    Results sink backed by a Parquet file. The rows are buffered in a preallocated column-major block of
+    row_group_size rows, and the block is written as a row group as soon as all its columns are written, with the
+    columns passed to pyarrow without copy. The rows must therefore be written in order, one row group at a time.
+    The file is written at a temporary path in the same folder and renamed to its path by close, so that the file of a
+    sink that is not closed, e.g. after an error, is never at its path.
+
+    Examples
+    --------
+    >>> column_names = get_results_column_names(nomograms, [60, 120, 180])
+    >>> with ParquetResultsSink("results.parquet", len(dataframe), column_names) as sink:
+    ...     write_results(sink, nomograms, dataframe, [60, 120, 180])
+    """
+
+    def __init__(
+            self,
+            path: str,
+            number_of_rows: int,
+            column_names: Sequence[str],
+            dtype: DTypeLike = np.float64,
+            row_group_size: int = 1_000_000,
+            compression: Optional[str] = "snappy"
+    ):
+        """
+        Opens the Parquet writer and preallocates the row group buffer.
+
+        Parameters
+        ----------
+        path : str
+            The path of the Parquet file.
+        number_of_rows : int
+            The number of rows, i.e. patients.
+        column_names : Sequence[str]
+            Names of the columns.
+        dtype : DTypeLike
+            Floating point type of the stored results.
+        row_group_size : int
+            The number of rows of each row group, i.e. of the buffer.
+        compression : Optional[str]
+            The Parquet compression codec, or None.
+        """
+        if pyarrow is None:
+            raise ImportError("The Parquet results sink requires the pyarrow package to be installed.")
+
+        super().__init__(number_of_rows, column_names, dtype)
+        self.path = path
+        self.row_group_size = row_group_size
+
+        schema = pyarrow.schema([(column_name, pyarrow.from_numpy_dtype(self.dtype)) for column_name in column_names])
+        file_descriptor, self._temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)),
+            suffix=".tmp"
+        )
+        os.close(file_descriptor)
+        try:
+            self._writer = pyarrow.parquet.ParquetWriter(self._temporary_path, schema, compression=compression)
+        except BaseException:
+            os.remove(self._temporary_path)
+            raise
+        self._buffer = np.full((min(row_group_size, number_of_rows), len(self.column_names)), np.nan, self.dtype, "F")
+        self._group_start = 0
+        self._written_rows = dict.fromkeys(self.column_names, 0)
+
+    @property
+    def chunk_size(self) -> int:
+        """
+        Number of rows scored at once by write_results, i.e. the row group size.
+
+        Returns
+        -------
+        chunk_size : int
+            The number of rows.
+        """
+        return self.row_group_size
+
+    @property
+    def _group_stop(self) -> int:
+        return min(self._group_start + self.row_group_size, self.number_of_rows)
+
+    def _flush_row_group(self) -> None:
+        """
+        Writes the buffered row group.
+        """
+        number_of_rows = self._group_stop - self._group_start
+        arrays = [pyarrow.array(self._buffer[:number_of_rows, i]) for i in range(len(self.column_names))]
+        with stage("ParquetResultsSink.write_row_group", rows=number_of_rows):
+            self._writer.write_table(pyarrow.Table.from_arrays(arrays, names=self.column_names))
+
+        self._group_start = self._group_stop
+        self._buffer[:] = np.nan
+        self._written_rows = dict.fromkeys(self.column_names, 0)
+
+    def _check_order(self, column_name: str, start: int, stop: int) -> None:
+        """
+        Checks, before anything is buffered, that a range of rows of a column continues the rows already written for
+        this column and does not go beyond the current row group before all the other columns have filled it.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+        start : int
+            The index of the first row.
+        stop : int
+            The index after the last row.
+        """
+        expected_start = self._group_start + self._written_rows[column_name]
+        if start != expected_start:
+            raise ValueError(
+                f"Rows of column {column_name} must be written in order: expected row {expected_start}, got row "
+                f"{start}."
+            )
+
+        group_size = self._group_stop - self._group_start
+        if len(self.column_names) == 1:
+            max_stop = self.number_of_rows
+        elif all(rows == group_size for name, rows in self._written_rows.items() if name != column_name):
+            max_stop = min(self._group_stop + self.row_group_size, self.number_of_rows)
+        else:
+            max_stop = self._group_stop
+
+        if stop > max_stop:
+            raise ValueError(
+                f"Rows beyond row {max_stop} cannot be written before all the columns of the current row group are "
+                f"written."
+            )
+
+    def write(self, column_name: str, values: np.ndarray, start: int = 0) -> None:
+        """
+        Writes the values of a range of rows of a column in the row group buffer. The range must continue the rows
+        already written for this column, and must not go beyond the current row group before all the columns have
+        filled it.
+
+        Parameters
+        ----------
+        column_name : str
+            Name of the column.
+        values : numpy.ndarray
+            The values of the rows start to start + len(values).
+        start : int
+            The index of the first row.
+        """
+        stop = start + len(values)
+        self._check_write(column_name, start, stop)
+        self._check_order(column_name, start, stop)
+        values = np.asarray(values)
+        column_index = self.column_names.index(column_name)
+
+        while start < stop:
+            group_stop = min(stop, self._group_stop)
+            self._buffer[start - self._group_start:group_stop - self._group_start, column_index] = (
+                values[:group_stop - start]
+            )
+            self._written_rows[column_name] = group_stop - self._group_start
+            values = values[group_stop - start:]
+            start = group_stop
+
+            if all(rows == self._group_stop - self._group_start for rows in self._written_rows.values()):
+                self._flush_row_group()
+
+    def close(self) -> None:
+        """
+        Writes the last, possibly incomplete, row group, closes the Parquet file and moves it to its path. Rows that
+        were not written are stored as NaN.
+        """
+        if self._writer is None:
+            return
+
+        try:
+            while self._group_start < self.number_of_rows:
+                self._flush_row_group()
+            self._writer.close()
+            self._writer = None
+            os.replace(self._temporary_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        """
+        Closes the Parquet writer and deletes the temporary file, leaving nothing at the path of the sink.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._temporary_path):
+            os.remove(self._temporary_path)
+
+
+def _get_outcome_name(outcome: Any) -> str:
+    """
+    Gets the name of an outcome used in the results columns names, e.g. "PREOPERATIVE_BCR".
+
+    Parameters
+    ----------
+    outcome : Any
+        The outcome, i.e. a ClassificationOutcome or a SurvivalOutcome.
+
+    Returns
+    -------
+    outcome_name : str
+        The name of the outcome.
+    """
+    return getattr(outcome, "name", str(outcome))
+
+
+def get_results_column_names(
+        nomograms: Sequence[Any],
+        number_of_months: Sequence[int],
+        include_risk: bool = True
+) -> List[str]:
+    """
+    Gets the names of the results columns of nomograms, i.e. PREDICTED_{outcome} for logistic models, and
+    PREDICTED_{outcome}_RISK and PREDICTED_{outcome}_{months}MONTHS for survival models.
+
+    Parameters
+    ----------
+    nomograms : Sequence[Any]
+        The nomograms, e.g. MSKCC nomograms or fitted CapraNomogram.
+    number_of_months : Sequence[int]
+        The horizons, in months, of the survival models.
+    include_risk : bool
+        Whether to include the risk of the survival models.
+
+    Returns
+    -------
+    column_names : List[str]
+        Names of the columns.
+    """
+    column_names = []
+    for nomogram in nomograms:
+        outcome_name = _get_outcome_name(nomogram.outcome)
+        if nomogram.model_type == "survival":
+            if include_risk:
+                column_names.append(f"PREDICTED_{outcome_name}_RISK")
+            column_names += [f"PREDICTED_{outcome_name}_{months}MONTHS" for months in number_of_months]
+        else:
+            column_names.append(f"PREDICTED_{outcome_name}")
+
+    return column_names
+
+
+def iterate_results(
+        nomograms: Sequence[Any],
+        dataframe: Frame,
+        number_of_months: Sequence[int],
+        include_risk: bool = True,
+        chunk_size: int = 65_536
+) -> Iterator[Tuple[int, Frame, Dict[str, np.ndarray]]]:
+    """
+    Scores the patients with all the nomograms and horizons, chunk of rows by chunk of rows.
+
+    Parameters
+    ----------
+    nomograms : Sequence[Any]
+        The nomograms, e.g. MSKCC nomograms or fitted CapraNomogram.
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    number_of_months : Sequence[int]
+        The horizons, in months, of the survival models.
+    include_risk : bool
+        Whether to include the risk of the survival models.
+    chunk_size : int
+        The number of rows scored at once.
+
+    Returns
+    -------
+    results : Iterator[Tuple[int, Frame, Dict[str, numpy.ndarray]]]
+        For each chunk, the index of its first row, the chunk of the dataframe and the predictions of the chunk, by
+        results column name (see get_results_column_names).
+    """
+    number_of_rows = get_number_of_rows(dataframe)
+    for start in range(0, number_of_rows, chunk_size):
+        chunk = slice_rows(dataframe, start, min(start + chunk_size, number_of_rows))
+        predictions = {}
+        with stage("iterate_results.chunk", rows=get_number_of_rows(chunk)):
+            for nomogram in nomograms:
+                outcome_name = _get_outcome_name(nomogram.outcome)
+                if nomogram.model_type == "survival":
+                    if include_risk:
+                        predictions[f"PREDICTED_{outcome_name}_RISK"] = nomogram.predict_risk(chunk)
+                    for months in number_of_months:
+                        predictions[f"PREDICTED_{outcome_name}_{months}MONTHS"] = nomogram.predict_proba(chunk, months)
+                else:
+                    predictions[f"PREDICTED_{outcome_name}"] = nomogram.predict_proba(chunk)
+
+        yield start, chunk, predictions
+
+
+def write_results(
+        sink: ResultsSink,
+        nomograms: Sequence[Any],
+        dataframe: Frame,
+        number_of_months: Sequence[int],
+        include_risk: bool = True,
+        chunk_size: Optional[int] = None,
+        aggregator: Optional["CohortAggregator"] = None
+) -> None:
+    """
+    Scores the patients with all the nomograms and horizons and writes the predictions in a sink, chunk of rows by
+    chunk of rows, so that only the predictions of one chunk are held in memory besides the sink.
+
+    Parameters
+    ----------
+    sink : ResultsSink
+        The sink. Its columns must be the columns given by get_results_column_names.
+    nomograms : Sequence[Any]
+        The nomograms, e.g. MSKCC nomograms or fitted CapraNomogram.
+    dataframe : Frame
+        The patients data, i.e. a pandas DataFrame, a pyarrow Table or RecordBatch, or a polars DataFrame.
+    number_of_months : Sequence[int]
+        The horizons, in months, of the survival models.
+    include_risk : bool
+        Whether to include the risk of the survival models.
+    chunk_size : Optional[int]
+        The number of rows scored at once. Defaults to the chunk size of the sink.
+    aggregator : Optional[CohortAggregator]
+        An aggregator of the cohort summaries, updated with the predictions of each chunk as they are written.
+    """
+    number_of_rows = get_number_of_rows(dataframe)
+    if sink.number_of_rows != number_of_rows:
+        raise ValueError(f"The sink has {sink.number_of_rows} rows, but the dataframe has {number_of_rows} rows.")
+    column_names = get_results_column_names(nomograms, number_of_months, include_risk)
+    if sink.column_names != column_names:
+        raise ValueError(f"The sink columns {sink.column_names} are not the results columns {column_names}.")
+
+    results = iterate_results(nomograms, dataframe, number_of_months, include_risk, chunk_size or sink.chunk_size)
+    for start, chunk, predictions in results:
+        for column_name, values in predictions.items():
+            sink.write(column_name, values, start)
+        if aggregator is not None:
+            aggregator.update(chunk, predictions)
+
+
+def read_results(path: str) -> pd.DataFrame:
+    """
+    Reads results written by a MemmapResultsSink (folder) or a ParquetResultsSink (file) in a DataFrame.
+
+    Parameters
+    ----------
+    path : str
+        The path of the results folder or Parquet file.
+
+    Returns
+    -------
+    results : pandas.DataFrame
+        The results.
+    """
+    if os.path.isdir(path):
+        return pd.DataFrame(MemmapResultsSink.load(path), copy=False)
+    else:
+        return pd.read_parquet(path)
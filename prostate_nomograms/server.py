@@ -0,0 +1,366 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from .enum import ClassificationOutcome, SurvivalOutcome
+from .micro_batcher import MicroBatcher, MicroBatcherMetrics
+
+
+class ScoringRequest(NamedTuple):
+    patients: List[Dict[str, Any]]
+    number_of_months: float
+    outcomes: Tuple[str, ...]
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status: int, message: str):
+        """
+        Initializes the error.
+
+        Parameters
+        ----------
+        status : int
+            The HTTP status code.
+        message : str
+            The error message, returned to the client.
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+def _to_json_list(predictions: List[float]) -> List[Optional[float]]:
+    """
+    Converts predictions to a JSON compatible list, with missing predictions as null.
+
+    Parameters
+    ----------
+    predictions : List[float]
+        The predictions.
+
+    Returns
+    -------
+    predictions : List[Optional[float]]
+        The predictions.
+    """
+    return [None if math.isnan(prediction) else prediction for prediction in predictions]
+
+
+class ScoringServer:
+    """
+    Asyncio HTTP scoring server. The nomograms are constructed (and fitted) once at startup, and the concurrent
+    requests received within a latency window are micro-batched into one vectorized predict_proba call per outcome
+    by one MicroBatcher per outcome. The batches are scored in the worker threads of the micro-batchers, off the event
+    loop, and a request whose patients cannot be scored fails with a 400 response without failing the other requests
+    of its batch.
+
+    It serves two endpoints:
+        - GET /health returns the available outcomes;
+        - POST /predict_proba takes {"patients": [...], "number_of_months": 60, "outcomes": [...]}, where each
+          patient is an object of the columns used by the nomograms and outcomes, a list of outcome names, defaults
+          to all the outcomes, and returns {"predictions": {outcome: [...]}}.
+
+    Examples
+    --------
+    >>> server = ScoringServer({outcome: MskccPreRadicalProstatectomyNomogram(outcome) for outcome in outcomes})
+    >>> asyncio.run(server.serve_forever())
+    """
+
+    def __init__(
+            self,
+            nomograms: Mapping[str, Any],
+            host: str = "127.0.0.1",
+            port: int = 8000,
+            max_batch_size: int = 1024,
+            max_wait: float = 0.002
+    ):
+        """
+        Initializes the server.
+
+        Parameters
+        ----------
+        nomograms : Mapping[str, Any]
+            The constructed nomograms, e.g. MSKCC nomograms or fitted CapraNomogram, by outcome name.
+        host : str
+            The host on which the server listens.
+        port : int
+            The port on which the server listens. Use 0 to pick a free port.
+        max_batch_size : int
+            The maximum number of patients scored in one batch.
+        max_wait : float
+            The maximum time, in seconds, a request waits for other requests to be batched with.
+        """
+        self.nomograms = dict(nomograms)
+        self.host = host
+        self.port = port
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._micro_batchers: Dict[str, MicroBatcher] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def metrics(self) -> Dict[str, MicroBatcherMetrics]:
+        """
+        Metrics of the micro-batcher of each outcome, e.g. the number of batches and the mean batch size.
+
+        Returns
+        -------
+        metrics : Dict[str, MicroBatcherMetrics]
+            The metrics, by outcome name.
+        """
+        return {outcome: micro_batcher.metrics for outcome, micro_batcher in self._micro_batchers.items()}
+
+    def _get_columns_names(self, outcome: str) -> Tuple[str, ...]:
+        """
+        Gets the columns needed by the nomogram of an outcome.
+
+        Parameters
+        ----------
+        outcome : str
+            The outcome.
+
+        Returns
+        -------
+        columns_names : Tuple[str, ...]
+            Names of the columns.
+        """
+        return tuple(self.nomograms[outcome].inputs_column_names)
+
+    def _parse_request(self, body: bytes) -> ScoringRequest:
+        """
+        Parses and validates the body of a scoring request.
+
+        Parameters
+        ----------
+        body : bytes
+            The JSON body.
+
+        Returns
+        -------
+        request : ScoringRequest
+            The scoring request.
+        """
+        try:
+            content = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "The body must be valid JSON.")
+        if not isinstance(content, dict) or not isinstance(content.get("patients"), list):
+            raise HTTPError(400, "The body must be an object with a list of patients.")
+
+        outcomes = content.get("outcomes")
+        if outcomes is None:
+            outcomes = tuple(self.nomograms)
+        elif isinstance(outcomes, list) and all(isinstance(outcome, str) for outcome in outcomes):
+            outcomes = tuple(outcomes)
+        else:
+            raise HTTPError(400, "outcomes must be a list of outcome names.")
+
+        unknown_outcomes = [outcome for outcome in outcomes if outcome not in self.nomograms]
+        if unknown_outcomes:
+            raise HTTPError(
+                400,
+                f"Unknown outcomes: {unknown_outcomes}. Available outcomes are {list(self.nomograms)}."
+            )
+
+        patients = content["patients"]
+        for outcome in outcomes:
+            for column_name in self._get_columns_names(outcome):
+                if not all(isinstance(patient, dict) and column_name in patient for patient in patients):
+                    raise HTTPError(400, f"Column {column_name} is needed by the outcome {outcome}.")
+
+        try:
+            number_of_months = float(content.get("number_of_months", 60))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "number_of_months must be a number.")
+
+        return ScoringRequest(patients, number_of_months, outcomes)
+
+    async def _predict_proba(self, request: ScoringRequest) -> Dict[str, List[Optional[float]]]:
+        """
+        Submits the patients of a request to the micro-batcher of each of its outcomes and awaits their predictions.
+
+        Parameters
+        ----------
+        request : ScoringRequest
+            The scoring request.
+
+        Returns
+        -------
+        predictions : Dict[str, List[Optional[float]]]
+            The predictions of the patients, by outcome.
+        """
+        results = await asyncio.gather(
+            *[
+                self._micro_batchers[outcome].submit_many_async(request.patients, request.number_of_months)
+                for outcome in request.outcomes
+            ],
+            return_exceptions=True
+        )
+
+        predictions = {}
+        for outcome, result in zip(request.outcomes, results):
+            if isinstance(result, (TypeError, ValueError)):
+                raise HTTPError(400, f"The patients cannot be scored for the outcome {outcome}: {result}")
+            elif isinstance(result, BaseException):
+                raise result
+            predictions[outcome] = _to_json_list(result)
+
+        return predictions
+
+    async def _handle_request(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """
+        Handles an HTTP request.
+
+        Parameters
+        ----------
+        method : str
+            The HTTP method.
+        path : str
+            The path.
+        body : bytes
+            The body.
+
+        Returns
+        -------
+        status, content : Tuple[int, Dict[str, Any]]
+            The HTTP status code and the JSON content of the response.
+        """
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "Use GET.")
+            return 200, {"status": "ok", "outcomes": list(self.nomograms)}
+        elif path == "/predict_proba":
+            if method != "POST":
+                raise HTTPError(405, "Use POST.")
+            request = self._parse_request(body)
+            return 200, {"predictions": await self._predict_proba(request)}
+        else:
+            raise HTTPError(404, f"Unknown path: {path}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves the HTTP/1.1 requests of a connection, keeping it alive until the client closes it.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            The connection reader.
+        writer : asyncio.StreamWriter
+            The connection writer.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, content = await self._handle_request(method, path.split("?")[0], body)
+                except HTTPError as error:
+                    status, content = error.status, {"error": error.message}
+                except Exception as exception:
+                    status, content = 500, {"error": str(exception)}
+
+                response_body = json.dumps(content).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(response_body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + response_body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        """
+        Starts the micro-batchers and listens in the running event loop. The port attribute is updated with the actual
+        port, e.g. when it is 0.
+        """
+        for outcome, nomogram in self.nomograms.items():
+            micro_batcher = MicroBatcher(nomogram, max_batch_size=self.max_batch_size, max_wait=self.max_wait)
+            micro_batcher.start()
+            self._micro_batchers[outcome] = micro_batcher
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """
+        Stops listening, then stops the micro-batchers after they have scored the queued requests.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for micro_batcher in self._micro_batchers.values():
+            await asyncio.to_thread(micro_batcher.stop)
+
+    async def serve_forever(self) -> None:
+        """
+        Starts the server and serves until it is cancelled.
+        """
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def create_preoperative_nomograms() -> Dict[str, Any]:
+    """
+    Constructs the MSKCC preoperative nomograms of all the outcomes that do not need the number of cores.
+
+    Returns
+    -------
+    nomograms : Dict[str, Any]
+        The nomograms, by outcome name.
+    """
+    from .mskcc import MskccPreRadicalProstatectomyNomogram
+
+    outcomes = [outcome for outcome in ClassificationOutcome if not outcome.endswith("(Cores)")]
+    outcomes += [SurvivalOutcome.PREOPERATIVE_BCR, SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH]
+
+    return {str(outcome): MskccPreRadicalProstatectomyNomogram(outcome) for outcome in outcomes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves the MSKCC preoperative nomograms over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=1024)
+    parser.add_argument("--max-wait", type=float, default=0.002, help="Batching window, in seconds.")
+    arguments = parser.parse_args()
+
+    start_time = time.perf_counter()
+    scoring_server = ScoringServer(
+        nomograms=create_preoperative_nomograms(),
+        host=arguments.host,
+        port=arguments.port,
+        max_batch_size=arguments.max_batch_size,
+        max_wait=arguments.max_wait
+    )
+    print(f"Loaded {len(scoring_server.nomograms)} nomograms in {time.perf_counter() - start_time:.1f} s.")
+    print(f"Serving on http://{arguments.host}:{arguments.port}")
+    asyncio.run(scoring_server.serve_forever())
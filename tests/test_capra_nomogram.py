@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from prostate_nomograms import CapraNomogram, SurvivalOutcome
+
+
+NUMBER_OF_PATIENTS = 500
+
+
+@pytest.fixture(scope="module")
+def dataframe():
+    random_generator = np.random.default_rng(0)
+    dataframe = pd.DataFrame({
+        "AGE": random_generator.integers(40, 85, NUMBER_OF_PATIENTS),
+        "PSA": np.round(random_generator.lognormal(2, 0.8, NUMBER_OF_PATIENTS), 1),
+        "GLEASON_PRIMARY": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "GLEASON_SECONDARY": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "CLINICAL_STAGE": random_generator.choice(["T1c", "T2a", "T2b", "T2c", "T3a"], NUMBER_OF_PATIENTS),
+        "POSITIVE_CORES_PERCENTAGE": np.round(random_generator.uniform(0, 100, NUMBER_OF_PATIENTS), 1)
+    })
+    dataframe["EVENT"] = random_generator.random(NUMBER_OF_PATIENTS) < 1/(1 + np.exp(3 - dataframe["PSA"]/10))
+    dataframe["TIME"] = random_generator.exponential(60, NUMBER_OF_PATIENTS)
+
+    return dataframe
+
+
+def test_stratify_cores_outcome(dataframe):
+    nomogram = CapraNomogram(
+        SurvivalOutcome.PREOPERATIVE_BCR_CORES,
+        event_indicator_column_name="EVENT",
+        event_time_column_name="TIME",
+        positive_cores_percentage_column_name="POSITIVE_CORES_PERCENTAGE"
+    )
+    nomogram.fit(dataframe)
+    without_cores = CapraNomogram(
+        SurvivalOutcome.PREOPERATIVE_BCR,
+        event_indicator_column_name="EVENT",
+        event_time_column_name="TIME"
+    ).get_capra_score(dataframe)
+
+    stratification = nomogram.stratify(dataframe, [12, 60])
+
+    expected = without_cores + (dataframe["POSITIVE_CORES_PERCENTAGE"].to_numpy() >= 34)
+    np.testing.assert_array_equal(stratification.capra_score, expected)
+    assert set(np.unique(stratification.capra_score)) <= set(range(11))
+    np.testing.assert_array_equal(stratification.risk_group, nomogram.get_risk_group(dataframe))
+    assert nomogram.predict_survival_curves(dataframe, [12, 60]).shape == (NUMBER_OF_PATIENTS, 2)
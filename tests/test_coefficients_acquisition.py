@@ -0,0 +1,163 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from prostate_nomograms.mskcc.base import CoefficientsBundle, CoefficientsRefresher, Model
+from prostate_nomograms.mskcc.base.web_table_scraper import clear_pages, MANIFEST_FILE_NAME, read_manifest
+
+
+PACKAGED_FOLDER_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "prostate_nomograms", "mskcc", "models_coefficients"
+)
+OUTCOMES = ("Extracapsular Extension", "Preoperative BCR", "Preoperative Prostate Cancer Death")
+
+
+def _get_page_content(day: str, month: str, year: str, correction: float = 0.0) -> bytes:
+    variables = pd.read_json(os.path.join(PACKAGED_FOLDER_PATH, "variables_coefficients_2_June_2022.json"))
+    variables["Value"] += correction
+    spline = pd.read_json(os.path.join(PACKAGED_FOLDER_PATH, "spline_coefficients_2_June_2022.json"))
+    tables = variables.to_html(index=False) + spline.to_html(index=False)
+
+    return f"<html><body><p>Updated: {month} {day}, {year}</p>{tables}</body></html>".encode("utf-8")
+
+
+class StandInServer:
+    """
+    Local HTTP stand-in of the coefficients page, counting the requests it receives and answering conditional
+    requests with 304 while the page is unchanged.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.set_page("2", "June", "2022")
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                stand_in.requests.append(dict(self.headers))
+                if self.headers.get("If-None-Match") == stand_in.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("ETag", stand_in.etag)
+                self.send_header("Content-Length", str(len(stand_in.content)))
+                self.end_headers()
+                self.wfile.write(stand_in.content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/coefficients"
+
+    def set_page(self, day: str, month: str, year: str, correction: float = 0.0):
+        self.content = _get_page_content(day, month, year, correction)
+        self.etag = f'"{day}-{month}-{year}-{correction}"'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    clear_pages()
+    server = StandInServer()
+    yield server
+    server.close()
+    clear_pages()
+
+
+def test_models_are_built_from_the_refreshed_coefficients_without_requests(stand_in, tmp_path):
+    refresher = CoefficientsRefresher(stand_in.url, str(tmp_path))
+    result = asyncio.run(refresher.refresh())
+
+    assert result.modified
+    assert os.path.isdir(result.bundle_folder_path)
+    assert read_manifest(str(tmp_path))[stand_in.url]["bundle_folder_name"] == "coefficients_bundle_2_June_2022"
+    assert len(stand_in.requests) == 1
+
+    clear_pages()
+    models = [Model(outcome, stand_in.url, str(tmp_path)) for outcome in OUTCOMES]
+
+    assert len(stand_in.requests) == 1
+    for model in models:
+        counters = model.acquisition_counters.as_dict()
+        assert counters["http_requests"] == counters["page_cache_hits"] == counters["page_cache_misses"] == 0
+        assert counters["bundle_cache_hits"] == 1 and counters["bundle_cache_misses"] == 0
+
+
+def test_conditional_refresh_of_an_unchanged_page(stand_in, tmp_path):
+    refresher = CoefficientsRefresher(stand_in.url, str(tmp_path))
+    refresher.refresh_sync()
+    result = refresher.refresh_sync()
+
+    assert not result.modified
+    assert stand_in.requests[-1]["If-None-Match"] == stand_in.etag
+
+
+def test_page_is_fetched_once_when_no_coefficients_exist_locally(stand_in, tmp_path):
+    for outcome in OUTCOMES:
+        Model(outcome, stand_in.url, str(tmp_path))
+
+    assert len(stand_in.requests) == 1
+    assert os.path.exists(os.path.join(str(tmp_path), MANIFEST_FILE_NAME))
+
+    clear_pages()
+    Model(OUTCOMES[0], stand_in.url, str(tmp_path))
+
+    assert len(stand_in.requests) == 1
+
+
+def test_models_use_the_coefficients_of_the_latest_refresh(stand_in, tmp_path):
+    refresher = CoefficientsRefresher(stand_in.url, str(tmp_path))
+    refresher.refresh_sync()
+    stand_in.set_page("1", "January", "2021")
+    refresher.refresh_sync()
+
+    clear_pages()
+    model = Model(OUTCOMES[0], stand_in.url, str(tmp_path))
+
+    assert model._coefficients_bundle.folder_path.endswith("coefficients_bundle_1_January_2021")
+    assert len(stand_in.requests) == 2
+
+
+def test_newest_local_coefficients_are_used_without_manifest(stand_in, tmp_path):
+    refresher = CoefficientsRefresher(stand_in.url, str(tmp_path))
+    refresher.refresh_sync()
+    stand_in.set_page("1", "January", "2021")
+    refresher.refresh_sync()
+    os.remove(os.path.join(str(tmp_path), MANIFEST_FILE_NAME))
+
+    clear_pages()
+    model = Model(OUTCOMES[0], stand_in.url, str(tmp_path))
+
+    assert model._coefficients_bundle.folder_path.endswith("coefficients_bundle_2_June_2022")
+    assert len(stand_in.requests) == 2
+
+
+def test_corrected_coefficients_of_the_same_date_replace_the_bundle(stand_in, tmp_path):
+    refresher = CoefficientsRefresher(stand_in.url, str(tmp_path))
+    first_result = refresher.refresh_sync()
+    first_bundle = CoefficientsBundle(first_result.bundle_folder_path)
+    stand_in.set_page("2", "June", "2022", correction=1.0)
+    second_result = refresher.refresh_sync()
+
+    clear_pages()
+    model = Model(OUTCOMES[0], stand_in.url, str(tmp_path))
+
+    assert second_result.modified and second_result.bundle_folder_path == first_result.bundle_folder_path
+    first_coefficients = first_bundle.get_variables_coefficients(OUTCOMES[0])
+    coefficients = model._coefficients_bundle.get_variables_coefficients(OUTCOMES[0])
+    assert coefficients == pytest.approx({variable: value + 1.0 for variable, value in first_coefficients.items()})
+    assert [name for name in os.listdir(str(tmp_path)) if name.startswith("tmp")] == []
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from scipy import sparse
+
+from prostate_nomograms import ClassificationOutcome, CustomNomogram, SurvivalOutcome
+
+
+NUMBER_OF_PATIENTS = 500
+
+
+@pytest.fixture(scope="module")
+def dataframe():
+    random_generator = np.random.default_rng(0)
+    dataframe = pd.DataFrame({
+        "AGE": random_generator.integers(40, 85, NUMBER_OF_PATIENTS).astype(float),
+        "PSA": np.round(random_generator.lognormal(2, 0.8, NUMBER_OF_PATIENTS), 1),
+        "CLINICAL_STAGE": random_generator.choice(["T1c", "T2a", "T2b", None], NUMBER_OF_PATIENTS)
+    })
+    dataframe["TARGET"] = random_generator.random(NUMBER_OF_PATIENTS) < 1/(1 + np.exp(3 - dataframe["PSA"]/10))
+    dataframe["EVENT"] = dataframe["TARGET"]
+    dataframe["TIME"] = random_generator.exponential(60, NUMBER_OF_PATIENTS)
+
+    return dataframe
+
+
+@pytest.mark.parametrize("fit_frame_type", ["pandas", "arrow"])
+def test_missing_categories_do_not_depend_on_frame_type(dataframe, fit_frame_type):
+    nomogram = CustomNomogram(
+        ClassificationOutcome.EXTRACAPSULAR_EXTENSION,
+        features_column_names=["AGE", "PSA", "CLINICAL_STAGE"],
+        target_column_name="TARGET",
+        categorical_column_names=["CLINICAL_STAGE"]
+    )
+    table = pa.Table.from_pandas(dataframe)
+    assert dataframe["CLINICAL_STAGE"].isna().any()
+
+    nomogram.fit(dataframe if fit_frame_type == "pandas" else table)
+
+    np.testing.assert_array_equal(nomogram.predict_proba(dataframe), nomogram.predict_proba(table))
+
+
+def test_features_are_sparse_only_when_mostly_zeros(dataframe):
+    random_generator = np.random.default_rng(1)
+    dataframe = dataframe.assign(
+        BINARY=random_generator.integers(0, 2, NUMBER_OF_PATIENTS).astype(float),
+        **{f"RARE_{i}": (random_generator.random(NUMBER_OF_PATIENTS) < 0.02).astype(float) for i in range(10)}
+    )
+    dense_nomogram = CustomNomogram(
+        ClassificationOutcome.EXTRACAPSULAR_EXTENSION,
+        features_column_names=["AGE", "PSA", "BINARY"],
+        target_column_name="TARGET"
+    )
+    sparse_nomogram = CustomNomogram(
+        ClassificationOutcome.EXTRACAPSULAR_EXTENSION,
+        features_column_names=[f"RARE_{i}" for i in range(10)],
+        target_column_name="TARGET"
+    )
+
+    dense_nomogram.fit(dataframe)
+    sparse_nomogram.fit(dataframe)
+
+    assert isinstance(dense_nomogram._get_scaled_features(dataframe), np.ndarray)
+    assert sparse.issparse(sparse_nomogram._get_scaled_features(dataframe))
+
+
+def test_survival_features_are_dense(dataframe):
+    nomogram = CustomNomogram(
+        SurvivalOutcome.PREOPERATIVE_BCR,
+        features_column_names=["AGE", "PSA", "CLINICAL_STAGE"],
+        event_indicator_column_name="EVENT",
+        event_time_column_name="TIME",
+        categorical_column_names=["CLINICAL_STAGE"]
+    )
+
+    nomogram.fit(dataframe)
+    features = nomogram._get_scaled_features(dataframe)
+
+    assert isinstance(features, np.ndarray)
+    assert features.shape == (NUMBER_OF_PATIENTS, 2 + len(nomogram._encoder.categories_[0]))
@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prostate_nomograms import (
+    CapraNomogram,
+    ClassificationOutcome,
+    CustomNomogram,
+    MskccPreRadicalProstatectomyNomogram,
+    SurvivalOutcome
+)
+from prostate_nomograms.mskcc.base import backends, Backend, get_available_backends
+
+
+NUMBER_OF_PATIENTS = 2_000
+NUMBER_OF_THREADS = 8
+NUMBER_OF_CALLS_PER_THREAD = 25
+NUMBER_OF_MONTHS = 60
+
+
+@pytest.fixture(scope="module")
+def dataframe():
+    random_generator = np.random.default_rng(0)
+    dataframe = pd.DataFrame({
+        "AGE": random_generator.integers(40, 85, NUMBER_OF_PATIENTS),
+        "PSA": np.round(random_generator.lognormal(2, 0.8, NUMBER_OF_PATIENTS), 1),
+        "GLEASON_PRIMARY": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "GLEASON_SECONDARY": random_generator.integers(3, 6, NUMBER_OF_PATIENTS),
+        "CLINICAL_STAGE": random_generator.choice(["T1c", "T2a", "T2b", "T2c", "T3a"], NUMBER_OF_PATIENTS)
+    })
+    dataframe["TARGET"] = random_generator.random(NUMBER_OF_PATIENTS) < 1/(1 + np.exp(3 - dataframe["PSA"]/10))
+    dataframe["EVENT"] = dataframe["TARGET"]
+    dataframe["TIME"] = random_generator.exponential(60, NUMBER_OF_PATIENTS)
+
+    return dataframe
+
+
+@pytest.fixture(scope="module")
+def nomograms(dataframe):
+    nomograms = {
+        "MSKCC ECE": MskccPreRadicalProstatectomyNomogram(ClassificationOutcome.EXTRACAPSULAR_EXTENSION),
+        "MSKCC PCSM": MskccPreRadicalProstatectomyNomogram(SurvivalOutcome.PREOPERATIVE_PROSTATE_CANCER_DEATH),
+        "MSKCC BCR": MskccPreRadicalProstatectomyNomogram(SurvivalOutcome.PREOPERATIVE_BCR),
+        "CAPRA ECE": CapraNomogram(ClassificationOutcome.EXTRACAPSULAR_EXTENSION, target_column_name="TARGET"),
+        "CAPRA BCR": CapraNomogram(
+            SurvivalOutcome.PREOPERATIVE_BCR,
+            event_indicator_column_name="EVENT",
+            event_time_column_name="TIME"
+        ),
+        "Custom ECE": CustomNomogram(
+            ClassificationOutcome.EXTRACAPSULAR_EXTENSION,
+            features_column_names=["AGE", "PSA", "GLEASON_PRIMARY", "GLEASON_SECONDARY"],
+            target_column_name="TARGET"
+        )
+    }
+    for nomogram in nomograms.values():
+        if hasattr(nomogram, "fit"):
+            nomogram.fit(dataframe)
+
+    return nomograms
+
+
+def _predict(nomogram, patients):
+    if nomogram.model_type == "survival":
+        return nomogram.predict_proba(patients, NUMBER_OF_MONTHS)
+    else:
+        return nomogram.predict_proba(patients)
+
+
+def test_frozen_nomograms_shared_across_threads_match_the_references(dataframe, nomograms):
+    frozen_nomograms = {name: nomogram.freeze() for name, nomogram in nomograms.items()}
+    references = {name: _predict(nomogram, dataframe) for name, nomogram in nomograms.items()}
+
+    def stress(thread_index):
+        random_generator = np.random.default_rng(thread_index)
+        number_of_mismatches = 0
+        for _ in range(NUMBER_OF_CALLS_PER_THREAD):
+            name = list(frozen_nomograms)[random_generator.integers(len(frozen_nomograms))]
+            start = int(random_generator.integers(0, NUMBER_OF_PATIENTS - 1))
+            stop = int(random_generator.integers(start + 1, min(start + 500, NUMBER_OF_PATIENTS) + 1))
+            predictions = _predict(frozen_nomograms[name], dataframe.iloc[start:stop])
+            if not np.array_equal(predictions, references[name][start:stop], equal_nan=True):
+                number_of_mismatches += 1
+
+        return number_of_mismatches
+
+    with ThreadPoolExecutor(NUMBER_OF_THREADS) as executor:
+        assert sum(executor.map(stress, range(NUMBER_OF_THREADS))) == 0
+
+
+def test_frozen_nomograms_are_immutable(nomograms):
+    for nomogram in nomograms.values():
+        frozen_nomogram = nomogram.freeze()
+        with pytest.raises(AttributeError):
+            frozen_nomogram.outcome = ClassificationOutcome.LYMPH_NODE_INVOLVEMENT
+        with pytest.raises(AttributeError):
+            del frozen_nomogram.outcome
+
+
+def test_frozen_coefficients_are_read_only(nomograms):
+    frozen_nomogram = nomograms["MSKCC BCR"].freeze()
+    compiled_model = frozen_nomogram._nomogram.regressor.compiled_model
+    arrays = [effect.table for effect in compiled_model.effects.values() if effect.table is not None]
+
+    assert arrays
+    for array in arrays:
+        assert not array.flags.writeable
+        with pytest.raises(ValueError):
+            array[0] = 0
+
+
+@pytest.mark.skipif(Backend.NUMBA not in get_available_backends(), reason="numba is not installed")
+def test_freeze_compiles_the_numba_kernels():
+    frozen_nomogram = MskccPreRadicalProstatectomyNomogram(
+        SurvivalOutcome.PREOPERATIVE_BCR,
+        backend=Backend.NUMBA
+    ).freeze()
+
+    for fused_kernel in frozen_nomogram._nomogram.regressor._fused_kernels.values():
+        if fused_kernel.link.value in ("survival", "risk"):
+            kernel = backends._get_numba_kernel(fused_kernel.expression, fused_kernel.variables)
+            assert kernel.signatures
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from prostate_nomograms import MskccPreRadicalProstatectomyNomogram, SurvivalOutcome
+from prostate_nomograms.micro_batcher import MicroBatcher
+
+
+NUMBER_OF_MONTHS = 60
+PATIENT = {"AGE": 65, "PSA": 7.2, "GLEASON_PRIMARY": 3, "GLEASON_SECONDARY": 4, "CLINICAL_STAGE": "T2a"}
+
+
+@pytest.fixture(scope="module")
+def nomogram():
+    return MskccPreRadicalProstatectomyNomogram(SurvivalOutcome.PREOPERATIVE_BCR)
+
+
+def test_invalid_request_fails_only_its_future(nomogram):
+    with MicroBatcher(nomogram, number_of_months=NUMBER_OF_MONTHS, max_wait=0.5) as micro_batcher:
+        futures = [
+            micro_batcher.submit(PATIENT),
+            micro_batcher.submit(dict(PATIENT, PSA="abc")),
+            micro_batcher.submit_many([PATIENT, dict(PATIENT, PSA=20.0)]),
+            micro_batcher.submit(PATIENT)
+        ]
+        expected = nomogram.predict_proba(pd.DataFrame([PATIENT, dict(PATIENT, PSA=20.0)]), NUMBER_OF_MONTHS)
+
+        assert futures[0].result() == pytest.approx(expected[0])
+        with pytest.raises(ValueError):
+            futures[1].result()
+        assert futures[2].result() == pytest.approx(list(expected))
+        assert futures[3].result() == pytest.approx(expected[0])
+
+    metrics = micro_batcher.metrics
+    assert metrics.number_of_requests == 4
+    assert metrics.number_of_patients == 5
+    assert metrics.number_of_failed_requests == 1
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+
+from prostate_nomograms.results_sink import MemmapResultsSink, ParquetResultsSink, read_results
+
+
+NUMBER_OF_ROWS = 10_007
+COLUMN_NAMES = ["PREDICTED_A", "PREDICTED_B"]
+
+
+@pytest.fixture(params=["memmap", "parquet"])
+def create_sink(request, tmp_path):
+    if request.param == "memmap":
+        path = str(tmp_path/"results")
+        return path, lambda: MemmapResultsSink(path, NUMBER_OF_ROWS, COLUMN_NAMES)
+    else:
+        pytest.importorskip("pyarrow")
+        path = str(tmp_path/"results.parquet")
+        return path, lambda: ParquetResultsSink(path, NUMBER_OF_ROWS, COLUMN_NAMES, row_group_size=1_000)
+
+
+def test_closed_sink_can_be_read(create_sink):
+    path, sink_constructor = create_sink
+    values = np.arange(NUMBER_OF_ROWS, dtype=float)
+
+    with sink_constructor() as sink:
+        for start in range(0, NUMBER_OF_ROWS, 1_000):
+            for column_name in COLUMN_NAMES:
+                sink.write(column_name, values[start:start + 1_000], start)
+
+    results = read_results(path)
+    assert list(results.columns) == COLUMN_NAMES
+    np.testing.assert_array_equal(results["PREDICTED_B"], values)
+
+
+def test_failed_sink_leaves_no_results(create_sink):
+    path, sink_constructor = create_sink
+
+    with pytest.raises(RuntimeError):
+        with sink_constructor() as sink:
+            for column_name in COLUMN_NAMES:
+                sink.write(column_name, np.zeros(10))
+            raise RuntimeError("The job failed.")
+
+    assert not os.path.exists(path)
+    assert os.listdir(os.path.dirname(path)) == []
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from prostate_nomograms import ClassificationOutcome, MskccPreRadicalProstatectomyNomogram, SurvivalOutcome
+from prostate_nomograms.server import ScoringServer
+
+
+PATIENT = {"AGE": 65, "PSA": 7.2, "GLEASON_PRIMARY": 3, "GLEASON_SECONDARY": 4, "CLINICAL_STAGE": "T2a"}
+SCORING_TIME = 0.5
+
+
+class SlowNomogram:
+
+    def __init__(self, nomogram):
+        self.nomogram = nomogram
+        self.model_type = nomogram.model_type
+        self.inputs_column_names = nomogram.inputs_column_names
+
+    def predict_proba(self, *args):
+        time.sleep(SCORING_TIME)
+        return self.nomogram.predict_proba(*args)
+
+
+@pytest.fixture(scope="module")
+def nomograms():
+    outcomes = [ClassificationOutcome.EXTRACAPSULAR_EXTENSION, SurvivalOutcome.PREOPERATIVE_BCR]
+    return {str(outcome): MskccPreRadicalProstatectomyNomogram(outcome) for outcome in outcomes}
+
+
+async def post(port: int, content) -> tuple:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(content).encode()
+    writer.write(
+        f"POST /predict_proba HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    headers, _, body = response.partition(b"\r\n\r\n")
+
+    return int(headers.split(b" ")[1]), json.loads(body)
+
+
+def run_with_server(nomograms, client):
+    async def run():
+        server = ScoringServer(nomograms, port=0, max_wait=0.05)
+        await server.start()
+        try:
+            result = await client(server)
+        finally:
+            await server.stop()
+
+        return result, server.metrics
+
+    return asyncio.run(run())
+
+
+def test_invalid_patients_fail_only_their_request(nomograms):
+    async def client(server):
+        return await asyncio.gather(
+            post(server.port, {"patients": [PATIENT]}),
+            post(server.port, {"patients": [dict(PATIENT, PSA="abc")]}),
+            post(server.port, {"patients": [PATIENT, PATIENT], "number_of_months": 120})
+        )
+
+    (valid, invalid, other), metrics = run_with_server(nomograms, client)
+
+    assert valid[0] == 200 and set(valid[1]["predictions"]) == set(nomograms)
+    assert invalid[0] == 400
+    assert other[0] == 200 and len(other[1]["predictions"][str(SurvivalOutcome.PREOPERATIVE_BCR)]) == 2
+    assert all(outcome_metrics.number_of_failed_requests == 1 for outcome_metrics in metrics.values())
+
+
+def test_outcomes_must_be_a_list(nomograms):
+    outcome = str(ClassificationOutcome.EXTRACAPSULAR_EXTENSION)
+
+    async def client(server):
+        return await asyncio.gather(
+            post(server.port, {"patients": [PATIENT], "outcomes": outcome}),
+            post(server.port, {"patients": [PATIENT], "outcomes": [outcome]})
+        )
+
+    (string, listed), _ = run_with_server(nomograms, client)
+
+    assert string[0] == 400
+    assert listed[0] == 200 and list(listed[1]["predictions"]) == [outcome]
+
+
+def test_event_loop_is_not_blocked_by_scoring(nomograms):
+    nomograms = {outcome: SlowNomogram(nomogram) for outcome, nomogram in nomograms.items()}
+
+    async def client(server):
+        loop = asyncio.get_running_loop()
+        largest_delay = 0.0
+
+        async def measure_delays(stop: asyncio.Event):
+            nonlocal largest_delay
+            while not stop.is_set():
+                start = loop.time()
+                await asyncio.sleep(0.001)
+                largest_delay = max(largest_delay, loop.time() - start - 0.001)
+
+        stop = asyncio.Event()
+        task = loop.create_task(measure_delays(stop))
+        status, _ = await post(server.port, {"patients": [PATIENT]})
+        stop.set()
+        await task
+
+        return status, largest_delay
+
+    (status, largest_delay), _ = run_with_server(nomograms, client)
+
+    assert status == 200
+    assert largest_delay < SCORING_TIME/2